@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""Micro-benchmark of cache replacement policies
+
+Each policy serves a stream of Zipf-distributed requests: an item is looked
+up with *get* and, if missing, inserted with *put*, which is what strategies
+do at each caching node. The number of requests served per second is
+reported for each policy.
+
+Usage: python benchmark.py [-n REQUESTS] [-c CONTENTS] [-s SIZE] [POLICY ...]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from icarus.registry import CACHE_POLICY
+from icarus.tools import TruncatedZipfDist
+
+__all__ = ['benchmark_cache', 'run']
+
+DEFAULT_POLICIES = ['LRU', 'FAST_LRU', 'SLRU', 'LFU']
+
+
+def benchmark_cache(policy, requests, size, repeat=3):
+    """Measure the request rate sustained by a cache policy
+
+    Parameters
+    ----------
+    policy : str
+        The name of the policy, as registered in CACHE_POLICY
+    requests : list
+        The items requested
+    size : int
+        The size of the cache
+    repeat : int, optional
+        The number of runs, each on a new cache. The fastest is returned
+
+    Returns
+    -------
+    rate : float
+        The number of requests served per second
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        cache = CACHE_POLICY[policy](size)
+        get = cache.get
+        put = cache.put
+        start = time.time()
+        for k in requests:
+            if not get(k):
+                put(k)
+        best = min(best, time.time() - start)
+    return len(requests)/best
+
+
+def run(policies=DEFAULT_POLICIES, n_requests=10**6, n_contents=10**4,
+        cache_size=10**3, alpha=0.8, seed=0):
+    """Run the benchmark and print a report
+
+    Parameters
+    ----------
+    policies : list, optional
+        The names of the policies to benchmark
+    n_requests : int, optional
+        The number of requests of the stream
+    n_contents : int, optional
+        The number of distinct contents
+    cache_size : int, optional
+        The size of the caches
+    alpha : float, optional
+        The Zipf exponent of content popularity
+    seed : int, optional
+        The seed of the request stream
+    """
+    zipf = TruncatedZipfDist(alpha, n_contents)
+    rng = np.random.RandomState(seed)
+    requests = (np.searchsorted(zipf.cdf, rng.random_sample(n_requests)) + 1).tolist()
+    print "%d requests, %d contents, cache size %d, alpha %s" \
+          % (n_requests, n_contents, cache_size, alpha)
+    baseline = None
+    for policy in policies:
+        rate = benchmark_cache(policy, requests, cache_size)
+        baseline = baseline or rate
+        print "%-12s %12.0f ops/s  %5.2fx" % (policy, rate, rate/baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", dest="n_requests", type=int, default=10**6,
+                        help="number of requests")
+    parser.add_argument("-c", dest="n_contents", type=int, default=10**4,
+                        help="number of contents")
+    parser.add_argument("-s", dest="cache_size", type=int, default=10**3,
+                        help="cache size")
+    parser.add_argument("policies", nargs="*", default=DEFAULT_POLICIES,
+                        help="cache policies to benchmark")
+    args = parser.parse_args()
+    run(args.policies, args.n_requests, args.n_contents, args.cache_size)
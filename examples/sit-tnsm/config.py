@@ -25,13 +25,56 @@ CACHING_GRANULARITY = 'OBJECT'
 
 # Format in which results are saved.
 # Result readers and writers are located in module ./icarus/results/readwrite.py
-# Currently only PICKLE is supported 
+# Currently PICKLE and COLUMNAR are supported. COLUMNAR stores results in a
+# directory, appending them as experiments complete, and lets plotting read
+# single metrics without loading all results (see icarus/results/columnar.py)
 RESULTS_FORMAT = 'PICKLE'
 
+# Directory where topologies, their shortest paths and node centralities are
+# cached and shared across all experiments of the campaign. All experiments
+# of this campaign use the same topology, so they are computed only once.
+# Set to None to rebuild them in every experiment
+PRECOMPUTATION_CACHE_DIR = None
+
+# If True, topologies, shortest paths and centralities of all experiments are
+# computed once before starting experiments and shared by all processes
+# through read-only memory-mapped files, stored in PRECOMPUTATION_CACHE_DIR
+# or, if not set, in a temporary directory in shared memory. Shortest paths
+# are then built on demand from the shared files, unless another
+# shortest_path_mode is set in the netconf of experiments, in which case each
+# process keeps its own copy of all paths
+SHARE_PRECOMPUTATION = True
+
+# If True, the state reached at the end of each distinct warmup phase is
+# stored in a snapshot, from which all experiments sharing the same warmup
+# phase start, instead of simulating it again. Snapshots are stored in
+# WARMUP_SNAPSHOT_DIR or, if None, in a temporary directory in shared memory.
+# Warmup phases are only shared if SEED is not None
+SHARE_WARMUP = True
+WARMUP_SNAPSHOT_DIR = None
+
+# File to which the results of each experiment are appended as soon as it
+# completes. If the campaign is interrupted and restarted with the same file,
+# experiments whose results are already in it are not run again.
+# Set to None to disable checkpointing
+CHECKPOINT_LOG = None
+
 # Number of times each experiment is replicated
 # This is necessary for extracting confidence interval of selected metrics
 N_REPLICATIONS = 1
 
+# Number of shards in which the measured phase of each experiment is split.
+# Shards start from the same warmup phase, run in parallel and their results
+# are merged. All data collectors must support merging, which 'ABS' does not
+N_SHARDS = 1
+
+# If True, the wall-clock time of each phase of each experiment, the rate at
+# which events are processed and the number of calls and cumulative time of
+# the methods of strategies and of cache and RSN operations are measured and
+# stored in the PERF subtree of the results (see icarus/execution/profiling.py).
+# Profiling slows down simulations
+PROFILE = False
+
 # List of metrics to be measured in the experiments
 # The implementation of data collectors are located in ./icaurs/execution/collectors.py
 DATA_COLLECTORS = ['ABS', 'CACHE_HIT_RATIO', 'OVERHEAD', 'LATENCY']
@@ -64,6 +107,9 @@ N_WARMUP = 20*60*100 # 60 minutes
 N_MEASURED = 1*60*60*100 # three hours
 # Number of requests per second (over the whole network)
 REQ_RATE = 100
+# Seed of the workload and content placement. If None, each experiment uses
+# different requests and content placement
+SEED = None
 
 # Limit of scope for scoped flooding 
 SCOPE_LIMIT = 2
@@ -83,10 +129,12 @@ default['workload'] = {
     'n_warmup':   N_WARMUP,
     'n_measured': N_MEASURED,
     'rate':       REQ_RATE,
-    'disconnection_rate': DISCONNECTION_RATE
+    'disconnection_rate': DISCONNECTION_RATE,
+    'seed':       SEED
     # 'beta':       BETA
                        }
 default['content_placement']['name'] = 'UNIFORM'
+default['content_placement']['seed'] = SEED
 default['cache_policy']['name'] = CACHE_POLICY
 
 # Instantiate experiment queue
@@ -123,7 +171,8 @@ for strategy in ['NDN_SIT']:
             'n_warmup':   N_WARMUP,
             'n_measured': N_MEASURED,
             'rate':       REQ_RATE,
-            'disconnection_rate': DISCONNECTION_RATE
+            'disconnection_rate': DISCONNECTION_RATE,
+            'seed':       SEED
         }
         experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
         experiment['strategy']['name'] = strategy
@@ -143,7 +192,8 @@ for strategy in ['SIT_ONLY']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['strategy']['name'] = strategy
@@ -165,7 +215,8 @@ for strategy in ['SIT_WITH_SCOPED_FLOODING']:
                     'n_warmup':   N_WARMUP,
                     'n_measured': N_MEASURED,
                     'rate':       REQ_RATE,
-                    'disconnection_rate': DISCONNECTION_RATE
+                    'disconnection_rate': DISCONNECTION_RATE,
+                    'seed':       SEED
                 }
                 experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
                 experiment['topology']['asn'] = TOPOLOGY 
@@ -189,7 +240,8 @@ for strategy in ['SCOPED_FLOODING']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['topology']['asn'] = TOPOLOGY 
@@ -216,7 +268,8 @@ for strategy in ['NDN_SIT']:
             'n_warmup':   N_WARMUP,
             'n_measured': N_MEASURED,
             'rate':       REQ_RATE,
-            'disconnection_rate': DISCONNECTION_RATE
+            'disconnection_rate': DISCONNECTION_RATE,
+            'seed':       SEED
         }
         experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
         experiment['strategy']['name'] = strategy
@@ -237,7 +290,8 @@ for strategy in ['SIT_ONLY']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['strategy']['name'] = strategy
@@ -260,7 +314,8 @@ for strategy in ['SIT_WITH_SCOPED_FLOODING']:
                     'n_warmup':   N_WARMUP,
                     'n_measured': N_MEASURED,
                     'rate':       REQ_RATE,
-                    'disconnection_rate': DISCONNECTION_RATE
+                    'disconnection_rate': DISCONNECTION_RATE,
+                    'seed':       SEED
                 }
                 experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
                 experiment['strategy']['name'] = strategy
@@ -282,7 +337,8 @@ for strategy in ['SCOPED_FLOODING']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['strategy']['name'] = strategy
@@ -399,7 +455,8 @@ for strategy in ['SIT_ONLY']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['strategy']['name'] = strategy
@@ -420,7 +477,8 @@ for strategy in ['SIT_WITH_SCOPED_FLOODING']:
                     'n_warmup':   N_WARMUP,
                     'n_measured': N_MEASURED,
                     'rate':       REQ_RATE,
-                    'disconnection_rate': DISCONNECTION_RATE
+                    'disconnection_rate': DISCONNECTION_RATE,
+                    'seed':       SEED
                 }
                 experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
                 experiment['strategy']['name'] = strategy
@@ -441,7 +499,8 @@ for strategy in ['SCOPED_FLOODING']:
                 'n_warmup':   N_WARMUP,
                 'n_measured': N_MEASURED,
                 'rate':       REQ_RATE,
-                'disconnection_rate': DISCONNECTION_RATE
+                'disconnection_rate': DISCONNECTION_RATE,
+                'seed':       SEED
             }
             experiment['joint_cache_rsn_placement']['name'] = 'CACHE_ALL_RSN_ALL_SIT'
             experiment['strategy']['name'] = strategy
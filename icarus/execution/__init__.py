@@ -2,4 +2,7 @@
 """
 from .network import *
 from .collectors import *
-from .engine import *
\ No newline at end of file
+from .profiling import *
+from .engine import *
+from .precomputation import *
+from .snapshot import *
\ No newline at end of file
@@ -2,6 +2,7 @@
 """This module contains performance metrics loggers
 """
 from __future__ import division
+import logging
 import collections
 import random
 
@@ -26,6 +27,9 @@ __all__ = [
            ]
 
 
+logger = logging.getLogger('orchestration')
+
+
 class DataCollector(object):
     """Object collecting notifications about simulation events and measuring
     relevant metrics.
@@ -124,7 +128,51 @@ class DataCollector(object):
             calculate latency correctly in multicast cases
         """
         pass
-    
+
+    def session_hops(self, request_hops, content_hops, receiver_hops):
+        """Reports the number of links traversed by requests and contents
+        during the session.
+
+        Collectors which only need these per-session totals should implement
+        this method instead of *request_hop* and *content_hop*: the
+        CollectorProxy then counts hops itself and reports their totals once
+        per session, before *end_session*.
+
+        Parameters
+        ----------
+        request_hops : int
+            Number of links traversed by requests
+        content_hops : int
+            Number of links traversed by contents
+        receiver_hops : int
+            Number of links traversed by contents until the content reached
+            the receiver, or *None* if it never did
+        """
+        pass
+
+    def hop_trace(self, u, v, content, main_path):
+        """Reports a batch of hops traversed by requests and contents, in the
+        order they were traversed, possibly across several sessions.
+
+        Collectors which need hops individually, but not in the session they
+        belong to, should implement this method instead of *request_hop* and
+        *content_hop*: the CollectorProxy then buffers hops and reports them
+        in bulk, as arrays with one element per hop. The arrays are reused
+        by the proxy once this method returns, so they must not be kept.
+
+        Parameters
+        ----------
+        u : array of int
+            Integer ids of the origin nodes (see NetworkModel.node_id)
+        v : array of int
+            Integer ids of the destination nodes
+        content : array of bool
+            *True* for hops traversed by contents, *False* for requests
+        main_path : array of bool
+            The *main_path* flag of each hop
+        """
+        pass
+
     def end_session(self, success=True):
         """Reports that the session is closed, i.e. the content has been
         successfully delivered to the receiver or a failure blocked the 
@@ -157,10 +205,52 @@ class DataCollector(object):
         """
         pass
 
-# Note: The implementation of CollectorProxy could be improved to avoid having
-# to rewrite almost identical methods, for example by playing with __dict__
-# attribute. However, it was implemented this way to make it more readable and 
-# easier to understand.
+    def merge(self, other):
+        """Adds to this collector the measurements of another collector.
+        
+        Both collectors must be of the same type, have the same parameters
+        and have observed disjoint sets of sessions of the same experiment,
+        e.g. different shards of its measured phase. The results of the
+        merged collector are then those of a collector which observed all
+        sessions observed by both.
+        
+        Parameters
+        ----------
+        other : DataCollector
+            The collector whose measurements are added
+        """
+        raise NotImplementedError('%s does not support merging'
+                                  % type(self).__name__)
+
+    def __getstate__(self):
+        # Collectors are pickled without the network view, so that they can
+        # be sent from the process which ran a shard of an experiment to the
+        # one merging them, without the whole network model
+        state = self.__dict__.copy()
+        state.pop('view', None)
+        return state
+
+
+def _noop(*args, **kwargs):
+    """Dispatches an event no collector listens to"""
+    pass
+
+
+def _dispatcher(methods):
+    """Return a function dispatching an event to the given bound methods of
+    collectors, specialized on their number, so that events are dispatched
+    without looping when not necessary.
+    """
+    if not methods:
+        return _noop
+    if len(methods) == 1:
+        return methods[0]
+    def dispatch(*args, **kwargs):
+        for method in methods:
+            method(*args, **kwargs)
+    return dispatch
+
+
 class CollectorProxy(DataCollector):
     """This class acts as a proxy for all concrete collectors towards the
     network controller.
@@ -168,10 +258,22 @@ class CollectorProxy(DataCollector):
     An instance of this class registers itself with the network controller and
     it receives notifications for all events. This class is responsible for
     dispatching events of interests to concrete collectors.
+    
+    The dispatch of each event is specialized when the proxy is created:
+    events no collector listens to are bound to a no-op and events a single
+    collector listens to are bound directly to its method. Hops are counted
+    by the proxy itself for collectors implementing *session_hops*, which are
+    reported their totals once per session, and buffered for collectors
+    implementing *hop_trace*, which are reported them in bulk.
     """
     
     EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss', 'server_hit',
-              'evict_item', 'put_item', 'request_hop', 'content_hop', 'results')
+              'evict_item', 'put_item', 'request_hop', 'content_hop',
+              'session_hops', 'hop_trace', 'results')
+    
+    # Number of hops buffered before they are reported to collectors
+    # implementing hop_trace
+    TRACE_SIZE = 1 << 16
     
     def __init__(self, view, collectors):
         """Constructor
@@ -186,51 +288,97 @@ class CollectorProxy(DataCollector):
         self.view = view
         self.collectors = {e: [c for c in collectors if e in type(c).__dict__]
                            for e in self.EVENTS}
+        dispatch = dict((e, _dispatcher([getattr(c, e) for c in self.collectors[e]]))
+                        for e in self.EVENTS if e != 'results')
+        # Session events are handled by the methods of this class, which count
+        # and buffer hops, only if some collector needs hop totals or traces
+        hop_events = ('start_session', 'request_hop', 'content_hop',
+                      'session_hops', 'hop_trace', 'end_session')
+        if self.collectors['session_hops'] or self.collectors['hop_trace']:
+            for e in hop_events:
+                setattr(self, '_' + e, dispatch.pop(e))
+        else:
+            del dispatch['session_hops']
+            del dispatch['hop_trace']
+        # Bound to the instance, dispatchers override the methods of the class
+        self.__dict__.update(dispatch)
+        self._in_session = False
+        # Hops are written to preallocated arrays, reused across reports, as
+        # the ids of their nodes and their flags, and only if some collector
+        # needs them. Proxies only used to collect results have no view.
+        self._trace_len = 0
+        if self.collectors['hop_trace'] and view is not None:
+            self._node_id = view.model.node_id
+            self._trace_u = np.empty(self.TRACE_SIZE, dtype=np.int32)
+            self._trace_v = np.empty(self.TRACE_SIZE, dtype=np.int32)
+            self._trace_content = np.empty(self.TRACE_SIZE, dtype=np.bool_)
+            self._trace_main_path = np.empty(self.TRACE_SIZE, dtype=np.bool_)
+        else:
+            self._trace_hop = _noop
     
     @inheritdoc(DataCollector)
     def start_session(self, timestamp, receiver, content):
-        for c in self.collectors['start_session']:
-            c.start_session(timestamp, receiver, content)
-    
-    @inheritdoc(DataCollector)
-    def cache_hit(self, node):
-        for c in self.collectors['cache_hit']:
-            c.cache_hit(node)
-
-    @inheritdoc(DataCollector)
-    def cache_miss(self, node):
-        for c in self.collectors['cache_miss']:
-            c.cache_miss(node)
-
-    @inheritdoc(DataCollector)
-    def server_hit(self, node):
-        for c in self.collectors['server_hit']:
-            c.server_hit(node)
-    
-    @inheritdoc(DataCollector)
-    def evict_item(self, item):
-        for c in self.collectors['evict_item']:
-            c.evict_item(item)
-    
-    @inheritdoc(DataCollector)
-    def put_item(self, item):
-        for c in self.collectors['put_item']:
-            c.put_item(item)
+        # Sessions left open by strategies are only reported their hops now
+        self._close_session()
+        self._in_session = True
+        self._receiver = receiver
+        self._request_hops = 0
+        self._content_hops = 0
+        self._receiver_hops = None
+        self._start_session(timestamp, receiver, content)
 
     @inheritdoc(DataCollector)
     def request_hop(self, u, v, main_path=True):
-        for c in self.collectors['request_hop']:
-            c.request_hop(u, v, main_path)
+        self._request_hops += 1
+        self._trace_hop(u, v, False, main_path)
+        self._request_hop(u, v, main_path)
     
     @inheritdoc(DataCollector)
     def content_hop(self, u, v, main_path=True):
-        for c in self.collectors['content_hop']:
-            c.content_hop(u, v, main_path)
+        self._content_hops += 1
+        if v == self._receiver and self._receiver_hops is None:
+            self._receiver_hops = self._content_hops
+        self._trace_hop(u, v, True, main_path)
+        self._content_hop(u, v, main_path)
     
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
-        for c in self.collectors['end_session']:
-            c.end_session(success)
+        self._close_session()
+        self._end_session(success)
+
+    def flush(self):
+        """Reports to collectors the hops not reported yet, i.e. the totals
+        of the current session and the buffered trace.
+        
+        Strategies do not close all sessions and the trace is only reported
+        once full, so this must be called once the simulation is over.
+        """
+        self._close_session()
+        if self._trace_len:
+            self._report_trace()
+
+    def _close_session(self):
+        if self._in_session:
+            self._in_session = False
+            self._session_hops(self._request_hops, self._content_hops,
+                               self._receiver_hops)
+
+    def _trace_hop(self, u, v, content, main_path):
+        i = self._trace_len
+        self._trace_u[i] = self._node_id[u]
+        self._trace_v[i] = self._node_id[v]
+        self._trace_content[i] = content
+        self._trace_main_path[i] = main_path
+        self._trace_len = i + 1
+        if self._trace_len == self.TRACE_SIZE:
+            self._report_trace()
+
+    def _report_trace(self):
+        n = self._trace_len
+        self._trace_len = 0
+        # Collectors are given views of the buffers, which they must not keep
+        self._hop_trace(self._trace_u[:n], self._trace_v[:n],
+                        self._trace_content[:n], self._trace_main_path[:n])
     
     @inheritdoc(DataCollector)
     def results(self):
@@ -255,8 +403,21 @@ class LinkLoadCollector(DataCollector):
             the average size of a content is x times the size of a request.
         """
         self.view = view
-        self.req_count = collections.defaultdict(int)
-        self.cont_count = collections.defaultdict(int)
+        # Loads are counted per directed link, in arrays indexed by the
+        # position of the link in the sorted keys u*n + v of all links, where
+        # u and v are the integer ids of its upstream and downstream nodes
+        self.node_id = view.model.node_id
+        self.n = len(self.node_id)
+        topology = view.topology()
+        links = topology.edges()
+        if not topology.is_directed():
+            links += [(v, u) for u, v in links]
+        self.links = np.unique([self.node_id[u]*self.n + self.node_id[v]
+                                for u, v in links])
+        self.req_count = np.zeros(len(self.links), dtype=int)
+        self.cont_count = np.zeros(len(self.links), dtype=int)
+        # Hops between nodes which are not linked are not loaded but counted
+        self.invalid_hops = 0
         if sr <= 0:
             raise ValueError('sr must be positive')
         self.sr = sr
@@ -270,18 +431,28 @@ class LinkLoadCollector(DataCollector):
         self.t_end = timestamp
     
     @inheritdoc(DataCollector)
-    def request_hop(self, u, v, main_path=True):
-        self.req_count[(u, v)] += 1
-    
-    @inheritdoc(DataCollector)
-    def content_hop(self, u, v, main_path=True):
-        self.cont_count[(u, v)] += 1
+    def hop_trace(self, u, v, content, main_path):
+        keys = u.astype(int)*self.n + v
+        links = np.searchsorted(self.links, keys).clip(max=len(self.links) - 1)
+        valid = self.links[links] == keys
+        self.invalid_hops += len(valid) - np.count_nonzero(valid)
+        m = len(self.links)
+        self.req_count += np.bincount(links[valid & ~content], minlength=m)
+        self.cont_count += np.bincount(links[valid & content], minlength=m)
     
     @inheritdoc(DataCollector)
     def results(self):
         duration = self.t_end - self.t_start
-        link_loads = dict((link, (self.req_count[link] + self.sr*self.cont_count[link])/duration) 
-                          for link in self.req_count)
+        label = self.view.node_label
+        if self.invalid_hops:
+            logger.warning('%d hops between nodes which are not linked were '
+                           'not counted in link loads' % self.invalid_hops)
+        # As when counted per hop, only links traversed by requests are loaded
+        used = self.req_count.nonzero()[0]
+        link_loads = dict(((label(k // self.n), label(k % self.n)), (count + self.sr*cont_count)/duration)
+                          for k, count, cont_count in zip(self.links[used].tolist(),
+                                                          self.req_count[used].tolist(),
+                                                          self.cont_count[used].tolist()))
         link_loads_int = dict((link, load)
                               for link, load in link_loads.iteritems()
                               if self.view.link_type(*link) == 'internal')
@@ -356,10 +527,10 @@ class AbsorptionCollector(DataCollector):
                 locs = list(self.view.content_locations(item))
                 if len(locs) > 0:
                     for loc in locs:
-                        if loc in self.view.topology().receivers():
+                        if self.view.topology().is_receiver(loc):
                             print "ERROR: item is not evicted from " + repr(len(locs)) + " caches yet!"
                             print "Node " + repr(loc) + " is in receivers"
-                        elif loc not in self.view.topology().receivers() and loc not in self.view.topology().sources():
+                        elif not self.view.topology().is_receiver(loc) and not self.view.topology().is_source(loc):
                             print "Node " + repr(loc)
     """            
          
@@ -425,6 +596,13 @@ class SatisfactionRateCollector(DataCollector):
 
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.num_sat_req += other.num_sat_req
+        self.server_hits += other.server_hits
+        self.cache_hits += other.cache_hits
+
 @register_data_collector('OVERHEAD')
 class OverheadCollector(DataCollector):
     """Data collector measuring the overhead, i.e., number of data packets
@@ -448,14 +626,11 @@ class OverheadCollector(DataCollector):
         self.is_sat = False
 
     @inheritdoc(DataCollector)
-    def request_hop(self, u, v, main_path=True):
-        self.num_interest += 1
-
-    @inheritdoc(DataCollector)
-    def content_hop(self, u, v, main_path=True):
-        self.num_data += 1
-        self.num_session_data += 1
-        if self.is_sat is False:
+    def session_hops(self, request_hops, content_hops, receiver_hops):
+        self.num_interest += request_hops
+        self.num_data += content_hops
+        self.num_session_data += content_hops
+        if content_hops > 0 and self.is_sat is False:
             self.is_sat = True
             self.satisfied_conn += 1
     
@@ -485,6 +660,13 @@ class OverheadCollector(DataCollector):
                         'MEAN_INTEREST': self.num_interest/self.sess_count})
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.num_data += other.num_data
+        self.num_interest += other.num_interest
+        self.sess_count += other.sess_count
+        self.satisfied_conn += other.satisfied_conn
+
 @register_data_collector('LATENCY')
 class LatencyCollector(DataCollector):
     """Data collector measuring latency, i.e. the delay taken to delivery a
@@ -538,12 +720,13 @@ class LatencyCollector(DataCollector):
             self.hit_indicator = True
 
     @inheritdoc(DataCollector)
-    def content_hop(self, u, v, main_path=True):
-        if not self.content_recvd:
-            self.sess_latency += 1
-        if v == self.receiver:
+    def session_hops(self, request_hops, content_hops, receiver_hops):
+        if receiver_hops is None:
+            self.sess_latency += content_hops
+        else:
+            self.sess_latency += receiver_hops
             self.content_recvd = True
-        if not self.hit_indicator:
+        if content_hops > 0 and not self.hit_indicator:
             self.satisfied_conn += 1
             self.hit_indicator = True
 
@@ -573,6 +756,14 @@ class LatencyCollector(DataCollector):
             results['CDF'] = cdf(self.latency_data) 
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.latency += other.latency
+        self.sess_count += other.sess_count
+        self.satisfied_conn += other.satisfied_conn
+        if self.cdf:
+            self.latency_data.extend(other.latency_data)
+
 
 @register_data_collector('CACHE_HIT_RATIO')
 class CacheHitRatioCollector(DataCollector):
@@ -634,7 +825,7 @@ class CacheHitRatioCollector(DataCollector):
             self.hit_indicator = True
             self.cache_hits += 1
             if self.user_hits:
-                if node in self.view.topology().receivers():
+                if self.view.topology().is_receiver(node):
                     self.num_user_hits += 1
             if self.off_path_hits and node not in self.curr_path:
                 self.off_path_hit_count += 1
@@ -681,6 +872,26 @@ class CacheHitRatioCollector(DataCollector):
             results['PER_NODE_SERVER_HIT_RATIO'] = self.per_node_server_hits
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.cache_hits += other.cache_hits
+        self.serv_hits += other.serv_hits
+        if self.off_path_hits:
+            self.off_path_hit_count += other.off_path_hit_count
+        if self.user_hits:
+            self.num_user_hits += other.num_user_hits
+        if self.per_node:
+            for v, hits in other.per_node_cache_hits.iteritems():
+                self.per_node_cache_hits[v] += hits
+            for v, hits in other.per_node_server_hits.iteritems():
+                self.per_node_server_hits[v] += hits
+        if self.cont_hits:
+            for content, hits in other.cont_cache_hits.iteritems():
+                self.cont_cache_hits[content] += hits
+            for content, hits in other.cont_serv_hits.iteritems():
+                self.cont_serv_hits[content] += hits
+
 @register_data_collector('PATH_STRETCH')
 class PathStretchCollector(DataCollector):
     """Collector measuring the path stretch, i.e. the ratio between the actual
@@ -719,12 +930,9 @@ class PathStretchCollector(DataCollector):
         self.sess_count += 1
 
     @inheritdoc(DataCollector)
-    def request_hop(self, u, v, main_path=True):
-        self.req_path_len += 1
-    
-    @inheritdoc(DataCollector)
-    def content_hop(self, u, v, main_path=True):
-        self.cont_path_len += 1
+    def session_hops(self, request_hops, content_hops, receiver_hops):
+        self.req_path_len += request_hops
+        self.cont_path_len += content_hops
     
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
@@ -753,6 +961,17 @@ class PathStretchCollector(DataCollector):
             results['CDF_REQUEST'] = cdf(self.req_stretch_data)
             results['CDF_CONTENT'] = cdf(self.cont_stretch_data)
         return results
+
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.mean_req_stretch += other.mean_req_stretch
+        self.mean_cont_stretch += other.mean_cont_stretch
+        self.mean_stretch += other.mean_stretch
+        if self.cdf:
+            self.req_stretch_data.extend(other.req_stretch_data)
+            self.cont_stretch_data.extend(other.cont_stretch_data)
+            self.stretch_data.extend(other.stretch_data)
     
 
 @register_data_collector('CONTROL_PLANE')
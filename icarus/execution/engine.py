@@ -4,15 +4,36 @@ The simulation engine, given the parameters according to which a single
 experiments needs to be run, instantiates all the required classes and executes
 the experiment by iterating through the event provided by an event generator
 and providing them to a strategy instance. 
+
+The measured phase of an experiment can also be split into shards, i.e.
+independent sub-runs starting from the state reached at the end of the warmup
+phase, each processing an equal part of the measured requests drawn with a
+different seed. Shards can run in parallel and their collectors are then
+merged into the results of the whole experiment.
+
+If the workload can generate its warmup and measured phases separately, the
+state reached at the end of the warmup phase can be stored in a cache of
+warmup snapshots (see icarus.execution.snapshot), from which experiments
+sharing the same warmup phase restore it instead of simulating it again.
+
+The execution of an experiment can be profiled with a Profiler (see
+icarus.execution.profiling), whose measurements are added to its results.
 """
-from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy
+from icarus.execution import NetworkModel, NetworkView, NetworkController, \
+                             CollectorProxy, Profiler
+from icarus.execution.profiling import CONTROLLER_OPERATIONS, VIEW_OPERATIONS
 from icarus.registry import DATA_COLLECTOR, STRATEGY
 
 
-__all__ = ['exec_experiment']
+__all__ = [
+    'exec_experiment',
+    'exec_shard',
+    'merge_shards'
+           ]
 
 
-def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy):
+def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy,
+                    snapshots=None, snapshot_key=None, profiler=None):
     """Execute the simulation of a specific scenario.
     
     Parameters
@@ -37,15 +58,119 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         The collectors to be used. It is a dictionary in which keys are the
         names of collectors to use and values are dictionaries of attributes
         for the collector they refer to.
+    warmup_strategy : tree
+        Strategy definition of the warmup phase
+    snapshots : WarmupSnapshotCache, optional
+        The cache of warmup snapshots. If specified and the workload supports
+        it, the state at the end of the warmup phase is restored from the
+        snapshot *snapshot_key* or, if not stored yet, stored in it
+    snapshot_key : str, optional
+        The key of the warmup phase of the experiment (see
+        icarus.execution.snapshot.warmup_key)
+    profiler : Profiler, optional
+        If specified, the execution of the experiment is profiled with it and
+        its measurements are added to the results as the PERF subtree
          
     Returns
     -------
     results : Tree
         A tree with the aggregated simulation results from all collectors
     """
+    collectors_inst = simulate(topology, workload, netconf, strategy,
+                               cache_policy, collectors, warmup_strategy,
+                               snapshots, snapshot_key, profiler)
+    if profiler is None:
+        return CollectorProxy(None, collectors_inst).results()
+    profiler.start('RESULTS')
+    results = CollectorProxy(None, collectors_inst).results()
+    profiler.stop()
+    results[profiler.name] = profiler.results()
+    return results
+
+
+def exec_shard(topology, workload, netconf, strategy, cache_policy, collectors,
+               warmup_strategy, shard, n_shards, snapshots=None, snapshot_key=None,
+               profiler=None):
+    """Execute the simulation of a shard of the measured phase of a scenario.
+    
+    The warmup phase is executed in full, or restored from its snapshot, then
+    only the part of the measured phase belonging to the shard, as generated
+    by the workload.
+    
+    Parameters
+    ----------
+    topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy, snapshots, snapshot_key, profiler
+        See exec_experiment. The workload must support sharding, i.e. have a
+        *shard* method
+    shard : int
+        The index of the shard, between 0 and *n_shards - 1*
+    n_shards : int
+        The number of shards of the measured phase
+    
+    Returns
+    -------
+    collectors : list
+        The data collector instances, which can be merged with those of the
+        other shards of the experiment with merge_shards, followed by the
+        profiler, if specified
+    """
+    if not hasattr(workload, 'shard'):
+        raise ValueError('Workload %s does not support sharding'
+                         % type(workload).__name__)
+    workload.shard(shard, n_shards)
+    collectors_inst = simulate(topology, workload, netconf, strategy, cache_policy,
+                               collectors, warmup_strategy, snapshots, snapshot_key,
+                               profiler)
+    if profiler is None:
+        return collectors_inst
+    return collectors_inst + [profiler]
+
+
+def merge_shards(shards):
+    """Merge the collectors of all shards of an experiment and return the
+    results of the experiment.
+    
+    Parameters
+    ----------
+    shards : list
+        The lists of collectors returned by exec_shard for each shard
+    
+    Returns
+    -------
+    results : Tree
+        A tree with the aggregated simulation results from all collectors, as
+        returned by exec_experiment
+    """
+    merged = shards[0]
+    for collectors_inst in shards[1:]:
+        others = dict((c.name, c) for c in collectors_inst)
+        for collector in merged:
+            collector.merge(others[collector.name])
+    return CollectorProxy(None, merged).results()
+
+
+def simulate(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy,
+             snapshots=None, snapshot_key=None, profiler=None):
+    """Execute the simulation of a scenario and return its collectors.
+    
+    See exec_experiment for a description of the parameters.
+    
+    Returns
+    -------
+    collectors : list
+        The data collector instances
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    # The network model computes shortest paths, unless provided in netconf
+    profiler.start('PATHS')
     model = NetworkModel(topology, cache_policy, **netconf)
     view = NetworkView(model)
     controller = NetworkController(model)
+    # Instrumented before strategies are created, in case they keep
+    # references to their methods
+    profiler.instrument(controller, 'controller', CONTROLLER_OPERATIONS)
+    profiler.instrument(view, 'view', VIEW_OPERATIONS)
     
     collectors_inst = [DATA_COLLECTOR[name](view, **params)
                        for name, params in collectors.items()]
@@ -58,6 +183,31 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     warmup_strategy_args = {k: v for k, v in warmup_strategy.iteritems() if k != 'name'}
     strategy_inst = STRATEGY[strategy_name](view, controller, **strategy_args)
     warmup_strategy_inst = STRATEGY[warmup_strategy_name](view, controller, **warmup_strategy_args)
+    profiler.instrument(strategy_inst, 'strategy')
+    profiler.instrument(warmup_strategy_inst, 'strategy')
+    
+    profiler.start('WARMUP')
+    if hasattr(workload, 'warmup'):
+        if snapshots is None:
+            for time, event in workload.warmup():
+                warmup_strategy_inst.process_event(time, **event)
+        else:
+            # Other processes needing the same snapshot wait until it is
+            # stored, rather than simulating the same warmup phase
+            with snapshots.lock(snapshot_key):
+                if snapshot_key in snapshots:
+                    snapshots.load(snapshot_key, model, workload)
+                else:
+                    for time, event in workload.warmup():
+                        warmup_strategy_inst.process_event(time, **event)
+                    snapshots.store(snapshot_key, model, workload)
+        profiler.start('MEASURED')
+        for time, event in workload.measured():
+            strategy_inst.process_event(time, **event)
+        # Report the hops of the last session, if left open by the strategy
+        collector.flush()
+        profiler.stop()
+        return collectors_inst
     
     counter = 0
     once = False
@@ -69,6 +219,9 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
             if once is False:
                 print "Warmup is over at time: " + repr(time)
                 once = True
+                profiler.start('MEASURED')
             strategy_inst.process_event(time, **event)
 
-    return collector.results()
+    collector.flush()
+    profiler.stop()
+    return collectors_inst
@@ -3,14 +3,16 @@
 """
 import logging
 
+import numpy as np
 import networkx as nx
 import fnss
 
 from icarus.registry import CACHE_POLICY
-from icarus.models import keyval_cache
+from icarus.models import keyval_cache, InfiniteCache
 from icarus.util import path_links
 
 __all__ = [
+    'ShortestPathOracle',
     'NetworkModel',
     'NetworkView',
     'NetworkController'
@@ -24,6 +26,237 @@ def symmetrify_paths(shortest_paths):
             shortest_paths[u][v] = list(reversed(shortest_paths[v][u]))
     return shortest_paths
 
+
+class ShortestPathOracle(object):
+    """Oracle answering shortest path queries between pairs of nodes.
+
+    Paths returned by the oracle are symmetric, i.e. the path from *t* to *s*
+    is the reverse of the path from *s* to *t*, and are the same paths that
+    would be returned by
+    ``symmetrify_paths(nx.all_pairs_dijkstra_path(topology))``.
+
+    The oracle can operate in three modes, trading memory for speed:
+
+     * *eager*: all pairs shortest paths are computed when the oracle is
+       created and stored as a dict of dicts of lists of nodes. This is the
+       fastest mode but requires O(N^2) lists of nodes.
+     * *lazy*: shortest paths from a node are computed with a single-source
+       Dijkstra the first time they are queried and memoized. Only nodes
+       actually originating or terminating paths (typically receivers and
+       sources) pay the cost of path computation and storage.
+     * *predecessor*: like *lazy*, but only a row of an N x N matrix of
+       predecessors is stored for each single-source run. Paths are rebuilt on
+       each query by walking the predecessors.
+
+    The oracle can be indexed as a dict of dicts, i.e.
+    ``oracle[s][t] == oracle.shortest_path(s, t)``.
+
+    Depending on the mode, returned paths may be the lists stored by the
+    oracle, so they must not be modified, e.g. reversed in place, otherwise
+    later queries return the modified paths. Use ``path[::-1]`` instead.
+    """
+
+    modes = ('eager', 'lazy', 'predecessor')
+
+    def __init__(self, topology, mode='eager', weight='weight',
+                 predecessors=None, node_label=None):
+        """Constructor
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology object
+        mode : ("eager" | "lazy" | "predecessor"), optional
+            The mode of operation of the oracle
+        weight : str, optional
+            The edge attribute used as link weight
+        predecessors : 2-d array, optional
+            A complete predecessor matrix, as returned by the predecessors
+            method of another oracle. If specified, node_label must be
+            specified too and paths are built by walking the matrix rather
+            than computed with Dijkstra, in any mode. The matrix is never
+            modified, so it can be a read-only memory-mapped array. In
+            *eager* mode all paths are still built and stored by the oracle,
+            while in *predecessor* mode only the matrix is used
+        node_label : list, optional
+            The node order of the rows and columns of predecessors
+        """
+        if mode not in self.modes:
+            raise ValueError('mode must be one of %s' % str(self.modes))
+        if predecessors is not None and node_label is None:
+            raise ValueError('predecessors require node_label')
+        self.mode = mode
+        self.topology = topology
+        self.weight = weight
+        if node_label is None:
+            node_label = self.node_order(topology)
+        self.node_label = list(node_label)
+        self.node_id = {v: i for i, v in enumerate(self.node_label)}
+        self._precomputed = predecessors is not None
+        if predecessors is not None:
+            self._pred = predecessors
+            self._pred_done = np.ones(len(self.node_label), dtype=bool)
+        elif mode == 'predecessor':
+            n = len(self.node_label)
+            self._pred = np.empty((n, n), dtype=np.int32)
+            self._pred_done = np.zeros(n, dtype=bool)
+        else:
+            self._pred = None
+        if mode == 'eager':
+            if not self._precomputed:
+                self._paths = symmetrify_paths(nx.all_pairs_dijkstra_path(topology,
+                                                                          weight=weight))
+            else:
+                self._paths = {s: self._single_source(s) for s in self.node_label}
+        elif mode == 'lazy':
+            self._paths = {}
+
+    @staticmethod
+    def node_order(topology):
+        """Return the default node order of an oracle of a topology
+
+        Paths between two nodes are computed from the node coming later in
+        the node order. This is the same choice made by symmetrify_paths when
+        applied to all pairs shortest paths, as long as the node order is the
+        iteration order of a dict built by inserting nodes one by one, like
+        nx.all_pairs_dijkstra_path does. It therefore depends on the
+        iteration order of the nodes of the topology.
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology object
+
+        Returns
+        -------
+        node_label : list
+            The nodes of the topology, in order
+        """
+        order = {}
+        for v in topology:
+            order[v] = None
+        return list(order)
+
+    def _single_source(self, root):
+        if not self._precomputed:
+            return nx.single_source_dijkstra_path(self.topology, root,
+                                                  weight=self.weight)
+        # Paths from root as returned by shortest_path, i.e. built from the
+        # row of the node with the higher id
+        i = self.node_id[root]
+        row = self._pred[i]
+        return {t: self._pred_path(i, j) for j, t in enumerate(self.node_label)
+                if row[j] >= 0}
+
+    def _pred_row(self, r):
+        if not self._pred_done[r]:
+            node_id = self.node_id
+            row = self._pred[r]
+            row.fill(-1)
+            for v, path in self._single_source(self.node_label[r]).iteritems():
+                row[node_id[v]] = node_id[path[-2]] if len(path) > 1 else r
+            self._pred_done[r] = True
+        return self._pred[r]
+
+    def predecessors(self):
+        """Return the complete predecessor matrix of the topology.
+
+        Element (i, j) of the matrix is the id of the node preceding node j
+        on the path from node i to node j, or -1 if j is not reachable from
+        i. Paths between two nodes are only built from the row of the node
+        with the higher id. Node ids are positions in the node_label
+        attribute.
+
+        This method can only be called in *predecessor* mode, or if the
+        oracle was created from a predecessor matrix, and computes all the
+        rows not computed yet.
+
+        Returns
+        -------
+        predecessors : 2-d array
+            The predecessor matrix
+        """
+        if self._pred is None:
+            raise ValueError('predecessors are not available in %s mode' % self.mode)
+        for r in range(len(self.node_label)):
+            self._pred_row(r)
+        return self._pred
+
+    def shortest_path(self, s, t):
+        """Return the shortest path from *s* to *t*
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        shortest_path : list
+            List of nodes of the shortest path (origin and destination
+            included)
+        """
+        if self.mode == 'eager':
+            return self._paths[s][t]
+        i, j = self.node_id[s], self.node_id[t]
+        if self.mode == 'lazy':
+            if i >= j:
+                if s not in self._paths:
+                    self._paths[s] = self._single_source(s)
+                return self._paths[s][t]
+            if t not in self._paths:
+                self._paths[t] = self._single_source(t)
+            return list(reversed(self._paths[t][s]))
+        return self._pred_path(i, j)
+
+    def _pred_path(self, i, j):
+        # Walk from the non-root node towards the root
+        r, x = (i, j) if i >= j else (j, i)
+        pred = self._pred_row(r).item
+        if pred(x) < 0:
+            raise KeyError(self.node_label[x])
+        path = [x]
+        while x != r:
+            x = pred(x)
+            path.append(x)
+        label = self.node_label
+        path = [label[v] for v in path]
+        if i >= j:
+            path.reverse()
+        return path
+
+    def __getitem__(self, s):
+        if self.mode == 'eager':
+            return self._paths[s]
+        if s not in self.node_id:
+            raise KeyError(s)
+        return _ShortestPathRow(self, s)
+
+    def __iter__(self):
+        return iter(self.node_label)
+
+    def __len__(self):
+        return len(self.node_label)
+
+    def __contains__(self, s):
+        return s in self.node_id
+
+
+class _ShortestPathRow(object):
+    """Paths from a given node, supporting the oracle[s][t] notation"""
+
+    __slots__ = ['oracle', 'source']
+
+    def __init__(self, oracle, source):
+        self.oracle = oracle
+        self.source = source
+
+    def __getitem__(self, t):
+        return self.oracle.shortest_path(self.source, t)
+
+
 class NetworkView(object):
     
     def __init__(self, model):
@@ -54,7 +287,14 @@ class NetworkView(object):
         nodes : set
             A set of all nodes currently storing the given content
         """
-        loc = set(v for v in self.model.cache if self.model.cache[v].has(k))
+        loc = set()
+        caches = self.model.content_caches.get(k)
+        if caches:
+            # The index may list caches which dropped the content on their
+            # own, e.g. because it expired, which are removed from it
+            stale = [v for v in caches if not self.model.cache[v].has(k)]
+            caches.difference_update(stale)
+            loc.update(caches)
         loc.add(self.content_source(k))
         return loc
     
@@ -87,7 +327,7 @@ class NetworkView(object):
         -------
         shortest_path : list
             List of nodes of the shortest path (origin and destination
-            included)
+            included). It must not be modified (see ShortestPathOracle)
         """
         return self.model.shortest_path[s][t]
     
@@ -96,8 +336,9 @@ class NetworkView(object):
         
         Return
         ------
-        all_pairs_shortest_paths : dict of lists
-            Shortest paths between all pairs
+        all_pairs_shortest_paths : dict of lists or ShortestPathOracle
+            Shortest paths between all pairs. In both cases, the path from s
+            to t can be accessed as all_pairs_shortest_paths[s][t]
         """
         return self.model.shortest_path
 
@@ -118,7 +359,8 @@ class NetworkView(object):
         link_type : str
             The link type
         """
-        return self.model.link_type[(u, v)]
+        model = self.model
+        return model.link_type_table[model.node_id[u]][model.node_id[v]]
     
     def link_delay(self, u, v):
         """Return the delay of link *(u, v)*.
@@ -135,8 +377,43 @@ class NetworkView(object):
         delay : float
             The link delay
         """
-        return self.model.link_delay[(u, v)]
-    
+        model = self.model
+        return model.link_delay_table[model.node_id[u]][model.node_id[v]]
+
+    def node_id(self, v):
+        """Return the integer identifier of node *v*.
+
+        Node identifiers are dense, i.e. they range from 0 to N - 1, where N
+        is the number of nodes of the topology, and can be used to index
+        id-based tables of the network model.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The node label
+
+        Returns
+        -------
+        node_id : int
+            The integer identifier of the node
+        """
+        return self.model.node_id[v]
+
+    def node_label(self, i):
+        """Return the label of the node whose integer identifier is *i*.
+
+        Parameters
+        ----------
+        i : int
+            The integer identifier of the node
+
+        Returns
+        -------
+        v : any hashable type
+            The node label
+        """
+        return self.model.node_label[i]
+
     def topology(self):
         """Return the network topology
         
@@ -303,7 +580,8 @@ class NetworkModel(object):
     """Models the internal state of the network
     """
     
-    def __init__(self, topology, cache_policy, shortest_path=None):
+    def __init__(self, topology, cache_policy, shortest_path=None,
+                 shortest_path_mode='eager'):
         """Constructors
         
         Parameters
@@ -316,6 +594,9 @@ class NetworkModel(object):
             policy
         shortest_path : dict of dict, optional
             The all-pair shortest paths of the network
+        shortest_path_mode : ("eager" | "lazy" | "predecessor"), optional
+            The mode of the shortest path oracle used if shortest_path is not
+            provided. See ShortestPathOracle for details
         """
         # Filter inputs
         if not isinstance(topology, fnss.Topology):
@@ -324,7 +605,7 @@ class NetworkModel(object):
         
         # Shortest paths of the network
         self.shortest_path = shortest_path if shortest_path is not None \
-                             else symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+                             else ShortestPathOracle(topology, shortest_path_mode)
         
         # Network topology
         self.topology = topology
@@ -333,6 +614,9 @@ class NetworkModel(object):
         # dict of location of contents keyed by content ID
         self.content_source = {}
         
+        # Dictionary mapping each source to the set of contents it serves
+        self.source_contents = {}
+        
         # Dictionary of cache sizes keyed by node
         self.cache_size = {}
         
@@ -367,6 +651,7 @@ class NetworkModel(object):
                     contents = stack_props['contents']
                     for content in contents:
                         self.content_source[content] = node
+                    self.source_contents[node] = set(contents)
             # Onur:
             elif stack_name == 'receiver':
                 if 'cache_size' in stack_props:
@@ -392,14 +677,66 @@ class NetworkModel(object):
                     
         policy_name = cache_policy['name']
         policy_args = {k: v for k, v in cache_policy.items() if k != 'name'}
+        infinite_cache_nodes = []
+        if policy_name in InfiniteCache.equivalent_policies and self.content_source \
+                and all(isinstance(k, (int, long)) and k >= 0 for k in self.content_source):
+            infinite_cache_nodes = [v for v, size in self.cache_size.iteritems()
+                                    if size >= len(self.content_source)]
         # The actual cache and RSN objects storing the content
 
         self.cache = {node: CACHE_POLICY[policy_name](self.cache_size[node], **policy_args)
-                          for node in self.cache_size}
+                          for node in self.cache_size
+                          if node not in infinite_cache_nodes}
+        # Caches able to store the whole catalogue never evict, whatever their
+        # policy, so they are replaced by a compact non-evicting cache
+        for node in infinite_cache_nodes:
+            self.cache[node] = InfiniteCache(self.cache_size[node],
+                                             n_contents=max(self.content_source))
+        if infinite_cache_nodes:
+            logger.info('Using infinite caches at %d nodes storing the whole '
+                        'catalogue' % len(infinite_cache_nodes))
         
         # RSN and cache must have the same cache eviction policy
         self.rsn = {node: keyval_cache(CACHE_POLICY[policy_name](size, **policy_args))
                         for node, size in self.rsn_size.iteritems()}
+        
+        # Dense integer identifiers of nodes, used by collectors to count
+        # per-hop events in arrays rather than in dicts keyed by labels.
+        # Labels are only translated back when results are reported.
+        self.node_label = list(topology.nodes_iter())
+        self.node_id = {v: i for i, v in enumerate(self.node_label)}
+        # Link tables are lists of rows indexed by the id of the upstream
+        # node, each row mapping the id of a neighbor to the attribute of the
+        # link towards it, so that looking up a link does not build and hash
+        # a tuple of labels. Caches and RSN tables are looked up by label,
+        # which only takes a single dict lookup.
+        n = len(self.node_label)
+        self.link_type_table = [{} for _ in range(n)]
+        for (u, v), link_type in self.link_type.iteritems():
+            self.link_type_table[self.node_id[u]][self.node_id[v]] = link_type
+        self.link_delay_table = [{} for _ in range(n)]
+        for (u, v), delay in self.link_delay.iteritems():
+            self.link_delay_table[self.node_id[u]][self.node_id[v]] = delay
+        
+        # Reverse index of the caches storing each content, keyed by content
+        self.content_caches = {}
+        self.index_content_locations()
+    
+    def index_content_locations(self):
+        """Rebuild the reverse index of the caches storing each content from
+        the content of the caches.
+        
+        The index is updated by the controller as contents are inserted in
+        and removed from caches, so it only needs to be rebuilt if caches are
+        modified otherwise, e.g. when their state is restored. Since caches
+        may also drop contents on their own, e.g. when they expire, it may
+        list caches which no longer store a content, which are ignored by
+        NetworkView.content_locations.
+        """
+        self.content_caches = {}
+        for v, cache in self.cache.iteritems():
+            for k in cache.dump():
+                self.content_caches.setdefault(k, set()).add(v)
 
 
 
@@ -417,6 +754,9 @@ class NetworkController(object):
         self.session = None
         self.model = model
         self.collector = None
+        # Whether events of the current session are reported to the collector,
+        # tested once per session rather than on each event
+        self._log = False
     
     def attach_collector(self, collector):
         """Attaches a data collector to which all events will be reported.
@@ -432,6 +772,7 @@ class NetworkController(object):
         """Detaches the data collector.
         """
         self.collector = None
+        self._log = False
     
     def start_session(self, timestamp, receiver, content, log, counts=None):
         """Instruct the controller to start a new session (i.e. the retrieval
@@ -453,9 +794,10 @@ class NetworkController(object):
                             receiver=receiver,
                             content=content,
                             log=log)
-        if counts is None and self.collector is not None and self.session['log']:
+        self._log = log and self.collector is not None
+        if counts is None and self._log:
             self.collector.start_session(timestamp, receiver, content)
-        elif self.collector is not None and self.session['log']:
+        elif self._log:
             self.collector.start_session(timestamp, receiver, content, counts) 
     
     def forward_request_path(self, s, t, path=None, main_path=True):
@@ -502,7 +844,7 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         """
-        if self.collector is not None and self.session['log']:
+        if self._log:
             self.collector.request_hop(u, v, main_path)
     
     def forward_content_hop(self, u, v, main_path=True):
@@ -515,7 +857,7 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         """
-        if self.collector is not None and self.session['log']:
+        if self._log:
             self.collector.content_hop(u, v, main_path)
     
     def put_content(self, node):
@@ -539,12 +881,17 @@ class NetworkController(object):
         if node in self.model.cache:
             # if self.session['log']: ONUR: do not check this condition so that 
             # we can report put_item events to the collector during warmup phase
-            if not self.model.cache[node].has(self.session['content']) and self.session['log']:
+            if self._log and not self.model.cache[node].has(self.session['content']):
                 self.collector.put_item(self.session['content'])
 
             item = self.model.cache[node].put(self.session['content'])
+            # The node is indexed even if the cache policy did not insert the
+            # content, which is ignored by NetworkView.content_locations
+            self.model.content_caches.setdefault(self.session['content'], set()).add(node)
+            if item is not None:
+                self._unindex_content(item, node)
 
-            if item is not None and self.session['log']:
+            if item is not None and self._log:
                 self.collector.evict_item(item)
 
         return item
@@ -567,16 +914,15 @@ class NetworkController(object):
         """
         if node in self.model.cache:
             cache_hit = self.model.cache[node].get(self.session['content'])
-            if cache_hit:
-                if self.session['log']:
+            if self._log:
+                if cache_hit:
                     self.collector.cache_hit(node)
-            else:
-                if self.session['log']:
+                else:
                     self.collector.cache_miss(node)
             return cache_hit
-        name, props = fnss.get_stack(self.model.topology, node)
-        if name == 'source' and self.session['content'] in props['contents']:
-            if self.collector is not None and self.session['log']:
+        if node in self.model.source_contents \
+                and self.session['content'] in self.model.source_contents[node]:
+            if self._log:
                 self.collector.server_hit(node)
             return True
         else:
@@ -597,16 +943,15 @@ class NetworkController(object):
         """
         if node in self.model.cache:
             cache_hit = self.model.cache[node].get(self.session['content'])
-            if cache_hit:
-                if self.session['log']:
+            if self._log:
+                if cache_hit:
                     self.collector.cache_hit(node)
-            else:
-                if self.session['log']:
+                else:
                     self.collector.cache_miss(node)
             return cache_hit
-        name, props = fnss.get_stack(self.model.topology, node)
-        if name == 'source' and self.session['content'] in props['contents']:
-            if self.collector is not None and self.session['log']:
+        if node in self.model.source_contents \
+                and self.session['content'] in self.model.source_contents[node]:
+            if self._log:
                 self.collector.server_hit(node)
             return True
         else:
@@ -629,8 +974,9 @@ class NetworkController(object):
         """
 
         item = self.model.cache[node].remove(content)
+        self._unindex_content(content, node)
 
-        if self.collector is not None and self.session['log']:
+        if self._log:
             self.collector.evict_item(content)
         else:
             print "ERROR: in remove_content_at_node, this should not happen!"
@@ -651,7 +997,16 @@ class NetworkController(object):
             *True* if the entry was in the cache, *False* if it was not.
         """
         if node in self.model.cache:
+            self._unindex_content(self.session['content'], node)
             return self.model.cache[node].remove(self.session['content'])
+    
+    def _unindex_content(self, content, node):
+        """Remove a node from the index of the caches storing a content"""
+        caches = self.model.content_caches.get(content)
+        if caches is not None:
+            caches.discard(node)
+            if not caches:
+                del self.model.content_caches[content]
 
     def put_rsn(self, node, next_hop, content=None):
         """Store forwarding information in the Recently Served Name (RSN) table
@@ -751,9 +1106,10 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
-        if self.collector is not None and self.session['log']:
+        if self._log:
             self.collector.end_session(success)
         self.session = None
+        self._log = False
 
     def remove_link(self, u, v):
         raise NotImplementedError('Method not yet implemented')
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of the precomputations that only depend on the topology.
+
+Building a topology, computing its shortest paths and the centrality of its
+nodes only depends on the topology factory and its parameters, which are
+normally identical across many experiments of a campaign. This module stores
+the results of these computations on disk, in a directory named after a hash
+of the factory name and parameters, so that they are computed only once per
+campaign and then loaded by all experiments and all worker processes.
+
+Each entry of the cache is a directory storing:
+ * *topology.pickle*: the pickled topology, as returned by the factory, and
+   its node order. Since unpickling a topology may change the iteration order
+   of its nodes and neighbors, which determines which of equal cost paths are
+   selected and the order in which nodes are processed, the topology is
+   rebuilt with its factory when available. The stored copy is only used if
+   the factory does not rebuild a topology with the same node order
+ * *predecessors.npy*: the predecessor matrix of the topology (see
+   ShortestPathOracle.predecessors), which is memory-mapped read-only when
+   loaded, so that all processes reading it share the same physical memory.
+   Shortest path oracles of any mode are built from it
+ * *centrality.npz*: the vectors of all centrality metrics of the nodes (see
+   icarus.scenarios.centrality), in node order
+"""
+import os
+import shutil
+import logging
+import tempfile
+import cPickle as pickle
+
+import numpy as np
+
+from icarus.util import params_digest
+from icarus.execution.network import ShortestPathOracle
+from icarus.scenarios.centrality import CENTRALITY_METRICS, centrality as centrality_of
+
+
+__all__ = [
+    'PrecomputationCache',
+    'precomputation_key'
+           ]
+
+
+logger = logging.getLogger('orchestration')
+
+# Version of the format of cache entries. It is part of the key, so that
+# changes to the format do not cause stale entries to be loaded
+FORMAT_VERSION = 1
+
+
+def precomputation_key(name, params):
+    """Return the key identifying the precomputations of a topology
+
+    Parameters
+    ----------
+    name : str
+        The name of the topology factory
+    params : dict
+        The parameters passed to the topology factory
+
+    Returns
+    -------
+    key : str
+        The hexadecimal SHA-1 digest of the factory name and parameters
+    """
+    return params_digest((FORMAT_VERSION, name, params))
+
+
+class PrecomputationCache(object):
+    """Content-addressed on-disk cache of topologies, shortest paths and node
+    centralities.
+
+    Entries are written atomically and never modified, so the same cache
+    directory can be safely shared by concurrent processes. If two processes
+    compute the same entry at the same time, only one of them is kept.
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory where cache entries are stored. It is created if it
+            does not exist
+        """
+        self.directory = os.path.abspath(directory)
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Created concurrently by another process
+                if not os.path.isdir(self.directory):
+                    raise
+
+    def path(self, key):
+        """Return the path of the directory of a cache entry
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry
+
+        Returns
+        -------
+        path : str
+            The path of the entry directory
+        """
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self.path(key))
+
+    def store(self, key, topology):
+        """Compute all precomputations of a topology and store them
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry
+        topology : Topology
+            The topology, as returned by its factory
+        """
+        oracle = ShortestPathOracle(topology, 'predecessor')
+        predecessors = oracle.predecessors()
+        centrality = {}
+        for metric in CENTRALITY_METRICS:
+            values = centrality_of(topology, metric)
+            centrality[metric] = np.array([values[v] for v in oracle.node_label])
+        tmp = tempfile.mkdtemp(prefix='.%s.' % key, dir=self.directory)
+        # Centralities are stored separately, not within the topology
+        metrics = topology.graph.pop('centrality')
+        try:
+            with open(os.path.join(tmp, 'topology.pickle'), 'wb') as f:
+                pickle.dump((topology, oracle.node_label), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            np.save(os.path.join(tmp, 'predecessors.npy'), predecessors)
+            np.savez(os.path.join(tmp, 'centrality.npz'), **centrality)
+            os.rename(tmp, self.path(key))
+        except OSError:
+            # The entry has been stored concurrently by another process
+            if key not in self:
+                raise
+        finally:
+            topology.graph['centrality'] = metrics
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp)
+
+    def load(self, key, shortest_path_mode='predecessor', topology=None):
+        """Load a cache entry
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry
+        shortest_path_mode : ("eager" | "lazy" | "predecessor"), optional
+            The mode of the returned shortest path oracle (see
+            ShortestPathOracle). In all modes paths are built from the stored
+            predecessor matrix rather than computed. Only in *predecessor*
+            mode, the default, they are built on demand, so that the process
+            does not keep its own copy of them besides the shared matrix
+        topology : Topology, optional
+            The topology rebuilt by its factory, used instead of the stored
+            copy if it has the same node order
+
+        Returns
+        -------
+        topology : Topology
+            A new copy of the topology, which can be freely modified
+        shortest_path : ShortestPathOracle
+            The shortest path oracle of the topology, backed by a read-only
+            memory-mapped predecessor matrix
+        centrality : dict
+            Dictionary of centrality metrics, each a dict keyed by node
+        """
+        path = self.path(key)
+        with open(os.path.join(path, 'topology.pickle'), 'rb') as f:
+            stored, node_label = pickle.load(f)
+        if topology is None or ShortestPathOracle.node_order(topology) != node_label:
+            if topology is not None:
+                logger.warning('Topology %s is not rebuilt identically by its '
+                               'factory, using the stored copy' % key)
+            topology = stored
+        predecessors = np.load(os.path.join(path, 'predecessors.npy'), mmap_mode='r')
+        shortest_path = ShortestPathOracle(topology, shortest_path_mode,
+                                           predecessors=predecessors,
+                                           node_label=node_label)
+        with np.load(os.path.join(path, 'centrality.npz')) as data:
+            centrality = {name: dict(zip(node_label, data[name].tolist()))
+                          for name in data.files}
+        return topology, shortest_path, centrality
+
+    def prepare(self, name, params, factory):
+        """Build and store the precomputations of a topology, if not cached
+        yet, without loading them
+
+        Parameters
+        ----------
+        name : str
+            The name of the topology factory
+        params : dict
+            The parameters passed to the topology factory
+        factory : callable
+            The topology factory
+
+        Returns
+        -------
+        key : str
+            The key of the entry
+        """
+        key = precomputation_key(name, params)
+        if key not in self:
+            logger.info('Precomputing topology %s (key %s)' % (name, key))
+            self.store(key, factory(**params))
+        return key
+
+    def get(self, name, params, factory, shortest_path_mode='predecessor'):
+        """Return the precomputations of a topology, building and storing them
+        if not cached yet
+
+        Parameters
+        ----------
+        name : str
+            The name of the topology factory
+        params : dict
+            The parameters passed to the topology factory
+        factory : callable
+            The topology factory
+        shortest_path_mode : ("eager" | "lazy" | "predecessor"), optional
+            The mode of the returned shortest path oracle (see *load*)
+
+        Returns
+        -------
+        topology : Topology
+            A new topology, built by the factory, which can be freely modified
+        shortest_path : ShortestPathOracle
+            The shortest path oracle of the topology
+        centrality : dict
+            Dictionary of centrality metrics, each a dict keyed by node
+        """
+        key = self.prepare(name, params, factory)
+        return self.load(key, shortest_path_mode, factory(**params))
@@ -0,0 +1,164 @@
+"""Profiling of the execution of experiments.
+
+If the PROFILE setting is enabled, the execution of each experiment is
+profiled with a Profiler and its measurements are stored in the PERF subtree
+of the results of the experiment, so that they can be compared across runs.
+"""
+from __future__ import division
+import time
+import inspect
+import functools
+import collections
+
+from icarus.util import Tree
+
+__all__ = ['Profiler']
+
+
+# Methods of the network controller and view whose calls are counted as cache
+# and RSN operations
+CONTROLLER_OPERATIONS = ('get_content', 'has_content', 'put_content',
+                         'remove_content', 'remove_content_at_node',
+                         'put_rsn', 'get_rsn', 'remove_rsn', 'invalidate_trail')
+VIEW_OPERATIONS = ('cache_lookup', 'rsn_lookup', 'content_locations')
+
+
+class Profiler(object):
+    """Profiler of the execution of an experiment.
+
+    The execution of an experiment is divided in phases, i.e. TOPOLOGY,
+    WORKLOAD, PLACEMENT, PATHS, WARMUP, MEASURED and RESULTS, whose wall-clock
+    time is measured. Each phase ends when the next one starts.
+
+    The calls of the methods of strategies, of the cache and RSN operations
+    of the network controller and of the lookups of the network view are also
+    counted and timed, per phase. The cumulative time of a method includes
+    the time of the methods it calls and the overhead of profiling them. The
+    number of events processed in the WARMUP and MEASURED phases is that of
+    the calls of *process_event* of strategies.
+
+    A disabled profiler only times phases, which is cheap, so that it can be
+    used by the simulation whether or not the experiment is profiled.
+
+    Profilers can be merged like data collectors, e.g. those of the shards of
+    an experiment, in which case the times of all shards are summed.
+    """
+
+    name = 'PERF'
+
+    # Phases in which events are processed by strategies
+    EVENT_PHASES = ('WARMUP', 'MEASURED')
+
+    def __init__(self, enabled=True):
+        """Constructor
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            If *False*, objects are not instrumented
+        """
+        self.enabled = enabled
+        self.phase = None
+        self.phase_time = collections.defaultdict(float)
+        # Calls and their cumulative time keyed by (phase, method) tuples
+        self.calls = collections.defaultdict(int)
+        self.call_time = collections.defaultdict(float)
+        self._start = None
+
+    def start(self, phase):
+        """Ends the current phase, if any, and starts a new one
+
+        Parameters
+        ----------
+        phase : str
+            The name of the phase
+        """
+        now = time.time()
+        if self.phase is not None:
+            self.phase_time[self.phase] += now - self._start
+        self.phase = phase
+        self._start = now
+
+    def stop(self):
+        """Ends the current phase, if any
+        """
+        if self.phase is not None:
+            self.phase_time[self.phase] += time.time() - self._start
+            self.phase = None
+
+    def instrument(self, obj, name, methods=None):
+        """Counts and times the calls of methods of an object, if enabled.
+
+        Methods are replaced by wrappers in the attributes of the object, so
+        only calls through the object are profiled.
+
+        Parameters
+        ----------
+        obj : object
+            The object whose methods are profiled
+        name : str
+            The name of the object, methods are reported as *name.method*
+        methods : iterable, optional
+            The names of the methods to profile. If not specified, all
+            methods are profiled, except special ones
+        """
+        if not self.enabled:
+            return
+        if methods is None:
+            methods = [m for m in dir(obj) if not m.startswith('__')
+                       and inspect.ismethod(getattr(obj, m))]
+        for method in methods:
+            setattr(obj, method, self._wrap(getattr(obj, method),
+                                            '%s.%s' % (name, method)))
+
+    def _wrap(self, func, name):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (self.phase, name)
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.calls[key] += 1
+                self.call_time[key] += time.time() - start
+        return wrapper
+
+    def results(self):
+        """Returns the measurements of the profiler
+
+        Returns
+        -------
+        results : Tree
+            Tree with, for each phase, its wall-clock time *TIME* and, if
+            objects were instrumented, the number of calls *CALLS* and the
+            cumulative time *CALL_TIME* of each method. Event phases also
+            have their number of events *EVENTS* and their rate
+            *EVENTS_PER_SEC*
+        """
+        results = Tree()
+        for phase, duration in self.phase_time.iteritems():
+            results[phase]['TIME'] = duration
+        for (phase, name), calls in self.calls.iteritems():
+            results[phase]['CALLS'][name] = calls
+            results[phase]['CALL_TIME'][name] = self.call_time[(phase, name)]
+        for phase in self.EVENT_PHASES:
+            events = self.calls.get((phase, 'strategy.process_event'))
+            if events is not None:
+                results[phase]['EVENTS'] = events
+                results[phase]['EVENTS_PER_SEC'] = events/self.phase_time[phase] \
+                                                   if self.phase_time[phase] > 0 else 0.0
+        return results
+
+    def merge(self, other):
+        """Adds to this profiler the measurements of another profiler
+
+        Parameters
+        ----------
+        other : Profiler
+            The profiler whose measurements are added
+        """
+        for phase, duration in other.phase_time.iteritems():
+            self.phase_time[phase] += duration
+        for key, calls in other.calls.iteritems():
+            self.calls[key] += calls
+            self.call_time[key] += other.call_time[key]
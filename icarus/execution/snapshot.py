@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of the state of experiments at the end of their warmup phase.
+
+Experiments of a campaign often differ only by the strategy used in their
+measured phase, while their warmup phase, i.e. the topology, placements,
+cache policy, workload and warmup strategy, is the same. This module stores
+the state of the network and of the workload at the end of a warmup phase in
+a snapshot file named after a hash of the parameters the warmup depends on,
+so that the warmup phase is simulated only once and the other experiments
+start from its snapshot.
+
+A snapshot only stores the mutable state of an experiment, i.e. the content
+of the caches and RSN tables of the network model and the state of the
+workload (see StationarySitWorkload.warmup_state), not the topology or the
+objects built from it, which are rebuilt from the parameters of the
+experiment. In particular, shortest paths are not stored, since they are
+never modified by strategies (see ShortestPathOracle). The state of caches
+is restored into the caches of a new network model of the same experiment,
+which therefore keep the methods installed by cache wrappers such as
+keyval_cache, which cannot be pickled.
+
+Since warmup phases are only reproducible if the workload and the content
+placement have a seed, snapshots are not used for experiments without them.
+"""
+import os
+import types
+import fcntl
+import tempfile
+import contextlib
+import cPickle as pickle
+
+from icarus.util import params_digest
+
+
+__all__ = [
+    'WarmupSnapshotCache',
+    'warmup_key',
+    'model_state',
+    'restore_model_state'
+           ]
+
+
+# Version of the format of snapshots. It is part of the key, so that changes
+# to the format do not cause stale snapshots to be loaded
+FORMAT_VERSION = 3
+
+
+def warmup_key(params):
+    """Return the key identifying the warmup phase of an experiment
+
+    All parameters of the experiment are part of the key except for those
+    which only affect its measured phase, i.e. the strategy, the description
+    and the number of measured requests.
+
+    Parameters
+    ----------
+    params : Tree
+        The parameters of the experiment
+
+    Returns
+    -------
+    key : str
+        The hexadecimal SHA-1 digest of the parameters of the warmup phase,
+        or None if the warmup phase is not reproducible, i.e. if the workload
+        or the content placement has no seed
+    """
+    for spec in ('workload', 'content_placement'):
+        if spec not in params or 'seed' not in params[spec] \
+                or params[spec]['seed'] is None:
+            return None
+    params = dict((k, v) for k, v in params.items()
+                  if k not in ('strategy', 'desc'))
+    if 'workload' in params:
+        params['workload'] = dict((k, v) for k, v in params['workload'].items()
+                                  if k != 'n_measured')
+    return params_digest((FORMAT_VERSION, params))
+
+
+def _cache_state(cache):
+    # Methods installed on the instance by cache wrappers are not part of the
+    # state: they are those of the cache into which the state is restored
+    return dict((k, v) for k, v in cache.__dict__.iteritems()
+                if not isinstance(v, (types.FunctionType, types.MethodType)))
+
+
+def model_state(model):
+    """Return the mutable state of a network model, i.e. the state of its
+    caches and RSN tables
+
+    Parameters
+    ----------
+    model : NetworkModel
+        The network model
+
+    Returns
+    -------
+    state : dict
+        The state of the model. It is picklable
+    """
+    return {'cache': dict((v, _cache_state(c))
+                          for v, c in model.cache.iteritems()),
+            'rsn': dict((v, _cache_state(c))
+                        for v, c in model.rsn.iteritems())}
+
+
+def restore_model_state(model, state):
+    """Restore the state of the caches and RSN tables of a network model
+
+    Parameters
+    ----------
+    model : NetworkModel
+        A new network model, built with the same parameters as the model
+        whose state was saved
+    state : dict
+        The state of the model, as returned by model_state
+    """
+    for table, states in ((model.cache, state['cache']),
+                          (model.rsn, state['rsn'])):
+        if set(table) != set(states):
+            raise ValueError('The state does not match the caches of the '
+                             'model')
+        for v, cache_state in states.iteritems():
+            table[v].__dict__.update(cache_state)
+    model.index_content_locations()
+
+
+class WarmupSnapshotCache(object):
+    """Content-addressed on-disk cache of warmup snapshots.
+
+    Snapshots are written atomically and never modified, so the same cache
+    directory can be safely shared by concurrent processes. A process about
+    to simulate a warmup phase holds a lock on its key, so that other
+    processes needing the same snapshot wait for it instead of simulating
+    the same warmup phase.
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory where snapshots are stored. It is created if it
+            does not exist
+        """
+        self.directory = os.path.abspath(directory)
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Created concurrently by another process
+                if not os.path.isdir(self.directory):
+                    raise
+
+    def path(self, key):
+        """Return the path of a snapshot file
+
+        Parameters
+        ----------
+        key : str
+            The key of the snapshot
+
+        Returns
+        -------
+        path : str
+            The path of the snapshot file
+        """
+        return os.path.join(self.directory, '%s.pickle' % key)
+
+    def __contains__(self, key):
+        return os.path.isfile(self.path(key))
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Context manager holding an exclusive lock on a key, shared by all
+        processes using the same directory
+
+        Parameters
+        ----------
+        key : str
+            The key of the snapshot
+        """
+        with open(os.path.join(self.directory, '%s.lock' % key), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def store(self, key, model, workload):
+        """Store the snapshot of an experiment at the end of its warmup phase
+
+        Parameters
+        ----------
+        key : str
+            The key of the snapshot
+        model : NetworkModel
+            The network model of the experiment
+        workload : object
+            The workload of the experiment, which must have a *warmup_state*
+            method
+        """
+        fd, tmp = tempfile.mkstemp(prefix='.%s.' % key, dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((model_state(model), workload.warmup_state()), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, self.path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def load(self, key, model, workload):
+        """Restore the snapshot of an experiment at the end of its warmup
+        phase
+
+        Parameters
+        ----------
+        key : str
+            The key of the snapshot
+        model : NetworkModel
+            A new network model of the experiment
+        workload : object
+            A new workload of the experiment, which must have a
+            *restore_warmup_state* method
+        """
+        with open(self.path(key), 'rb') as f:
+            model_st, workload_st = pickle.load(f)
+        restore_model_state(model, model_st)
+        workload.restore_warmup_state(workload_st)
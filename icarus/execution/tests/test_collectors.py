@@ -0,0 +1,257 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import pickle
+
+import numpy as np
+import networkx as nx
+import fnss
+
+from icarus.execution import CacheHitRatioCollector, LatencyCollector, \
+                             OverheadCollector, AbsorptionCollector, \
+                             LinkLoadCollector, CollectorProxy, DataCollector, \
+                             NetworkModel, NetworkView, merge_shards
+from icarus.scenarios.topology import IcnTopology
+from icarus.util import Tree
+
+
+class View(object):
+
+    def __init__(self):
+        topology = IcnTopology(fnss.line_topology(3))
+        fnss.add_stack(topology, 0, 'receiver')
+        fnss.add_stack(topology, 1, 'router')
+        fnss.add_stack(topology, 2, 'source')
+        self._topology = topology
+
+    def topology(self):
+        return self._topology
+
+
+# (content, serving node) of sessions: content is served by node 1 or 2
+# or, if the serving node is None, it is not found
+SESSIONS = [(1, 1), (2, 2), (3, None), (1, 1), (4, 2), (5, 1), (2, None)]
+
+
+def replay(collectors, sessions):
+    c = CollectorProxy(None, collectors)
+    for t, (content, node) in enumerate(sessions):
+        c.start_session(t, 0, content)
+        if node is not None:
+            c.request_hop(0, 1)
+            if node == 2:
+                c.request_hop(1, 2)
+                c.content_hop(2, 1)
+            else:
+                c.cache_hit(1)
+            c.content_hop(1, 0)
+        c.end_session(node is not None)
+
+
+class TestMerge(unittest.TestCase):
+
+    def collectors(self):
+        view = View()
+        collectors = [CacheHitRatioCollector(view, per_node=True),
+                      LatencyCollector(view, cdf=True),
+                      OverheadCollector(view)]
+        for c, name in zip(collectors, ['CACHE_HIT_RATIO', 'LATENCY', 'OVERHEAD']):
+            self.assertEqual(name, c.name)
+        return collectors
+
+    def test_merge(self):
+        whole = self.collectors()
+        replay(whole, SESSIONS)
+        shards = []
+        for sessions in (SESSIONS[:2], SESSIONS[2:3], SESSIONS[3:]):
+            shard = self.collectors()
+            replay(shard, sessions)
+            # Shards are sent between processes without the view
+            shard = pickle.loads(pickle.dumps(shard))
+            self.assertFalse(any(hasattr(c, 'view') for c in shard))
+            shards.append(shard)
+        merged = merge_shards(shards)
+        expected = Tree(**dict((c.name, c.results()) for c in whole))
+        np.testing.assert_equal(expected.paths(), merged.paths())
+
+    def test_not_mergeable(self):
+        view = View()
+        c = AbsorptionCollector(view)
+        self.assertRaises(NotImplementedError, c.merge, AbsorptionCollector(view))
+
+
+def network_view():
+    return NetworkView(NetworkModel(View().topology(), {'name': 'LRU'}))
+
+
+class HopCollector(DataCollector):
+
+    def __init__(self, view):
+        self.view = view
+        self.hops = []
+        self.trace = []
+        self.sessions = 0
+
+    def session_hops(self, request_hops, content_hops, receiver_hops):
+        self.hops.append((request_hops, content_hops, receiver_hops))
+
+    def hop_trace(self, u, v, content, main_path):
+        self.trace.append(zip(u, v, content, main_path))
+
+    def end_session(self, success=True):
+        self.sessions += 1
+
+
+class TestCollectorProxy(unittest.TestCase):
+
+    def test_dispatch(self):
+        view = View()
+        c = CacheHitRatioCollector(view)
+        proxy = CollectorProxy(view, [c])
+        # Events are bound to the method of their only collector or to a no-op
+        self.assertEqual(c.cache_hit, proxy.cache_hit)
+        self.assertEqual(c.start_session, proxy.start_session)
+        self.assertEqual(proxy.request_hop, proxy.content_hop)
+        self.assertEqual(proxy.cache_miss, proxy.evict_item)
+        proxy.start_session(0, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.cache_hit(1)
+        proxy.content_hop(1, 0)
+        proxy.end_session()
+        self.assertEqual(1, c.cache_hits)
+
+    def test_session_hops(self):
+        view = network_view()
+        c = HopCollector(view)
+        proxy = CollectorProxy(view, [c])
+        proxy.start_session(0, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.request_hop(1, 2)
+        proxy.content_hop(2, 1)
+        proxy.content_hop(1, 0)
+        # Content hops after the delivery to the receiver, e.g. multicast
+        proxy.content_hop(1, 2, main_path=False)
+        proxy.end_session()
+        proxy.start_session(1, 0, 2)
+        proxy.request_hop(0, 1)
+        proxy.end_session(False)
+        self.assertEqual([(2, 3, 2), (1, 0, None)], c.hops)
+        self.assertEqual(2, c.sessions)
+
+    def test_session_hops_open_session(self):
+        view = network_view()
+        c = HopCollector(view)
+        proxy = CollectorProxy(view, [c])
+        proxy.start_session(0, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.start_session(1, 0, 2)
+        self.assertEqual([(1, 0, None)], c.hops)
+        proxy.content_hop(1, 0)
+        proxy.flush()
+        proxy.flush()
+        self.assertEqual([(1, 0, None), (0, 1, 1)], c.hops)
+        self.assertEqual(0, c.sessions)
+
+    def test_session_hops_latency_overhead(self):
+        view = View()
+        latency = LatencyCollector(view)
+        overhead = OverheadCollector(view)
+        replay([latency, overhead], SESSIONS)
+        # 5 satisfied sessions: 3 served in 1 hop, 2 served in 2 hops
+        self.assertAlmostEqual(1.4, latency.results()['MEAN'])
+        self.assertAlmostEqual(1.4, overhead.results()['MEAN'])
+        self.assertAlmostEqual(1.0, overhead.results()['MEAN_INTEREST'])
+
+    def test_hop_trace(self):
+        view = network_view()
+        c = HopCollector(view)
+        class Proxy(CollectorProxy):
+            TRACE_SIZE = 3
+        proxy = Proxy(view, [c])
+        for _ in range(2):
+            proxy.start_session(0, 0, 1)
+            proxy.request_hop(0, 1)
+            proxy.content_hop(1, 0, main_path=False)
+            proxy.end_session()
+        # Hops are reported in bulk as soon as TRACE_SIZE are buffered
+        self.assertEqual([[(0, 1, False, True), (1, 0, True, False),
+                           (0, 1, False, True)]], c.trace)
+        proxy.start_session(0, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.end_session()
+        self.assertEqual(1, len(c.trace))
+        proxy.flush()
+        self.assertEqual([(1, 0, True, False), (0, 1, False, True)], c.trace[1])
+        proxy.flush()
+        self.assertEqual(2, len(c.trace))
+
+    def test_hop_trace_labels(self):
+        # Labels are translated to node ids as hops are buffered
+        topology = nx.relabel_nodes(View().topology(), {0: 'a', 1: 'b', 2: 'c'})
+        view = NetworkView(NetworkModel(topology, {'name': 'LRU'}))
+        c = HopCollector(view)
+        proxy = CollectorProxy(view, [c])
+        proxy.start_session(0, 'a', 1)
+        proxy.request_hop('a', 'b')
+        proxy.content_hop('b', 'a')
+        proxy.flush()
+        a, b = view.node_id('a'), view.node_id('b')
+        self.assertEqual([[(a, b, False, True), (b, a, True, True)]], c.trace)
+
+
+class TestLinkLoadCollector(unittest.TestCase):
+
+    def setUp(self):
+        topology = View().topology()
+        for u, v in topology.edges_iter():
+            topology.edge[u][v]['type'] = 'internal'
+        topology.edge[1][2]['type'] = 'external'
+        fnss.set_delays_constant(topology, 1, 'ms')
+        self.view = NetworkView(NetworkModel(topology, {'name': 'LRU'}))
+
+    def test_link_load(self):
+        c = LinkLoadCollector(self.view, sr=10)
+        proxy = CollectorProxy(self.view, [c])
+        for t, path in enumerate([[0, 1], [0, 1, 2], [0, 1, 2]]):
+            proxy.start_session(t, 0, 1)
+            for u, v in zip(path[:-1], path[1:]):
+                proxy.request_hop(u, v)
+            for u, v in reversed(zip(path[:-1], path[1:])):
+                proxy.content_hop(v, u)
+            proxy.end_session()
+        proxy.start_session(4, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.content_hop(1, 2, main_path=False)
+        proxy.flush()
+        results = c.results()
+        # Links not traversed by requests, e.g. (1, 0), are not loaded
+        self.assertEqual({(0, 1): 1.0}, results['PER_LINK_INTERNAL'])
+        self.assertEqual({(1, 2): 3.0}, results['PER_LINK_EXTERNAL'])
+        self.assertEqual(1.0, results['MEAN_INTERNAL'])
+        self.assertEqual(3.0, results['MEAN_EXTERNAL'])
+        self.assertEqual(results, CollectorProxy(None, [c]).results()['LINK_LOAD'])
+
+    def test_not_a_link(self):
+        c = LinkLoadCollector(self.view)
+        proxy = CollectorProxy(self.view, [c])
+        proxy.start_session(0, 0, 1)
+        proxy.request_hop(0, 1)
+        proxy.request_hop(1, 1)
+        proxy.request_hop(0, 2)
+        proxy.content_hop(2, 0)
+        proxy.content_hop(1, 0)
+        proxy.end_session()
+        proxy.start_session(1, 0, 1)
+        proxy.request_hop(1, 2)
+        proxy.end_session()
+        proxy.flush()
+        self.assertEqual(3, c.invalid_hops)
+        results = c.results()
+        self.assertEqual({(0, 1): 1.0}, results['PER_LINK_INTERNAL'])
+        self.assertEqual({(1, 2): 1.0}, results['PER_LINK_EXTERNAL'])
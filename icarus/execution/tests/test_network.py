@@ -0,0 +1,157 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import networkx as nx
+import fnss
+
+from icarus.execution import ShortestPathOracle, NetworkModel, NetworkView, \
+                             NetworkController
+from icarus.models import InfiniteCache, LruCache, SegmentedLruCache
+from icarus.execution.network import symmetrify_paths
+
+
+class TestShortestPathOracle(unittest.TestCase):
+
+    def assertSamePaths(self, topology, mode):
+        expected = symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        oracle = ShortestPathOracle(topology, mode)
+        for s in topology.nodes_iter():
+            for t in topology.nodes_iter():
+                self.assertEqual(expected[s][t], oracle.shortest_path(s, t))
+                self.assertEqual(expected[s][t], oracle[s][t])
+
+    def topologies(self):
+        ring = fnss.ring_topology(8)
+        grid = nx.grid_2d_graph(4, 4)
+        grid = fnss.Topology(nx.relabel_nodes(grid, dict((v, 'n_%d_%d' % v)
+                                                         for v in grid)))
+        weighted = fnss.erdos_renyi_topology(40, 0.15, seed=1)
+        fnss.set_weights_constant(weighted, 1)
+        for u, v in weighted.edges()[::3]:
+            weighted.edge[u][v]['weight'] = 3
+        return [ring, grid, weighted]
+
+    def test_eager(self):
+        for topology in self.topologies():
+            self.assertSamePaths(topology, 'eager')
+
+    def test_lazy(self):
+        for topology in self.topologies():
+            self.assertSamePaths(topology, 'lazy')
+
+    def test_predecessor(self):
+        for topology in self.topologies():
+            self.assertSamePaths(topology, 'predecessor')
+
+    def test_symmetric(self):
+        topology = fnss.ring_topology(6)
+        for mode in ShortestPathOracle.modes:
+            oracle = ShortestPathOracle(topology, mode)
+            for s in topology.nodes_iter():
+                for t in topology.nodes_iter():
+                    self.assertEqual(list(reversed(oracle.shortest_path(s, t))),
+                                     oracle.shortest_path(t, s))
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, ShortestPathOracle,
+                          fnss.ring_topology(4), 'invalid')
+
+
+class TestNetworkModel(unittest.TestCase):
+
+    def topology(self):
+        topology = fnss.line_topology(3)
+        fnss.set_delays_constant(topology, 1, 'ms')
+        fnss.add_stack(topology, 0, 'receiver', {'cache_size': 10})
+        fnss.add_stack(topology, 1, 'router', {'cache_size': 2})
+        fnss.add_stack(topology, 2, 'source', {'contents': range(1, 11)})
+        return topology
+
+    def test_infinite_cache(self):
+        model = NetworkModel(self.topology(), {'name': 'LRU'})
+        self.assertIsInstance(model.cache[0], InfiniteCache)
+        self.assertIsInstance(model.cache[1], LruCache)
+        self.assertEqual(10, model.cache[0].maxlen)
+
+    def test_infinite_cache_policy(self):
+        model = NetworkModel(self.topology(), {'name': 'SLRU'})
+        self.assertIsInstance(model.cache[0], SegmentedLruCache)
+
+    def test_link_tables(self):
+        topology = fnss.Topology(nx.relabel_nodes(fnss.line_topology(4),
+                                                  dict((v, 'n_%d' % v) for v in range(4))))
+        for u, v in topology.edges_iter():
+            fnss.set_delays_constant(topology, 1 + int(u[2:]) + int(v[2:]),
+                                     'ms', [(u, v)])
+            topology.edge[u][v]['type'] = 'internal' if u != 'n_0' else 'external'
+        for v in topology.nodes_iter():
+            fnss.add_stack(topology, v, 'router')
+        model = NetworkModel(topology, {'name': 'LRU'})
+        self.assertEqual(range(4), sorted(model.node_id.values()))
+        # Rows are indexed by node id and hold the links towards neighbors
+        for u in topology.nodes_iter():
+            self.assertEqual(sorted(model.node_id[v] for v in topology.neighbors(u)),
+                             sorted(model.link_delay_table[model.node_id[u]]))
+        view = NetworkView(model)
+        self.assertEqual(2, view.link_delay('n_0', 'n_1'))
+        self.assertEqual(4, view.link_delay('n_1', 'n_2'))
+        self.assertEqual(6, view.link_delay('n_3', 'n_2'))
+        self.assertEqual('external', view.link_type('n_1', 'n_0'))
+        self.assertEqual('internal', view.link_type('n_2', 'n_3'))
+        self.assertRaises(KeyError, view.link_delay, 'n_0', 'n_2')
+        self.assertRaises(KeyError, view.link_type, 'n_0', 'n_4')
+
+
+class TestContentLocations(unittest.TestCase):
+
+    def setUp(self):
+        topology = fnss.line_topology(4)
+        fnss.set_delays_constant(topology, 1, 'ms')
+        fnss.add_stack(topology, 0, 'receiver')
+        fnss.add_stack(topology, 1, 'router', {'cache_size': 2})
+        fnss.add_stack(topology, 2, 'router', {'cache_size': 2})
+        fnss.add_stack(topology, 3, 'source', {'contents': range(1, 11)})
+        self.model = NetworkModel(topology, {'name': 'LRU'})
+        self.view = NetworkView(self.model)
+        self.controller = NetworkController(self.model)
+
+    def put(self, content, node):
+        self.controller.start_session(0, 0, content, False)
+        return self.controller.put_content(node)
+
+    def test_put_evict(self):
+        self.assertEqual(set([3]), self.view.content_locations(1))
+        self.put(1, 1)
+        self.put(1, 2)
+        self.assertEqual(set([1, 2, 3]), self.view.content_locations(1))
+        self.put(2, 1)
+        self.assertEqual(1, self.put(3, 1))
+        self.assertEqual(set([2, 3]), self.view.content_locations(1))
+        self.assertEqual(set([1, 3]), self.view.content_locations(3))
+
+    def test_remove(self):
+        self.put(1, 1)
+        self.put(1, 2)
+        self.controller.start_session(0, 0, 1, False)
+        self.controller.remove_content(1)
+        self.assertEqual(set([2, 3]), self.view.content_locations(1))
+        self.controller.remove_content_at_node(1, 2)
+        self.assertEqual(set([3]), self.view.content_locations(1))
+
+    def test_removed_by_cache(self):
+        self.put(1, 1)
+        # Contents removed from caches without the controller, e.g. when
+        # they expire, are ignored
+        self.model.cache[1].remove(1)
+        self.assertEqual(set([3]), self.view.content_locations(1))
+
+    def test_index(self):
+        self.model.cache[1].put(4)
+        self.model.index_content_locations()
+        self.assertEqual(set([1, 3]), self.view.content_locations(4))
@@ -0,0 +1,120 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import shutil
+import tempfile
+
+import numpy as np
+import networkx as nx
+import fnss
+
+from icarus.execution import PrecomputationCache, ShortestPathOracle
+from icarus.execution.precomputation import precomputation_key
+
+
+def ring_factory(n, **kwargs):
+    topology = fnss.ring_topology(n)
+    topology.graph['icr_candidates'] = set(topology.nodes())
+    return topology
+
+
+class TestPrecomputationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        k1 = precomputation_key('RING', {'n': 10, 'm': 2})
+        k2 = precomputation_key('RING', {'m': 2, 'n': 10})
+        k3 = precomputation_key('RING', {'m': 2, 'n': 11})
+        k4 = precomputation_key('PATH', {'m': 2, 'n': 10})
+        self.assertEqual(k1, k2)
+        self.assertNotEqual(k1, k3)
+        self.assertNotEqual(k1, k4)
+
+    def test_get(self):
+        cache = PrecomputationCache(self.directory)
+        topology, shortest_path, centrality = cache.get('RING', {'n': 7}, ring_factory)
+        self.assertIn(precomputation_key('RING', {'n': 7}), cache)
+        self.assertEqual(7, topology.number_of_nodes())
+        self.assertEqual(set(range(7)), topology.graph['icr_candidates'])
+        expected = ShortestPathOracle(ring_factory(7), 'eager')
+        for s in topology.nodes_iter():
+            for t in topology.nodes_iter():
+                self.assertEqual(expected.shortest_path(s, t),
+                                 shortest_path.shortest_path(s, t))
+        betw = nx.betweenness_centrality(topology)
+        closeness = nx.closeness_centrality(topology)
+        for v in topology.nodes_iter():
+            self.assertAlmostEqual(betw[v], centrality['betweenness'][v])
+            self.assertAlmostEqual(closeness[v], centrality['closeness'][v])
+        self.assertNotIn('centrality', topology.graph)
+
+    def test_get_cached(self):
+        cache = PrecomputationCache(self.directory)
+        cache.get('RING', {'n': 5}, ring_factory)
+        def store(key, topology):
+            raise AssertionError('cached entry must not be computed again')
+        cache.store = store
+        topology, _, _ = cache.get('RING', {'n': 5}, ring_factory)
+        self.assertEqual(5, topology.number_of_nodes())
+        # Each load returns a new copy of the topology
+        topology.add_edge(0, 2)
+        topology, _, _ = cache.get('RING', {'n': 5}, ring_factory)
+        self.assertFalse(topology.has_edge(0, 2))
+
+    def test_node_order(self):
+        # Unpickling this topology changes the iteration order of its nodes
+        def factory(**kwargs):
+            topology = fnss.erdos_renyi_topology(7, 0.2, seed=0)
+            topology.add_edges_from(('rec_%d' % v, v) for v in range(0, 7, 3))
+            return topology
+        cache = PrecomputationCache(self.directory)
+        for _ in range(2):
+            topology, shortest_path, _ = cache.get('ER', {}, factory)
+            self.assertEqual(factory().nodes(), topology.nodes())
+            self.assertEqual(ShortestPathOracle(factory()).node_label,
+                             shortest_path.node_label)
+        # Without the factory, the stored copy is used
+        key = precomputation_key('ER', {})
+        topology, shortest_path, _ = cache.load(key)
+        self.assertEqual(sorted(factory().nodes()), sorted(topology.nodes()))
+        self.assertNotEqual(factory().nodes(), topology.nodes())
+        topology, shortest_path, _ = cache.load(key, topology=fnss.line_topology(3))
+        self.assertEqual(sorted(factory().nodes()), sorted(topology.nodes()))
+
+    def test_get_shortest_path_mode(self):
+        cache = PrecomputationCache(self.directory)
+        expected = ShortestPathOracle(ring_factory(6), 'eager')
+        for mode in ShortestPathOracle.modes:
+            topology, shortest_path, _ = cache.get('RING', {'n': 6}, ring_factory,
+                                                   mode)
+            self.assertEqual(mode, shortest_path.mode)
+            for s in topology.nodes_iter():
+                for t in topology.nodes_iter():
+                    self.assertEqual(expected.shortest_path(s, t),
+                                     shortest_path.shortest_path(s, t))
+                    self.assertEqual(expected[s][t], shortest_path[s][t])
+
+    def test_get_shared(self):
+        cache = PrecomputationCache(self.directory)
+        topology, shortest_path, _ = cache.get('RING', {'n': 6}, ring_factory)
+        # By default paths are built on demand from the memory-mapped matrix
+        self.assertEqual('predecessor', shortest_path.mode)
+        self.assertIsInstance(shortest_path._pred, np.memmap)
+        expected = ShortestPathOracle(ring_factory(6), 'eager')
+        for s in topology.nodes_iter():
+            for t in topology.nodes_iter():
+                self.assertEqual(expected.shortest_path(s, t),
+                                 shortest_path.shortest_path(s, t))
+        self.assertFalse(hasattr(shortest_path, '_paths'))
+        self.assertIsInstance(shortest_path.predecessors(), np.memmap)
@@ -0,0 +1,131 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.")
+del sys
+import pickle
+
+import fnss
+
+from icarus.execution import Profiler, exec_experiment, exec_shard, merge_shards
+from icarus.scenarios.topology import IcnTopology
+
+
+class Strategy(object):
+
+    def process_event(self, time, content):
+        return self.lookup(content)
+
+    def lookup(self, content):
+        return content
+
+
+def topology():
+    topology = IcnTopology(fnss.line_topology(3))
+    fnss.set_delays_constant(topology, 1, 'ms')
+    fnss.add_stack(topology, 0, 'receiver')
+    fnss.add_stack(topology, 1, 'router', {'cache_size': 2})
+    fnss.add_stack(topology, 2, 'source', {'contents': range(1, 5)})
+    return topology
+
+
+class Workload(object):
+
+    def __init__(self, n_warmup=4, n_measured=6):
+        self.n_warmup = n_warmup
+        self.n_measured = n_measured
+
+    def __iter__(self):
+        for i in range(self.n_warmup + self.n_measured):
+            yield i, {'receiver': 0, 'content': 1 + i % 4, 'log': True}
+
+    def shard(self, shard, n_shards):
+        self.n_measured //= n_shards
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_phases(self):
+        profiler = Profiler()
+        profiler.start('WARMUP')
+        profiler.start('MEASURED')
+        profiler.stop()
+        profiler.stop()
+        results = profiler.results()
+        self.assertEqual(set(['WARMUP', 'MEASURED']), set(results.keys()))
+        self.assertGreaterEqual(results['WARMUP']['TIME'], 0)
+
+    def test_instrument(self):
+        profiler = Profiler()
+        strategy = Strategy()
+        profiler.instrument(strategy, 'strategy')
+        profiler.start('MEASURED')
+        for content in range(3):
+            self.assertEqual(content, strategy.process_event(content, content))
+        profiler.stop()
+        results = profiler.results()['MEASURED']
+        self.assertEqual({'strategy.process_event': 3, 'strategy.lookup': 3},
+                         results['CALLS'])
+        self.assertEqual(3, results['EVENTS'])
+        self.assertGreaterEqual(results['CALL_TIME']['strategy.process_event'],
+                                results['CALL_TIME']['strategy.lookup'])
+
+    def test_instrument_disabled(self):
+        profiler = Profiler(enabled=False)
+        strategy = Strategy()
+        profiler.instrument(strategy, 'strategy')
+        self.assertNotIn('process_event', strategy.__dict__)
+
+    def test_merge(self):
+        profilers = []
+        for _ in range(2):
+            profiler = Profiler()
+            strategy = Strategy()
+            profiler.instrument(strategy, 'strategy', ['lookup'])
+            profiler.start('MEASURED')
+            strategy.process_event(0, 0)
+            profiler.stop()
+            profilers.append(pickle.loads(pickle.dumps(profiler)))
+        duration = sum(p.phase_time['MEASURED'] for p in profilers)
+        profilers[0].merge(profilers[1])
+        results = profilers[0].results()['MEASURED']
+        self.assertEqual({'strategy.lookup': 2}, results['CALLS'])
+        self.assertAlmostEqual(duration, results['TIME'])
+
+
+class TestExecExperiment(unittest.TestCase):
+
+    def exec_args(self):
+        return (topology(), Workload(), {}, {'name': 'LCE'}, {'name': 'LRU'},
+                {'CACHE_HIT_RATIO': {}}, {'name': 'LCE'})
+
+    def test_profile(self):
+        results = exec_experiment(*self.exec_args(), profiler=Profiler())
+        self.assertIn('CACHE_HIT_RATIO', results)
+        perf = results['PERF']
+        for phase in ('PATHS', 'WARMUP', 'MEASURED', 'RESULTS'):
+            self.assertGreaterEqual(perf[phase]['TIME'], 0)
+        self.assertEqual(4, perf['WARMUP']['EVENTS'])
+        self.assertEqual(6, perf['MEASURED']['EVENTS'])
+        calls = perf['MEASURED']['CALLS']
+        self.assertEqual(6, calls['strategy.process_event'])
+        self.assertGreaterEqual(calls['controller.get_content'], 6)
+        self.assertGreaterEqual(calls['controller.put_content'], 1)
+        self.assertNotIn('controller.start_session', calls)
+
+    def test_no_profile(self):
+        results = exec_experiment(*self.exec_args())
+        self.assertNotIn('PERF', results)
+
+    def test_profile_shards(self):
+        shards = []
+        for shard in range(2):
+            args = self.exec_args()
+            shards.append(exec_shard(*(args + (shard, 2)), profiler=Profiler()))
+        results = merge_shards(shards)
+        self.assertEqual(8, results['PERF']['WARMUP']['EVENTS'])
+        self.assertEqual(6, results['PERF']['MEASURED']['EVENTS'])
@@ -0,0 +1,93 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import shutil
+import tempfile
+
+import fnss
+
+from icarus.execution import NetworkModel, WarmupSnapshotCache, warmup_key
+from icarus.util import Tree
+
+
+def experiment(strategy='SIT_ONLY', n_measured=100, seed=1):
+    e = Tree()
+    e['workload'] = {'name': 'STATIONARY_SIT', 'n_warmup': 10,
+                     'n_measured': n_measured, 'seed': seed}
+    e['content_placement'] = {'name': 'UNIFORM', 'seed': seed}
+    e['topology'] = {'name': 'ROCKET_FUEL', 'asn': 1221}
+    e['strategy']['name'] = strategy
+    e['desc'] = strategy
+    return e
+
+
+class Workload(object):
+
+    def __init__(self, state=None):
+        self.state = state
+
+    def warmup_state(self):
+        return self.state
+
+    def restore_warmup_state(self, state):
+        self.state = state
+
+
+class TestWarmupKey(unittest.TestCase):
+
+    def test_key(self):
+        key = warmup_key(experiment())
+        self.assertEqual(key, warmup_key(experiment('NDN_SIT', 200)))
+        self.assertNotEqual(key, warmup_key(experiment(seed=2)))
+
+    def test_no_seed(self):
+        self.assertIsNone(warmup_key(experiment(seed=None)))
+        e = experiment()
+        del e['content_placement']['seed']
+        self.assertIsNone(warmup_key(e))
+
+
+class TestWarmupSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def model(self):
+        topology = fnss.line_topology(3)
+        fnss.add_stack(topology, 0, 'receiver', {'cache_size': 4})
+        fnss.add_stack(topology, 1, 'router', {'cache_size': 2, 'rsn_size': 2})
+        fnss.add_stack(topology, 2, 'source', {'contents': range(1, 11)})
+        return NetworkModel(topology, {'name': 'LRU'})
+
+    def test_store_load(self):
+        cache = WarmupSnapshotCache(self.directory)
+        model = self.model()
+        for k in (1, 2, 3):
+            model.cache[0].put(k)
+            model.cache[1].put(k)
+            model.rsn[1].put(k, 2)
+        self.assertNotIn('key', cache)
+        with cache.lock('key'):
+            cache.store('key', model, Workload({'t': 1.0}))
+        self.assertIn('key', cache)
+        restored, workload = self.model(), Workload()
+        cache.load('key', restored, workload)
+        self.assertEqual({'t': 1.0}, workload.state)
+        for v in (0, 1):
+            self.assertEqual(model.cache[v].dump(), restored.cache[v].dump())
+        self.assertEqual([(3, 2), (2, 2)], restored.rsn[1].dump())
+        # Restored caches keep working, with the methods of the new model
+        self.assertEqual((2, 2), restored.rsn[1].put(4, 0))
+        self.assertEqual(0, restored.rsn[1].value(4))
+        self.assertEqual([(3, 2), (2, 2)], model.rsn[1].dump())
+        self.assertEqual({1: set([0]), 2: set([0, 1]), 3: set([0, 1])},
+                         restored.content_caches)
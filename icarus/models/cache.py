@@ -4,6 +4,7 @@ This module contains the implementations of all the cache replacement policies
 provided by Icarus.
 """
 from collections import deque
+import heapq
 import random
 import abc
 import copy
@@ -19,10 +20,12 @@ __all__ = [
         'Cache',
         'NullCache',
         'LruCache',
+        'FastLruCache',
         'SegmentedLruCache',
         'LfuCache',
         'FifoCache',
         'RandEvictionCache',
+        'InfiniteCache',
         'rand_insert_cache',
         'keyval_cache',
         'ttl_cache',
@@ -115,6 +118,14 @@ class LinkedSet(object):
             yield cur.val
             cur = cur.up
     
+    def __getstate__(self):
+        # The set is pickled as the list of its elements rather than as a
+        # chain of nodes, which would be pickled recursively
+        return list(self)
+    
+    def __setstate__(self, state):
+        self.__init__(state)
+    
     def __str__(self):
         """Return a string representation of the set
         
@@ -841,6 +852,132 @@ class LruCache(Cache):
         self._cache.clear()
 
 
+@register_cache_policy('FAST_LRU')
+class FastLruCache(Cache):
+    """Least Recently Used (LRU) cache eviction policy, with a faster
+    implementation.
+
+    This cache has exactly the same behavior as *LruCache*, but instead of
+    storing items in a *LinkedSet*, which allocates a node object per item
+    and updates several of its attributes on each access, it keeps the
+    doubly linked list in two dictionaries mapping each item to the previous
+    and next items. A sentinel item links the head and the tail of the list.
+    This avoids object allocations on insertion and halves the time of a
+    lookup.
+    """
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        # The sentinel is the only non-content key of the dictionaries
+        self._root = _FastLruRoot()
+        self._prev = {self._root: self._root}
+        self._next = {self._root: self._root}
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._next) - 1
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        nxt = self._next
+        dump = []
+        k = nxt[self._root]
+        while k is not self._root:
+            dump.append(k)
+            k = nxt[k]
+        return dump
+
+    @inheritdoc(LruCache)
+    def position(self, k):
+        if k not in self._next:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        return self.dump().index(k)
+
+    @inheritdoc(Cache)
+    def has(self, k):
+        return k in self._next
+
+    def _move_to_top(self, k):
+        """Move an item already in the cache to the top of the list"""
+        prev = self._prev
+        nxt = self._next
+        root = self._root
+        p = prev[k]
+        if p is root:
+            return
+        n = nxt[k]
+        nxt[p] = n
+        prev[n] = p
+        head = nxt[root]
+        nxt[k] = head
+        prev[head] = k
+        prev[k] = root
+        nxt[root] = k
+
+    @inheritdoc(Cache)
+    def get(self, k):
+        if k not in self._next:
+            return False
+        self._move_to_top(k)
+        return True
+
+    @inheritdoc(LruCache)
+    def put(self, k):
+        nxt = self._next
+        if k in nxt:
+            self._move_to_top(k)
+            return None
+        prev = self._prev
+        root = self._root
+        head = nxt[root]
+        nxt[k] = head
+        prev[head] = k
+        prev[k] = root
+        nxt[root] = k
+        if len(nxt) - 1 <= self._maxlen:
+            return None
+        tail = prev[root]
+        p = prev.pop(tail)
+        del nxt[tail]
+        nxt[p] = root
+        prev[root] = p
+        return tail
+
+    @inheritdoc(Cache)
+    def remove(self, k):
+        if k not in self._next:
+            return False
+        p = self._prev.pop(k)
+        n = self._next.pop(k)
+        self._next[p] = n
+        self._prev[n] = p
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        root = self._root
+        self._prev = {root: root}
+        self._next = {root: root}
+
+
+class _FastLruRoot(object):
+    """Sentinel of the linked list of a FastLruCache. It is a separate class,
+    rather than a plain object, so that caches can be deep-copied and pickled
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<root>'
+
+
 @register_cache_policy('SLRU')
 class SegmentedLruCache(Cache):
     """Segmented Least Recently Used (LRU) cache eviction policy.
@@ -1018,11 +1155,20 @@ class LfuCache(Cache):
     cannot be implemented in such a way that both search and replacement tasks
     can be executed in constant time. This makes it particularly unfit for
     large caches and line speed operations.
+
+    Items are evicted in increasing order of counter and, among items with the
+    same counter, in order of insertion. The items are kept in a heap keyed by
+    (counter, insertion time), which is updated lazily: a hit only increments
+    the counter of the item and its heap entry, which is a lower bound of its
+    actual key, is updated when it reaches the top of the heap. Hits therefore
+    take constant time and insertions logarithmic amortized time.
     """
     
     @inheritdoc(Cache)
     def __init__(self, maxlen, **kwargs):
         self._cache = {}
+        # Heap of (counter, insertion time, item), possibly outdated
+        self._heap = []
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
@@ -1047,28 +1193,51 @@ class LfuCache(Cache):
 
     @inheritdoc(Cache)
     def get(self, k):
-        if self.has(k):
+        if k in self._cache:
             freq, t = self._cache[k]
             self._cache[k] = freq+1, t 
             return True
         else:
             return False
 
+    def _pop_min(self):
+        """Remove and return the item with the smallest (counter, insertion
+        time) key
+        """
+        cache = self._cache
+        heap = self._heap
+        while True:
+            freq, t, k = heap[0]
+            key = cache.get(k)
+            if key is None or key[1] != t:
+                # Entry of an item removed from the cache
+                heapq.heappop(heap)
+            elif key[0] != freq:
+                # Entry of an item hit since the entry was pushed
+                heapq.heapreplace(heap, (key[0], t, k))
+            else:
+                heapq.heappop(heap)
+                del cache[k]
+                return k
+
     @inheritdoc(Cache)
     def put(self, k):
-        if not self.has(k):
+        if k not in self._cache:
             self.t += 1
             self._cache[k] = (1, self.t)
+            heapq.heappush(self._heap, (1, self.t, k))
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._cache[x])
-                del self._cache[evicted]
-                return evicted
+                return self._pop_min()
         return None
     
     @inheritdoc(Cache)
     def remove(self, k):
         if k in self._cache:
             self._cache.pop(k)
+            # Drop entries of removed items once they are the majority
+            if len(self._heap) > 2*len(self._cache) + 16:
+                self._heap = [(freq, t, x) for x, (freq, t) in self._cache.iteritems()]
+                heapq.heapify(self._heap)
             return True
         else:
             return False
@@ -1076,6 +1245,7 @@ class LfuCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        del self._heap[:]
 
 
 
@@ -1238,6 +1408,82 @@ class RandEvictionCache(Cache):
         self._cache.clear()
 
 
+@register_cache_policy('INFINITE')
+class InfiniteCache(Cache):
+    """Cache storing items without ever evicting them.
+
+    Items must be non-negative integers, such as the content identifiers
+    generated by the workloads. Whether an item is stored is recorded in a
+    bytearray indexed by the item, so a cache only takes one byte per
+    content of the catalogue, regardless of the number of items it stores.
+
+    Any eviction policy behaves in the same way as long as the cache is never
+    full, so this cache can replace a cache of any policy whose size is at
+    least the number of contents of the catalogue (see *equivalent_policies*),
+    which is the case of receiver caches in SIT scenarios. Since there is no
+    eviction order, items are dumped in increasing order.
+    """
+
+    # Policies behaving as this cache when their size is at least the
+    # catalogue size. Segmented LRU is not included because its segments
+    # evict items even if the cache is not full
+    equivalent_policies = ('LRU', 'FAST_LRU', 'LFU', 'FIFO', 'RAND')
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, n_contents=0, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        # Contents are usually numbered from 1 to n_contents
+        self._bitmap = bytearray(n_contents + 1)
+        self._len = 0
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return self._len
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        return [k for k, stored in enumerate(self._bitmap) if stored]
+
+    @inheritdoc(Cache)
+    def has(self, k):
+        return 0 <= k < len(self._bitmap) and self._bitmap[k] == 1
+
+    @inheritdoc(Cache)
+    def get(self, k):
+        return 0 <= k < len(self._bitmap) and self._bitmap[k] == 1
+
+    @inheritdoc(Cache)
+    def put(self, k):
+        if k < 0:
+            raise ValueError('Items must be non-negative integers')
+        if k >= len(self._bitmap):
+            self._bitmap.extend(bytearray(max(k + 1, 2*len(self._bitmap)) - len(self._bitmap)))
+        if not self._bitmap[k]:
+            self._bitmap[k] = 1
+            self._len += 1
+        return None
+
+    @inheritdoc(Cache)
+    def remove(self, k):
+        if not self.has(k):
+            return False
+        self._bitmap[k] = 0
+        self._len -= 1
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._bitmap = bytearray(len(self._bitmap))
+        self._len = 0
+
+
 def rand_insert_cache(cache, p, seed=None):
     """Return a random insertion cache
     
@@ -1455,6 +1701,12 @@ def ttl_cache(cache, f_time):
     However, if other operations like *position* or *len* are executed,
     results may take into account also expired items. In such cases, it is then
     advisable to execute a *purge* first.  
+
+    Expiration times are kept in a min-heap of (expiration time, insertion
+    sequence number, item) entries. Entries of items removed, evicted or whose
+    expiration time was extended are not removed from the heap but discarded
+    when they reach its top, so that purging expired items takes logarithmic
+    amortized time per item.
     """
     if not isinstance(cache, Cache):
         raise TypeError('cache must be an instance of Cache or its subclasses')
@@ -1467,7 +1719,10 @@ def ttl_cache(cache, f_time):
     cache.f_time = f_time
     cache.expiry = {}
     
-    cache._exp_list = LinkedSet()
+    # Heap of expiration entries and live entry of each item in the cache
+    cache._exp_heap = []
+    cache._exp_entry = {}
+    cache._exp_seq = 0
     
     c_put = cache.put
     c_get = cache.get
@@ -1484,11 +1739,21 @@ def ttl_cache(cache, f_time):
         expiry : float
             Cutoff expiration time
         """
-        while cache._exp_list.bottom is not None and \
-              cache.expiry[cache._exp_list.bottom] < expiry:
-            expired = cache._exp_list.pop_bottom()
-            cache.expiry.pop(expired)
-            c_remove(expired)
+        heap = cache._exp_heap
+        while heap and heap[0][0] < expiry:
+            entry = heapq.heappop(heap)
+            expired = entry[2]
+            if cache._exp_entry.get(expired) is entry:
+                del cache._exp_entry[expired]
+                cache.expiry.pop(expired)
+                c_remove(expired)
+
+    def _compact():
+        """Drop discarded entries from the heap once they are the majority
+        """
+        if len(cache._exp_heap) > 2*len(cache._exp_entry) + 16:
+            cache._exp_heap = cache._exp_entry.values()
+            heapq.heapify(cache._exp_heap)
         
     def purge():
         """Purge all expired items"""
@@ -1545,20 +1810,16 @@ def ttl_cache(cache, f_time):
         evicted = c_put(k)
         if evicted is not None:
             cache.expiry.pop(evicted)
-            cache._exp_list.remove(evicted)
+            del cache._exp_entry[evicted]
         if k not in cache.expiry or cache.expiry[k] < expires:
             cache.expiry[k] = expires
-            if k in cache._exp_list:
-                cache._exp_list.remove(k)
-            if len(cache._exp_list) == 0:
-                cache._exp_list.append_top(k)
-            else:
-                for i in cache._exp_list:
-                    if expires >= cache.expiry[i]:
-                        cache._exp_list.insert_above(i, k)
-                        break
-                else:
-                    cache._exp_list.append_bottom(k)
+            # Among items with the same expiration time, the first inserted
+            # is purged first
+            cache._exp_seq += 1
+            entry = (expires, cache._exp_seq, k)
+            cache._exp_entry[k] = entry
+            heapq.heappush(cache._exp_heap, entry)
+            _compact()
         return evicted
     
     def has(k):
@@ -1567,7 +1828,8 @@ def ttl_cache(cache, f_time):
     def remove(k):
         c_remove(k)
         cache.expiry.pop(k)
-        cache._exp_list.remove(k)
+        del cache._exp_entry[k]
+        _compact()
         
     def dump():
         """Return a dump of all the elements currently in the cache possibly
@@ -1586,7 +1848,8 @@ def ttl_cache(cache, f_time):
     def clear():
         c_clear()
         cache.expiry.clear()
-        cache._exp_list.clear()
+        cache._exp_entry.clear()
+        del cache._exp_heap[:]
 
     cache._purge_till = _purge_till
     
@@ -4,6 +4,8 @@
 from __future__ import division
 import random
 import abc
+import array
+import bisect
 import collections
 
 import networkx as nx
@@ -46,7 +48,13 @@ class RsnNexthop(object):
     """ 
     A nexthop entry along with its properties such as timestamp of insertion, 
     distance to the serving node, etc.
+
+    Instances of this class are not stored in the RSN table. They are
+    lightweight snapshots of a row of an `RsnEntry`, built only for the
+    nexthops returned by a query.
     """
+    __slots__ = ['nexthop', 'destination', 'distance', 'time_stamp', 'used_before']
+
     def __init__(self, nexthop, dest, distance, time_stamp, used=False):
         """Constructor
 
@@ -61,13 +69,29 @@ class RsnNexthop(object):
         self.destination = dest
         self.distance = distance
         self.time_stamp = time_stamp
-        self.used_before = used # has this next_hop been used before ?
+        self.used_before = used # has this next_hop been used before ?
     
-    def __hash__():
+    def __hash__(self):
         """ 
         Make RsnNexthop a hashable type
         """
-        return hash(repr(self))
+        return hash((self.nexthop, self.destination, self.distance,
+                     self.time_stamp, self.used_before))
+
+    def __eq__(self, other):
+        return isinstance(other, RsnNexthop) and \
+               (self.nexthop, self.destination, self.distance,
+                self.time_stamp, self.used_before) == \
+               (other.nexthop, other.destination, other.distance,
+                other.time_stamp, other.used_before)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'RsnNexthop(%r, %r, %r, %r, %r)' % (self.nexthop, self.destination,
+                                                 self.distance, self.time_stamp,
+                                                 self.used_before)
 
     def age(self, time_now):
         age = time_now - self.time_stamp
@@ -114,7 +138,7 @@ class RsnNexthop(object):
         if nexthop_obj is None:
             return False
         
-        if self.timestamp > nexthop_obj.timestamp:
+        if self.time_stamp > nexthop_obj.time_stamp:
             return True
         else:
             return False
@@ -130,29 +154,168 @@ class RsnNexthop(object):
 def get_timestamp(rsn_nexthop_obj):
     return rsn_nexthop_obj.time_stamp
 
+
+class RsnNexthopView(object):
+    """Read-only sequence view over the nexthops of an `RsnEntry`.
+
+    Rows are returned from the oldest to the freshest. `RsnNexthop` objects are
+    only built when rows are accessed, so ``len(rsn_entry.nexthops)`` does not
+    allocate anything.
+    """
+    __slots__ = ['_entry']
+
+    def __init__(self, entry):
+        self._entry = entry
+
+    def __len__(self):
+        return len(self._entry._nexthop)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._entry._row(j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError('nexthop index out of range')
+        return self._entry._row(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._entry._row(i)
+
+
 class RsnEntry(object):
-    """An entry in the RSN table retrieved by using a content name as the index"""
-    # self.expiration_interval = 0
+    """An entry in the RSN table retrieved by using a content name as the index
+
+    Nexthops are stored in parallel columns (nexthop, destination, distance,
+    key and used flag) kept sorted by key. The key of a nexthop is a
+    (timestamp, rank) tuple. Expired nexthops are therefore always a prefix
+    of the columns and are purged lazily, i.e. only when the entry is queried
+    or updated, while the k freshest nexthops are read from the tail of the
+    columns. The key of each nexthop is also indexed by nexthop, so that the
+    row of a nexthop is found by bisection.
+
+    Ranks order nexthops with the same timestamp as they were ordered when
+    nexthops were stored in a list, in which updated nexthops kept their
+    position, new nexthops were appended and which was sorted by decreasing
+    timestamp by each top-k query: the nexthop coming first in the list is
+    considered the freshest. New nexthops are therefore given a rank lower
+    than all others and top-k queries renumber ranks in the order of the
+    columns.
+    """
+    __slots__ = ['fresh_interval', 'expiration_interval', '_nexthop', '_dest',
+                 '_distance', '_key', '_used', '_keys', '_next_rank', '_ranked']
 
     def __init__(self, fresh_interval = float("inf"), expiration_interval = float("inf")):
         """Constructor 
         
         Parameters
         ----------
-        nexthops : a list of RsnNexthop objects,
         fresh_interval : the limit on the age of an entry for it to be considered fresh
         expiration_interval : the limit on the age of an entry; entry considered stale if age > expiration_interval
         """
-        self.nexthops = []
         self.fresh_interval = fresh_interval
         self.expiration_interval = expiration_interval
-        #RsnEntry.expiration_interval = expiration_interval
+        self._nexthop = []
+        self._dest = []
+        self._distance = array.array('l')
+        self._key = []
+        self._used = array.array('b')
+        # Key of each nexthop, rank of the next new nexthop and whether ranks
+        # are increasing in the order of the columns
+        self._keys = {}
+        self._next_rank = -1
+        self._ranked = True
     
-    def __hash__():
+    def __hash__(self):
         """ 
         Make RsnEntry a hashable type
         """
-        return hash(repr(self))
+        return id(self)
+
+    def __len__(self):
+        return len(self._nexthop)
+
+    def __getstate__(self):
+        return dict((k, getattr(self, k)) for k in self.__slots__)
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    @property
+    def nexthops(self):
+        """Read-only view of the nexthops of this entry, from oldest to
+        freshest.
+        """
+        return RsnNexthopView(self)
+
+    def _row(self, i):
+        return RsnNexthop(self._nexthop[i], self._dest[i], self._distance[i],
+                          self._key[i][0], bool(self._used[i]))
+
+    def _index(self, node):
+        key = self._keys.get(node)
+        return bisect.bisect_left(self._key, key) if key is not None else None
+
+    def _pop(self, i):
+        row = (self._nexthop.pop(i), self._dest.pop(i), self._distance.pop(i),
+               self._key.pop(i), self._used.pop(i))
+        del self._keys[row[0]]
+        return row
+
+    def _insert(self, nexthop, dest, distance, key, used):
+        # Since the timestamp of the key is normally not lower than any stored
+        # timestamp, this is an append in the common case
+        i = bisect.bisect_right(self._key, key)
+        if self._ranked and (i > 0 and self._key[i - 1][1] > key[1] or
+                             i < len(self._key) and self._key[i][1] < key[1]):
+            self._ranked = False
+        self._nexthop.insert(i, nexthop)
+        self._dest.insert(i, dest)
+        self._distance.insert(i, distance)
+        self._key.insert(i, key)
+        self._used.insert(i, 1 if used else 0)
+        self._keys[nexthop] = key
+
+    def _purge(self, time):
+        """Remove all nexthops expired at the given time
+        """
+        n = bisect.bisect_left(self._key, (time - self.expiration_interval,))
+        if n > 0:
+            for nexthop in self._nexthop[:n]:
+                del self._keys[nexthop]
+            del self._nexthop[:n]
+            del self._dest[:n]
+            del self._distance[:n]
+            del self._key[:n]
+            del self._used[:n]
+
+    def _rank(self):
+        """Renumber ranks in the order of the columns, i.e. by increasing
+        timestamp and rank
+        """
+        if not self._ranked:
+            n = len(self._key)
+            self._key = [(key[0], i - n) for i, key in enumerate(self._key)]
+            self._keys = dict(zip(self._nexthop, self._key))
+            self._next_rank = -n - 1
+            self._ranked = True
+
+    def _freshest(self, time, exclude, k):
+        """Return the indices of the k freshest nexthops not in exclude,
+        freshest first.
+        """
+        self._purge(time)
+        nexthop = self._nexthop
+        selected = []
+        i = len(nexthop) - 1
+        while i >= 0 and len(selected) < k:
+            if nexthop[i] not in exclude:
+                selected.append(i)
+            i -= 1
+        return selected
 
     def get_nexthop(self, node):
         """
@@ -166,23 +329,19 @@ class RsnEntry(object):
         Return RsnNexthop whose nexthop property is node
         If there is no such RnsNexthop, then return None
         """
-        for nh in self.nexthops:
-            if nh.nexthop == node:
-                return nh
-        else:
-            return None
+        i = self._index(node)
+        return self._row(i) if i is not None else None
 
     def age_nexthop(self, nh):
         """Increase the age of the nexthop to avoid reconsidering same nexthop when 
         there is no invalidation.
         Note: this is an alternative for invalidation
         """
-        
-        nexthops = [x for x in self.nexthops if x.nexthop == nh]
-        for nexthop in nexthops:
-            nexthop.time_stamp -= 100
-            if nexthop.time_stamp < 0:
-                nexthop.time_stamp = 0
+        i = self._index(nh)
+        if i is None:
+            return
+        nexthop, dest, distance, (stamp, rank), used = self._pop(i)
+        self._insert(nexthop, dest, distance, (max(stamp - 100, 0), rank), used)
 
     def delete_nexthop(self, nh):
         """ Delete a nexthop from the entry
@@ -191,7 +350,9 @@ class RsnEntry(object):
         ----------
         nh : node identifier; delete nexthop entry whose nexthop is nh
         """
-        self.nexthops = [x for x in self.nexthops if x.nexthop != nh] 
+        i = self._index(nh)
+        if i is not None:
+            self._pop(i)
 
     def insert_nexthop(self, nexthop, dest, distance, time, is_used=False):
         """insert a nexthop entry along with distance and time of insertion attributes
@@ -201,25 +362,25 @@ class RsnEntry(object):
         dest : destination cache node identifier
         distance : number of hops to the cache node
         time : time of insertion or tiem of last access to the entry
+        is_used : whether the nexthop has been used to retrieve content. Once
+            set, the flag of a nexthop is not cleared by later insertions
 
         Return
         ------
         if an entry exists with the same nexthop attr, update attr. and return the entry
         otherwise return the new entry inserted
         """
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)]
-        # check if there is a nexthop entry
-        for nh in self.nexthops:
-            if nh.nexthop == nexthop:
-                nh.time_stamp = time
-                nh.destination = dest
-                nh.distance = distance
-                nh.is_used = is_used
-                return nh
-
-        nexthop = RsnNexthop(nexthop, dest, distance, time, is_used)
-        self.nexthops.append(nexthop)
-        return nexthop
+        self._purge(time)
+        # check if there is a nexthop entry, which keeps its rank
+        i = self._index(nexthop)
+        if i is not None:
+            is_used = is_used or self._used[i]
+            rank = self._pop(i)[3][1]
+        else:
+            rank = self._next_rank
+            self._next_rank -= 1
+        self._insert(nexthop, dest, distance, (time, rank), is_used)
+        return RsnNexthop(nexthop, dest, distance, time, bool(is_used))
  
     # this method prefers a "used" nexthop over other unused nexthop entries
     def get_best_k_entry(self, time, node, num_entries):
@@ -235,27 +396,24 @@ class RsnEntry(object):
         Used entry means that the trail has been used to retrieve content before.
 
         """
-
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)] # remove stale entries
-        
-        # list comprehension is a nice tool!
-        best_nexthops = [x for x in self.nexthops if x.is_used_and_fresh(time, self.fresh_interval)]
-        best_nexthops = [x for x in best_nexthops if x.nexthop != node]
-        
-        best_nexthops.sort(key=get_timestamp, reverse=True)
-        if (len(best_nexthops) >= num_entries):
-            return best_nexthops[0:num_entries]
-        
-        # Add freshest nexthops if there is still space 
-        filtered_nexthops = [x for x in self.nexthops if not x.is_used_and_fresh(time, self.fresh_interval)]
-        filtered_nexthops = [x for x in filtered_nexthops if x.nexthop != node]
-        
-        filtered_nexthops.sort(key=get_timestamp, reverse=True)
-        len_best_nexthops = len(best_nexthops)
-        for nh in filtered_nexthops[0:(num_entries-len_best_nexthops)]:
-            best_nexthops.append(nh)
-        
-        return best_nexthops
+        self._purge(time)
+        nexthop, key, used = self._nexthop, self._key, self._used
+        fresh_since = time - self.fresh_interval
+        # Used and fresh nexthops are at the tail of the columns
+        best = []
+        i = len(nexthop) - 1
+        while i >= 0 and key[i][0] >= fresh_since and len(best) < num_entries:
+            if used[i] and nexthop[i] != node:
+                best.append(i)
+            i -= 1
+        if len(best) < num_entries:
+            best_set = set(best)
+            for i in xrange(len(nexthop) - 1, -1, -1):
+                if i not in best_set and nexthop[i] != node:
+                    best.append(i)
+                    if len(best) == num_entries:
+                        break
+        return [self._row(i) for i in best]
 
     def get_freshest_entry(self, time):
         """ 
@@ -268,14 +426,7 @@ class RsnEntry(object):
         freshest nexthop (i.e., with min age) entry that is not stale
         Otherwise, it returns None
         """
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)] # remove stale entries
-        
-        freshest = None
-        for n in self.nexthops:
-            if freshest is None or n.age(time) < freshest.age(time):
-                freshest = n
-
-        return freshest
+        return self.get_freshest_except_nodes(time, ())
     
     def get_freshest_except_node(self, time, node):
         """ 
@@ -288,16 +439,7 @@ class RsnEntry(object):
         freshest nexthop : freshest (i.e., with min age) entry that is not stale and whose node attr is not equal to node
         Otherwise, it returns None
         """
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)]
-        freshest = None
-        for n in self.nexthops:
-            if freshest is None or (n.age(time) < freshest.age(time) and n.nexthop != node):
-                freshest = n
-
-        if freshest is not None and freshest.nexthop == node:
-            freshest = None
-
-        return freshest
+        return self.get_freshest_except_nodes(time, (node,))
     
     def get_topk_freshest_except_nodes(self, time, nodes, k):
         """ 
@@ -311,13 +453,9 @@ class RsnEntry(object):
         -------
         list of k most freshest nexthops : freshest (i.e., with min age) entry that is not stale and whose node attr is not equal to node
         """
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)]
-        # Sort the list of nexthops by their age
-        self.nexthops.sort(key=get_timestamp, reverse=True)
-        
-        filtered_nexthops = self.nexthops[:]
-        filtered_nexthops = [x for x in filtered_nexthops if x.nexthop not in nodes]
-        return filtered_nexthops[0:k]
+        selected = self._freshest(time, nodes, k)
+        self._rank()
+        return [self._row(i) for i in selected]
 
     def get_topk_freshest_except_node(self, time, node, k):
         """ 
@@ -331,20 +469,9 @@ class RsnEntry(object):
         -------
         list of k most freshest nexthops : freshest (i.e., with min age) entry that is not stale and whose node attr is not equal to node
         """
-        
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)]
-        # Sort the list of nexthops by their age
-        self.nexthops.sort(key=get_timestamp, reverse=True)
-        
-        filtered_nexthops = self.nexthops[:]
-        filtered_nexthops = [x for x in filtered_nexthops if x.nexthop != node]
-        return filtered_nexthops[0:k]
-
-        #nexthop_obj = self.nexthops[0] if len(self.nexthops) > 0 else None
-        #if nexthop_obj is not None and nexthop_obj.is_fresh(time, self.fresh_interval):
-        #    return [nexthop_obj]
-        #else:
-        #    return self.nexthops[0:k]
+        selected = self._freshest(time, (node,), k)
+        self._rank()
+        return [self._row(i) for i in selected]
 
     def get_freshest_except_nodes(self, time, nodes):
         """ 
@@ -358,16 +485,8 @@ class RsnEntry(object):
         freshest nexthop : freshest (i.e., with min age) entry that is not stale and whose node attr is not equal to node
         Otherwise, it returns None
         """
-        self.nexthops = [x for x in self.nexthops if not x.is_expired(time, self.expiration_interval)]
-        freshest = None
-        for n in self.nexthops:
-            if freshest is None or (n.age(time) < freshest.age(time) and n.nexthop not in nodes):
-                freshest = n
-        
-        if freshest is not None and freshest.nexthop in nodes:
-            freshest = None
-
-        return freshest
+        selected = self._freshest(time, nodes, 1)
+        return self._row(selected[0]) if selected else None
 
 
 class Strategy(object):
@@ -498,20 +617,9 @@ class Scoped_flooding(Strategy):
         self.scope = scope
         
         self.receivers_list = list(self.topo.receivers())
+        self.receiver_index = dict((v, i) for i, v in enumerate(self.receivers_list))
         self.sources_list = list(self.topo.sources())
     
-    def weighted_choice(self, items, weights):
-
-        total = sum(weights)
-        chosen = random.uniform(0, total)
-        cumulative = 0
-        index=0
-        for item in items:
-            cumulative += weights[index]
-            index += 1
-            if cumulative > chosen:
-                return item
-
     def disconnect_content(self, receiver, connections):
         """ 
         Disconnect a user from the network: Simulated by keeping a track of the number
@@ -521,14 +629,11 @@ class Scoped_flooding(Strategy):
         the cache. In that case, we still disconnect the user without evicting the item
         from the cache.
         """
-        receiver_index = self.receivers_list.index(receiver)
-        receiver_conns = connections[receiver_index]
-        positives = [x for x in receiver_conns.keys() if receiver_conns[x] > 0]
-        weights = [receiver_conns[x] for x in positives]
+        receiver_conns = connections[self.receiver_index[receiver]]
+        key = receiver_conns.weighted_choice()
         ret = None
-        if len(positives) > 0:
-            key = self.weighted_choice(positives, weights)
-            receiver_conns[key] -= 1
+        if key is not None:
+            receiver_conns.decrement(key)
             if receiver_conns[key] == 0 and self.view.cache_lookup(receiver, key):
             # Remove the content from the cache
                 if not self.view.has_cache(receiver):
@@ -553,8 +658,8 @@ class Scoped_flooding(Strategy):
                 #    u = path[hop - 1]
                 #    v = path[hop]
                 #    self.controller.forward_request_hop(u, v)
-            path.reverse()
-            if path[0] in self.sources_list:
+            path = path[::-1]
+            if self.topo.is_source(path[0]):
                 print "Error: path includes the source!\n"
             for hop in range(1, len(path)):
                 curr_hop = path[hop]
@@ -620,7 +725,7 @@ class Scoped_flooding(Strategy):
                 neighbors = self.topo.neighbors(n)
                 neighbors = list(set(neighbors) - set(visited))
                 for neighbor in neighbors:
-                    if neighbor in visited or neighbor in self.sources_list:
+                    if neighbor in visited or self.topo.is_source(neighbor):
                         continue
                     visited.add(neighbor)
                     self.controller.forward_request_hop(n, neighbor) #new
@@ -686,20 +791,9 @@ class Sit_with_scoped_flooding(Strategy):
         #num_receviers = len(self.topo.receivers())
         #self.connections = [dict() for x in range(num_receviers)]
         self.receivers_list = list(self.topo.receivers())
+        self.receiver_index = dict((v, i) for i, v in enumerate(self.receivers_list))
         self.sources_list = list(self.topo.sources())
     
-    def weighted_choice(self, items, weights):
-
-        total = sum(weights)
-        chosen = random.uniform(0, total)
-        cumulative = 0
-        index=0
-        for item in items:
-            cumulative += weights[index]
-            index += 1
-            if cumulative > chosen:
-                return item
-
     def disconnect_content(self, receiver, connections):
         """ 
         Disconnect a user from the network: Simulated by keeping a track of the number
@@ -709,14 +803,11 @@ class Sit_with_scoped_flooding(Strategy):
         the cache. In that case, we still disconnect the user without evicting the item
         from the cache.
         """
-        receiver_index = self.receivers_list.index(receiver)
-        receiver_conns = connections[receiver_index]
-        positives = [x for x in receiver_conns.keys() if receiver_conns[x] > 0]
-        weights = [receiver_conns[x] for x in positives]
+        receiver_conns = connections[self.receiver_index[receiver]]
+        key = receiver_conns.weighted_choice()
         ret = None
-        if len(positives) > 0:
-            key = self.weighted_choice(positives, weights)
-            receiver_conns[key] -= 1
+        if key is not None:
+            receiver_conns.decrement(key)
             if receiver_conns[key] == 0 and self.view.cache_lookup(receiver, key):
             # Remove the content from the cache
                 if not self.view.has_cache(receiver):
@@ -792,8 +883,8 @@ class Sit_with_scoped_flooding(Strategy):
                 #    u = path[hop - 1]
                 #    v = path[hop]
                 #    self.controller.forward_request_hop(u, v)
-            path.reverse()
-            if path[0] in self.sources_list:
+            path = path[::-1]
+            if self.topo.is_source(path[0]):
                 print "Error: path includes the source!\n"
             for hop in range(1, len(path)):
                 curr_hop = path[hop]
@@ -879,7 +970,7 @@ class Sit_with_scoped_flooding(Strategy):
                 neighbors = self.topo.neighbors(n)
                 neighbors = list(set(neighbors) - set(visited))
                 for neighbor in neighbors:
-                    if neighbor in visited or neighbor in self.sources_list:
+                    if neighbor in visited or self.topo.is_source(neighbor):
                         continue
                     self.controller.forward_request_hop(n, neighbor) #new
                     visited.add(neighbor)
@@ -953,20 +1044,9 @@ class Sit_only(Strategy):
         #num_receviers = len(self.topo.receivers())
         #self.connections = [dict() for x in range(num_receviers)]
         self.receivers_list = list(self.topo.receivers())
+        self.receiver_index = dict((v, i) for i, v in enumerate(self.receivers_list))
         self.sources_list = list(self.topo.sources())
     
-    def weighted_choice(self, items, weights):
-
-        total = sum(weights)
-        chosen = random.uniform(0, total)
-        cumulative = 0
-        index=0
-        for item in items:
-            cumulative += weights[index]
-            index += 1
-            if cumulative > chosen:
-                return item
-
     
     def disconnect_content(self, receiver, connections):
         """ 
@@ -977,14 +1057,11 @@ class Sit_only(Strategy):
         the cache. In that case, we still disconnect the user without evicting the item
         from the cache.
         """
-        receiver_index = self.receivers_list.index(receiver)
-        receiver_conns = connections[receiver_index]
-        positives = [x for x in receiver_conns.keys() if receiver_conns[x] > 0]
-        weights = [receiver_conns[x] for x in positives]
+        receiver_conns = connections[self.receiver_index[receiver]]
+        key = receiver_conns.weighted_choice()
         ret = None
-        if len(positives) > 0:
-            key = self.weighted_choice(positives, weights)
-            receiver_conns[key] -= 1
+        if key is not None:
+            receiver_conns.decrement(key)
             if receiver_conns[key] == 0 and self.view.cache_lookup(receiver, key):
             # Remove the content from the cache
                 if not self.view.has_cache(receiver):
@@ -1101,8 +1178,8 @@ class Sit_only(Strategy):
                     u = path[hop - 1]
                     v = path[hop]
                     self.controller.forward_request_hop(u, v)
-            path.reverse()
-            if path[0] in self.sources_list:
+            path = path[::-1]
+            if self.topo.is_source(path[0]):
                 print "Error: path includes the source!\n"
                 
             for hop in range(1, len(path)):
@@ -1881,6 +1958,7 @@ class Ndn_sit(Strategy):
         self.p = p
         self.topo = view.topology()
         self.receivers_list = list(self.topo.receivers())
+        self.receiver_index = dict((v, i) for i, v in enumerate(self.receivers_list))
 
     def disconnect_content(self, receiver, connections):
         """ 
@@ -1891,13 +1969,11 @@ class Ndn_sit(Strategy):
         the cache. In that case, we still disconnect the user without evicting the item
         from the cache.
         """
-        receiver_index = self.receivers_list.index(receiver)
-        receiver_conns = connections[receiver_index]
-        positives = [x for x in receiver_conns.keys() if receiver_conns[x] > 0]
+        receiver_conns = connections[self.receiver_index[receiver]]
+        key = receiver_conns.choice()
         ret = None
-        if len(positives) > 0:
-            key = random.choice(positives)
-            receiver_conns[key] -= 1
+        if key is not None:
+            receiver_conns.decrement(key)
             if receiver_conns[key] == 0 and self.view.cache_lookup(receiver, key):
             # Remove the content from the cache
                 if not self.view.has_cache(receiver):
@@ -1945,7 +2021,7 @@ class Ndn_sit(Strategy):
             if v != source:
                 self.controller.forward_request_hop(u, v)
         else: # for concluded without break. Content is not found on-path, return requestback as a NACK (i.e., negative response)
-            path.reverse()
+            path = path[::-1]
             for hop in range(0, len(path)-1):
                 u = path[hop]
                 v = path[hop+1]
@@ -2343,7 +2419,7 @@ class LiraBcHybrid(Strategy):
                     u = path[hop - 1]
                     v = path[hop]
                     self.controller.forward_request_hop(u, v)
-            path.reverse()
+            path = path[::-1]
             if path[0] == source:
                 content_placed = False
                 for hop in range(1, len(path)):
@@ -2562,7 +2638,7 @@ class LiraDfibOph(Strategy):
                     u = path[hop - 1]
                     v = path[hop]
                     self.controller.forward_request_hop(u, v)
-            path.reverse()
+            path = path[::-1]
             if path[0] == source:
             # Content coming from the server (i.e., source)
                 content_placed = False
@@ -2807,7 +2883,7 @@ class LiraDfib(Strategy):
                     u = path[hop - 1]
                     v = path[hop]
                     self.controller.forward_request_hop(u, v)
-            path.reverse()
+            path = path[::-1]
             for hop in range(1, len(path)):
                 curr_hop = path[hop]
                 prev_hop = path[hop-1]
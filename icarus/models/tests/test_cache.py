@@ -9,6 +9,8 @@ else:
         raise ImportError("The unittest2 package is needed to run the tests.") 
 del sys
 import collections
+import copy
+import pickle
 
 import numpy as np
 
@@ -215,6 +217,14 @@ class TestLinkedSet(unittest.TestCase):
         self.assertEqual(list(c), [])
         c.clear()
 
+    def test_pickle(self):
+        c = cache.LinkedSet(range(10000))
+        c.move_to_top(5)
+        p = pickle.loads(pickle.dumps(c, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(list(c), list(p))
+        self.link_consistency(p)
+        self.assertEqual(1, p.index(0))
+
     def test_duplicated_elements(self):
         self.assertRaises(ValueError, cache.LinkedSet, iterable=[1, 1, 2])
         self.assertRaises(ValueError, cache.LinkedSet, iterable=[1, None, None])
@@ -274,6 +284,49 @@ class TestLruCache(unittest.TestCase):
         self.assertEqual(c.position(3), 2)
         self.assertEqual(c.position(4), 3)
 
+class TestFastLruCache(unittest.TestCase):
+
+    def test_lru(self):
+        c = cache.FastLruCache(4)
+        for k in [0, 2, 3, 4]:
+            c.put(k)
+        self.assertEquals(len(c), 4)
+        self.assertEquals(c.dump(), [4, 3, 2, 0])
+        self.assertEquals(c.put(5), 0)
+        self.assertEquals(c.put(5), None)
+        self.assertEquals(c.dump(), [5, 4, 3, 2])
+        self.assertTrue(c.get(2))
+        self.assertFalse(c.get(0))
+        self.assertEquals(c.dump(), [2, 5, 4, 3])
+        self.assertEquals(c.position(4), 2)
+        self.assertTrue(c.remove(5))
+        self.assertFalse(c.remove(5))
+        self.assertEquals(c.dump(), [2, 4, 3])
+        c.clear()
+        self.assertEquals(len(c), 0)
+        self.assertEquals(c.dump(), [])
+
+    def test_same_as_lru(self):
+        rng = np.random.RandomState(0)
+        lru = cache.LruCache(10)
+        fast = cache.FastLruCache(10)
+        for op, k in zip(rng.randint(0, 4, 5000), rng.randint(0, 30, 5000)):
+            op = ['GET', 'PUT', 'PUT', 'DELETE'][op]
+            self.assertEqual(lru.do(op, k), fast.do(op, k))
+            self.assertEqual(lru.has(k), fast.has(k))
+            self.assertEqual(lru.dump(), fast.dump())
+
+    def test_deepcopy(self):
+        c = cache.FastLruCache(3)
+        c.put(1)
+        c.put(2)
+        d = copy.deepcopy(c)
+        d.put(3)
+        d.put(4)
+        self.assertEqual(c.dump(), [2, 1])
+        self.assertEqual(d.dump(), [4, 3, 2])
+
+
 class TestSlruCache(unittest.TestCase):
 
     def test_put_get(self):
@@ -484,6 +537,33 @@ class TestRandCache(unittest.TestCase):
             self.assertTrue(c.has(v))
 
 
+class TestInfiniteCache(unittest.TestCase):
+
+    def test_put_get(self):
+        c = cache.InfiniteCache(5, n_contents=5)
+        for k in (3, 1, 5, 3):
+            self.assertIsNone(c.put(k))
+        self.assertEqual(3, len(c))
+        self.assertEqual([1, 3, 5], c.dump())
+        self.assertTrue(c.get(3))
+        self.assertFalse(c.get(2))
+        self.assertFalse(c.has(-1))
+        self.assertFalse(c.has(100))
+        self.assertTrue(c.remove(3))
+        self.assertFalse(c.remove(3))
+        self.assertEqual([1, 5], c.dump())
+        c.clear()
+        self.assertEqual(0, len(c))
+        self.assertEqual([], c.dump())
+
+    def test_grow(self):
+        c = cache.InfiniteCache(5)
+        c.put(20)
+        self.assertTrue(c.has(20))
+        self.assertEqual([20], c.dump())
+        self.assertRaises(ValueError, c.put, -1)
+
+
 class TestLfuCache(unittest.TestCase):
 
     def test_lfu(self):
@@ -513,6 +593,45 @@ class TestLfuCache(unittest.TestCase):
         c.clear()
         self.assertEquals(len(c), 0)
         self.assertEquals(c.dump(), [])
+
+    def test_ties(self):
+        c = cache.LfuCache(3)
+        for k in (1, 2, 3):
+            c.put(k)
+        c.get(2)
+        self.assertEquals(c.put(4), 1)
+        self.assertEquals(c.put(5), 3)
+        c.get(4)
+        c.get(5)
+        # All other items are more frequent: the new item is evicted
+        self.assertEquals(c.put(6), 6)
+        self.assertEquals(c.dump(), [5, 4, 2])
+
+    def test_eviction_order(self):
+        # Reference implementation scanning all items on eviction
+        counters = {}
+        c = cache.LfuCache(10)
+        rng = np.random.RandomState(0)
+        t = 0
+        for op, k in zip(rng.randint(0, 5, 5000), rng.randint(0, 30, 5000)):
+            if op < 2:
+                self.assertEqual(k in counters, c.get(k))
+                if k in counters:
+                    counters[k] = (counters[k][0] + 1, counters[k][1])
+            elif op < 4:
+                evicted = None
+                if k not in counters:
+                    t += 1
+                    counters[k] = (1, t)
+                    if len(counters) > 10:
+                        evicted = min(counters, key=lambda x: counters[x])
+                        del counters[evicted]
+                self.assertEqual(evicted, c.put(k))
+            else:
+                self.assertEqual(k in counters, c.remove(k))
+                counters.pop(k, None)
+            self.assertEqual(sorted(counters, key=lambda x: counters[x], reverse=True),
+                             c.dump())
         
     def test_remove(self):
         c = cache.FifoCache(4)
@@ -750,6 +869,27 @@ class TestTtlCache(unittest.TestCase):
         self.assertEqual(len(c), 0)
         self.assertEqual(c.dump(), [])
         
+    def test_purge_many(self):
+        now = [0.0]
+        c = cache.ttl_cache(cache.LruCache(50), lambda: now[0])
+        expiry = {}
+        rng = np.random.RandomState(0)
+        for _ in range(2000):
+            now[0] += 0.1
+            k = rng.randint(0, 100)
+            if rng.random_sample() < 0.2:
+                if k in expiry and c.has(k):
+                    c.remove(k)
+                    del expiry[k]
+                continue
+            c.put(k, ttl=rng.random_sample()*10)
+            c.purge()
+            expiry = dict(c.dump())
+            self.assertTrue(all(t >= now[0] for t in expiry.values()))
+            self.assertLessEqual(len(c._exp_heap), 2*len(c) + 17)
+        now[0] += 10
+        self.assertEqual([], c.dump())
+
     def test_naming(self):
         c = cache.ttl_cache(cache.FifoCache(4), lambda: 0)
         self.assertEqual(c.get.__name__, 'get')
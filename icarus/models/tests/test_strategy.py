@@ -11,6 +11,7 @@ import fnss
 
 import icarus.models as strategy
 from icarus.execution import NetworkModel, NetworkView, NetworkController, TestCollector
+from icarus.models.strategy import RsnEntry
 
 
 def on_path_topology():
@@ -729,4 +730,109 @@ class TestLira(unittest.TestCase):
         cont_hops = summary['content_hops']
         self.assertListEqual(exp_req_hops, req_hops)
         self.assertListEqual(exp_cont_hops, cont_hops)
-        self.assertEqual(10, summary['serving_node'])
\ No newline at end of file
+        self.assertEqual(10, summary['serving_node'])
+
+class TestRsnEntry(unittest.TestCase):
+
+    def test_insert_and_len(self):
+        e = RsnEntry()
+        self.assertEqual(0, len(e.nexthops))
+        e.insert_nexthop(1, 10, 3, 1.0)
+        e.insert_nexthop(2, 20, 4, 2.0)
+        self.assertEqual(2, len(e.nexthops))
+        self.assertEqual([1, 2], [nh.nexthop for nh in e.nexthops])
+        nh = e.get_nexthop(2)
+        self.assertEqual(20, nh.destination)
+        self.assertEqual(4, nh.distance)
+        self.assertEqual(2.0, nh.time_stamp)
+        self.assertIsNone(e.get_nexthop(3))
+
+    def test_update_existing_nexthop(self):
+        e = RsnEntry()
+        e.insert_nexthop(1, 10, 3, 1.0, True)
+        e.insert_nexthop(2, 20, 4, 2.0)
+        e.insert_nexthop(1, 11, 5, 3.0)
+        self.assertEqual(2, len(e.nexthops))
+        nh = e.get_freshest_entry(3.0)
+        self.assertEqual(1, nh.nexthop)
+        self.assertEqual(11, nh.destination)
+        self.assertEqual(5, nh.distance)
+        self.assertTrue(nh.is_used())
+
+    def test_expiry(self):
+        e = RsnEntry(fresh_interval=5, expiration_interval=10)
+        e.insert_nexthop(1, 1, 1, 0.0)
+        e.insert_nexthop(2, 2, 1, 5.0)
+        e.insert_nexthop(3, 3, 1, 10.0)
+        self.assertEqual(3, len(e.get_topk_freshest_except_nodes(10.0, [], 5)))
+        self.assertEqual([3, 2], [nh.nexthop for nh in
+                                  e.get_topk_freshest_except_nodes(12.0, [], 5)])
+        self.assertEqual(2, len(e.nexthops))
+        self.assertIsNone(e.get_freshest_entry(30.0))
+        self.assertEqual(0, len(e.nexthops))
+
+    def test_topk_freshest_except_node(self):
+        e = RsnEntry()
+        for t, v in enumerate([1, 2, 3, 4, 5]):
+            e.insert_nexthop(v, v, 1, t)
+        topk = e.get_topk_freshest_except_node(10, 4, 3)
+        self.assertEqual([5, 3, 2], [nh.nexthop for nh in topk])
+        topk = e.get_topk_freshest_except_nodes(10, [5, 3], 2)
+        self.assertEqual([4, 2], [nh.nexthop for nh in topk])
+        self.assertEqual(5, e.get_freshest_except_node(10, 4).nexthop)
+        self.assertEqual(4, e.get_freshest_except_node(10, 5).nexthop)
+        self.assertEqual(3, e.get_freshest_except_nodes(10, [4, 5]).nexthop)
+
+    def test_same_timestamp_insertion_order(self):
+        e = RsnEntry()
+        e.insert_nexthop(1, 1, 1, 1.0)
+        e.insert_nexthop(2, 2, 1, 1.0)
+        e.insert_nexthop(3, 3, 1, 0.5)
+        topk = e.get_topk_freshest_except_nodes(2.0, [], 3)
+        self.assertEqual([1, 2, 3], [nh.nexthop for nh in topk])
+
+    def test_same_timestamp_reinsertion(self):
+        e = RsnEntry()
+        e.insert_nexthop(1, 1, 1, 1.0)
+        e.insert_nexthop(2, 2, 1, 1.0)
+        # Re-inserted nexthops keep their order among equal timestamps
+        e.insert_nexthop(1, 1, 2, 1.0)
+        self.assertEqual([1, 2], [nh.nexthop for nh in
+                                  e.get_topk_freshest_except_nodes(2.0, [], 2)])
+        self.assertEqual(1, e.get_freshest_entry(2.0).nexthop)
+
+    def test_same_timestamp_after_topk(self):
+        # Top-k queries order nexthops by decreasing timestamp, which orders
+        # nexthops later updated to the same timestamp
+        for query, expected in ((False, [4, 3]), (True, [3, 4])):
+            e = RsnEntry()
+            e.insert_nexthop(4, 4, 1, 8.0)
+            e.insert_nexthop(3, 3, 1, 12.0)
+            if query:
+                e.get_topk_freshest_except_node(12.0, None, 1)
+            e.insert_nexthop(4, 4, 1, 20.0)
+            e.insert_nexthop(3, 3, 1, 20.0)
+            self.assertEqual(expected, [nh.nexthop for nh in
+                                        e.get_topk_freshest_except_nodes(20.0, [], 2)])
+
+    def test_best_k_entry(self):
+        e = RsnEntry(fresh_interval=5)
+        e.insert_nexthop(1, 1, 1, 1.0, True)
+        e.insert_nexthop(2, 2, 1, 4.0, True)
+        e.insert_nexthop(3, 3, 1, 5.0)
+        e.insert_nexthop(4, 4, 1, 6.0)
+        best = e.get_best_k_entry(7.0, 4, 2)
+        self.assertEqual([2, 3], [nh.nexthop for nh in best])
+        best = e.get_best_k_entry(7.0, None, 4)
+        self.assertEqual([2, 4, 3, 1], [nh.nexthop for nh in best])
+
+    def test_delete_and_age_nexthop(self):
+        e = RsnEntry()
+        e.insert_nexthop(1, 1, 1, 200.0)
+        e.insert_nexthop(2, 2, 1, 150.0)
+        e.age_nexthop(1)
+        self.assertEqual(100.0, e.get_nexthop(1).time_stamp)
+        self.assertEqual(2, e.get_freshest_entry(200.0).nexthop)
+        e.delete_nexthop(2)
+        e.delete_nexthop(3)
+        self.assertEqual([1], [nh.nexthop for nh in e.nexthops])
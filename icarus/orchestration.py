@@ -5,24 +5,34 @@ of parameters specified in the user-provided settings, schedule experiment
 execution on various
 """
 from __future__ import division
+import os
 import time
+import math
+import shutil
+import tempfile
 import collections
 import multiprocessing as mp
 import logging
 import copy
 import sys
 import signal
+import heapq
+import threading
+import functools
 import traceback
 
-from icarus.execution import exec_experiment
+from icarus.execution import exec_experiment, exec_shard, merge_shards, \
+                             PrecomputationCache, WarmupSnapshotCache, warmup_key, \
+                             Profiler
 from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT, CONTENT_PLACEMENT, \
                             JOINT_CACHE_RSN_PLACEMENT, RSN_PLACEMENT, CACHE_POLICY, \
                             WORKLOAD, DATA_COLLECTOR, STRATEGY
-from icarus.results import ResultSet
-from icarus.util import SequenceNumber, timestr
+from icarus.results import ResultSet, ResultsLog
+from icarus.util import SequenceNumber, timestr, peak_rss, memstr, params_digest, \
+                        Tree, FrozenTree
 
 
-__all__ = ['Orchestrator', 'run_scenario']
+__all__ = ['Orchestrator', 'CostModel', 'run_scenario']
 
 
 logger = logging.getLogger('orchestration')
@@ -54,6 +64,23 @@ class Orchestrator(object):
         self.n_fail = 0
         self.summary_freq = summary_freq
         self._stop = False
+        self.precomputation_dir = None
+        self._tmp_precomputation_dir = None
+        self.snapshot_dir = None
+        self._tmp_snapshot_dir = None
+        self.results_log = None
+        self.n_resumed = 0
+        self.cost_model = CostModel()
+        self.n_shards = 1
+        self._pending = {}
+        self._running = {}
+        # Results of the jobs submitted to the pool and their experiments,
+        # keyed like running jobs
+        self._async = {}
+        # Values returned by the shards completed so far of each experiment
+        self._shards = collections.defaultdict(list)
+        # Lock protecting the state above, which is updated by pool callbacks
+        self._lock = threading.RLock()
         if settings.PARALLEL_EXECUTION:
             self.pool = mp.Pool(settings.N_PROCESSES)
     
@@ -65,6 +92,9 @@ class Orchestrator(object):
         if self.settings.PARALLEL_EXECUTION:
             self.pool.terminate()
             self.pool.join()
+        self.cleanup_precomputation()
+        self.cleanup_snapshots()
+        self.close_results_log()
     
     def run(self):
         """Run the orchestrator.
@@ -77,28 +107,45 @@ class Orchestrator(object):
             logger.error('No EXPERIMENT_QUEUE setting found. Exiting')
             sys.exit(-1)
         queue = collections.deque(self.settings.EXPERIMENT_QUEUE)
-        # Calculate number of experiments and number of processes
-        self.n_exp = len(queue) * self.settings.N_REPLICATIONS 
+        if 'CHECKPOINT_LOG' in self.settings and self.settings.CHECKPOINT_LOG:
+            self.open_results_log(self.settings.CHECKPOINT_LOG)
+        jobs = self.jobs(queue)
+        if 'N_SHARDS' in self.settings:
+            self.n_shards = self.settings.N_SHARDS
+        if self.n_shards > 1:
+            unmergeable = [m for m in self.settings.DATA_COLLECTORS
+                           if m in DATA_COLLECTOR and
+                           'merge' not in DATA_COLLECTOR[m].__dict__]
+            if unmergeable:
+                logger.error('Data collectors %s cannot be merged, N_SHARDS '
+                             'must be 1. Exiting' % ', '.join(unmergeable))
+                sys.exit(-1)
+        # Calculate number of experiments, jobs and number of processes
+        self.n_exp = len(jobs)
+        self.n_jobs = self.n_exp*self.n_shards
         self.n_proc = self.settings.N_PROCESSES \
                       if self.settings.PARALLEL_EXECUTION \
                       else 1
-        logger.info('Starting simulations: %d experiments, %d process(es)' 
-                    % (self.n_exp, self.n_proc))
+        logger.info('Starting simulations: %d experiments, %d shard(s) each, '
+                    '%d process(es)' % (self.n_exp, self.n_shards, self.n_proc))
+        if 'SHARE_PRECOMPUTATION' in self.settings and self.settings.SHARE_PRECOMPUTATION:
+            self.precompute([experiment for experiment, _ in jobs])
+        if 'SHARE_WARMUP' in self.settings and self.settings.SHARE_WARMUP:
+            self.prepare_snapshots()
         
+        # Jobs not started yet and jobs running, keyed by results log key of
+        # the experiment and shard index, with their estimated duration and
+        # start time
+        self._pending = dict(((key, shard), experiment)
+                             for experiment, key in jobs
+                             for shard in range(self.n_shards))
+        self._running = {}
         if self.settings.PARALLEL_EXECUTION:
-            # This job queue is used only to keep track of which jobs have
-            # finished and which are still running. Currently this information
-            # is used only to handle keyboard interrupts correctly
-            job_queue = collections.deque()
-            # Schedule experiments from the queue
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    job_queue.append(self.pool.apply_async(run_scenario,
-                            args=(self.settings, experiment,
-                                  self.seq.assign(), self.n_exp),
-                            callback=self.experiment_callback))
-            self.pool.close()
+            # Experiments are submitted to the pool one at a time, as soon as
+            # a process is free, so that the longest pending experiment, as
+            # estimated with all durations observed so far, always runs next
+            for _ in range(self.n_proc):
+                self.dispatch()
             # This solution is probably not optimal, but at least makes
             # KeyboardInterrupt work fine, which is crucial if launching the
             # simulation remotely via screen.
@@ -107,35 +154,329 @@ class Orchestrator(object):
             # We may have to wait up to 5 seconds after the last process
             # terminates before exiting, which is really negligible
             try:
-                while job_queue:
-                    job = job_queue.popleft()
-                    while not job.ready():
-                        time.sleep(5)
+                while self._pending or self._running:
+                    time.sleep(5)
+                    self.poll()
             except KeyboardInterrupt:
                 self.pool.terminate()
+            self.pool.close()
             self.pool.join()
         
         else: # Single-process execution
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    self.experiment_callback(run_scenario(self.settings, 
-                                            experiment, self.seq.assign(),
-                                            self.n_exp))
-                    if self._stop:
-                        self.stop()
+            while self._pending and not self._stop:
+                key, experiment = self.next_job()
+                self._running[key] = (self.cost_model.estimate(experiment, self.n_shards),
+                                      time.time())
+                self.job_callback(run_scenario(self.settings, 
+                                  experiment, self.seq.assign(),
+                                  self.n_jobs, self.precomputation_dir,
+                                  self.snapshot_dir, *self.shard_args(key)),
+                                  experiment=experiment, key=key)
+                if self._stop:
+                    self.stop()
 
+        self.cleanup_precomputation()
+        self.cleanup_snapshots()
+        self.close_results_log()
         logger.info('END | Planned: %d, Completed: %d, Succeeded: %d, Failed: %d', 
                     self.n_exp, self.n_fail + self.n_success, self.n_success, self.n_fail)
+    
+    def next_job(self):
+        """Remove from the pending jobs and return the one with the longest
+        estimated duration
+        
+        Returns
+        -------
+        job : tuple
+            A (key, experiment) tuple
+        """
+        estimate = self.cost_model.estimate
+        key = max(self._pending, key=lambda k: (estimate(self._pending[k], self.n_shards), k))
+        return key, self._pending.pop(key)
+    
+    def dispatch(self):
+        """Submit the longest pending job, if any, to the pool
+        """
+        with self._lock:
+            if not self._pending or self._stop:
+                return
+            key, experiment = self.next_job()
+            self._running[key] = (self.cost_model.estimate(experiment, self.n_shards),
+                                  time.time())
+            result = self.pool.apply_async(run_scenario,
+                    args=(self.settings, experiment, self.seq.assign(),
+                          self.n_jobs, self.precomputation_dir,
+                          self.snapshot_dir) + self.shard_args(key),
+                    callback=functools.partial(self.job_callback,
+                                               experiment=experiment, key=key))
+            self._async[key] = (result, experiment)
+    
+    def poll(self):
+        """Terminate the jobs submitted to the pool whose result was not
+        passed to job_callback, i.e. whose result could not be returned by
+        the worker process, e.g. because it could not be pickled
+        
+        Results are ready only after the callback of the job returned, so
+        jobs ready and successful have already been terminated.
+        """
+        with self._lock:
+            ready = [(key, result, experiment)
+                     for key, (result, experiment) in self._async.items()
+                     if result.ready()]
+            for key, _, _ in ready:
+                del self._async[key]
+        for key, result, experiment in ready:
+            if not result.successful():
+                try:
+                    result.get()
+                except Exception:
+                    logger.error('Job %s failed\n%s' % (str(key), traceback.format_exc()))
+                self.job_callback(None, experiment, key)
+    
+    def shard_args(self, key):
+        """Return the shard arguments of run_scenario for a job
+        
+        Parameters
+        ----------
+        key : tuple
+            The (results log key, shard index) tuple identifying the job
+        
+        Returns
+        -------
+        args : tuple
+            The (shard, n_shards) arguments, empty if experiments are not
+            sharded
+        """
+        return (key[1], self.n_shards) if self.n_shards > 1 else ()
+    
+    def job_callback(self, args, experiment, key):
+        """Callback called when a job terminates, successfully or not
+        
+        When experiments are sharded, the collectors of the shards of an
+        experiment are merged after all of them terminated.
+        
+        Parameters
+        ----------
+        args : tuple
+            The value returned by run_scenario
+        experiment : Tree
+            The parameters of the experiment
+        key : tuple
+            The (results log key, shard index) tuple identifying the job
+        """
+        # An exception raised by a pool callback would stop the thread of the
+        # pool handling the results of all jobs, so the experiment of the job
+        # is counted as failed instead
+        try:
+            with self._lock:
+                self._running.pop(key, None)
+                if args:
+                    self.cost_model.update(experiment, args[2], self.n_shards)
+                exp_key = key[0]
+                if self.n_shards == 1:
+                    self.experiment_callback(args, key=exp_key)
+                else:
+                    shards = self._shards[exp_key]
+                    shards.append(args)
+                    if len(shards) == self.n_shards:
+                        del self._shards[exp_key]
+                        self.experiment_callback(self.merge(shards), key=exp_key)
+        except Exception:
+            logger.error('Failed handling the results of job %s\n%s'
+                         % (str(key), traceback.format_exc()))
+            with self._lock:
+                self.n_fail += 1
+        if self.settings.PARALLEL_EXECUTION:
+            self.dispatch()
+    
+    def merge(self, shards):
+        """Merge the values returned by run_scenario for all shards of an
+        experiment
+        
+        Parameters
+        ----------
+        shards : list
+            The values returned by run_scenario for each shard
+        
+        Returns
+        -------
+        args : tuple
+            The (params, results, duration) tuple of the experiment, where
+            duration is the sum of the durations of all shards, or None if
+            any shard failed
+        """
+        if not all(shards):
+            return None
+        try:
+            results = merge_shards([collectors for _, collectors, _ in shards])
+        except Exception:
+            logger.error('Failed merging shards\n%s' % traceback.format_exc())
+            return None
+        return (shards[0][0], results, sum(duration for _, _, duration in shards))
+    
+    def eta(self):
+        """Estimate the time left until all experiments are completed
+        
+        Pending experiments are assigned, longest first, to the process which
+        becomes free first, after the experiments it is running. The time
+        when the last process becomes free is returned, so that long
+        experiments left at the end of the campaign are accounted for.
+        
+        Returns
+        -------
+        eta : float
+            The estimated time left, in seconds
+        """
+        now = time.time()
+        free = [max(0, estimate - (now - start))
+                for estimate, start in self._running.values()]
+        free += [0]*(min(mp.cpu_count(), self.n_proc) - len(free))
+        heapq.heapify(free)
+        for estimate in sorted((self.cost_model.estimate(e, self.n_shards)
+                                for e in self._pending.values()), reverse=True):
+            heapq.heappush(free, heapq.heappop(free) + estimate)
+        return max(free)
+    
+    def jobs(self, queue):
+        """Return the experiments to run, each replicated N_REPLICATIONS
+        times, skipping those whose results are already in the results log.
+        
+        Results of skipped experiments are added to the results of the
+        orchestrator.
+        
+        Parameters
+        ----------
+        queue : iterable
+            The experiments of the campaign
+        
+        Returns
+        -------
+        jobs : list
+            List of (experiment, key) tuples, where experiment is a
+            FrozenTree of the parameters of the experiment and key identifies
+            the experiment and its replication in the results log
+        """
+        jobs = []
+        # Number of runs of each distinct experiment, so that replications
+        # and duplicate experiments are told apart
+        n_runs = collections.defaultdict(int)
+        for experiment in queue:
+            experiment = FrozenTree(experiment)
+            digest = params_digest(experiment)
+            for _ in range(self.settings.N_REPLICATIONS):
+                key = '%s-%d' % (digest, n_runs[digest])
+                n_runs[digest] += 1
+                if self.results_log is not None and key in self.results_log:
+                    continue
+                jobs.append((experiment, key))
+        return jobs
+    
+    def open_results_log(self, path):
+        """Open the log to which results are appended as experiments
+        complete and load the results it already contains, so that the
+        experiments they belong to are not run again.
+        
+        Parameters
+        ----------
+        path : str
+            The path of the results log
+        """
+        self.results_log = ResultsLog(path)
+        for _, params, results, duration in self.results_log:
+            self.results.add(params, results)
+            self.cost_model.update(params, duration)
+        self.n_resumed = len(self.results_log)
+        if self.n_resumed > 0:
+            logger.info('Resuming from %s: %d experiments already completed'
+                        % (path, self.n_resumed))
+    
+    def close_results_log(self):
+        """Close the results log, if any
+        """
+        if self.results_log is not None:
+            self.results_log.close()
+            self.results_log = None
+    
+    def precompute(self, queue):
+        """Build the topologies of all experiments of the queue, their
+        shortest paths and centralities and store them in a precomputation
+        cache, before any experiment is run.
+        
+        Worker processes then load topologies from the cache and memory-map
+        their read-only shortest path tables, so that a single copy of them is
+        kept in physical memory, no matter how many workers use them.
+        
+        If the PRECOMPUTATION_CACHE_DIR setting is set, that cache is used.
+        Otherwise a temporary cache is created in shared memory (/dev/shm), if
+        available, and removed when all experiments are completed.
+        
+        Parameters
+        ----------
+        queue : iterable
+            The experiments to run
+        """
+        if 'PRECOMPUTATION_CACHE_DIR' in self.settings and \
+                self.settings.PRECOMPUTATION_CACHE_DIR:
+            directory = self.settings.PRECOMPUTATION_CACHE_DIR
+        else:
+            shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            directory = tempfile.mkdtemp(prefix='icarus-', dir=shm)
+            self._tmp_precomputation_dir = directory
+        cache = PrecomputationCache(directory)
+        for experiment in queue:
+            topology_spec = Tree(experiment['topology'])
+            topology_name = topology_spec.pop('name')
+            if topology_name in TOPOLOGY_FACTORY:
+                cache.prepare(topology_name, topology_spec,
+                              TOPOLOGY_FACTORY[topology_name])
+        self.precomputation_dir = directory
+        logger.info('Precomputations stored in %s' % directory)
+    
+    def cleanup_precomputation(self):
+        """Remove the temporary precomputation cache, if any
+        """
+        if self._tmp_precomputation_dir is not None:
+            shutil.rmtree(self._tmp_precomputation_dir, ignore_errors=True)
+            self._tmp_precomputation_dir = None
+    
+    def prepare_snapshots(self):
+        """Set the directory of the cache of warmup snapshots shared by all
+        experiments, so that each distinct warmup phase is simulated only once
+        and the experiments sharing it restore its final state from a
+        snapshot.
+        
+        If the WARMUP_SNAPSHOT_DIR setting is set, that directory is used.
+        Otherwise a temporary directory is created in shared memory
+        (/dev/shm), if available, and removed when all experiments are
+        completed.
+        """
+        if 'WARMUP_SNAPSHOT_DIR' in self.settings and \
+                self.settings.WARMUP_SNAPSHOT_DIR:
+            directory = self.settings.WARMUP_SNAPSHOT_DIR
+        else:
+            shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            directory = tempfile.mkdtemp(prefix='icarus-warmup-', dir=shm)
+            self._tmp_snapshot_dir = directory
+        self.snapshot_dir = directory
+        logger.info('Warmup snapshots stored in %s' % directory)
+    
+    def cleanup_snapshots(self):
+        """Remove the temporary directory of warmup snapshots, if any
+        """
+        if self._tmp_snapshot_dir is not None:
+            shutil.rmtree(self._tmp_snapshot_dir, ignore_errors=True)
+            self._tmp_snapshot_dir = None
         
 
-    def experiment_callback(self, args):
+    def experiment_callback(self, args, key=None):
         """Callback method called by run_scenario
         
         Parameters
         ----------
         args : tuple
             Tuple of arguments
+        key : str, optional
+            The key identifying the experiment in the results log
         """
         # If args is None, that means that an exception was raised during the
         # execution of the experiment. In such case, ignore it
@@ -144,44 +485,173 @@ class Orchestrator(object):
             return
         # Extract parameters
         params, results, duration = args
-        self.n_success += 1
         # Store results
+        if self.results_log is not None and key is not None:
+            self.results_log.append(key, params, results, duration)
         self.results.add(params, results)
+        self.n_success += 1
         self.exp_durations.append(duration)
         if self.n_success % self.summary_freq == 0:
             # Number of experiments scheduled to be executed
             n_scheduled = self.n_exp - (self.n_fail + self.n_success)
-            # Compute ETA
-            n_cores = min(mp.cpu_count(), self.n_proc)
-            mean_duration = sum(self.exp_durations)/len(self.exp_durations)
-            eta = timestr(n_scheduled*mean_duration/n_cores, False)
+            eta = timestr(self.eta(), False)
             # Print summary
             logger.info('SUMMARY | Completed: %d, Failed: %d, Scheduled: %d, ETA: %s', 
                         self.n_success, self.n_fail, n_scheduled, eta)
         
 
-def run_scenario(settings, params, curr_exp, n_exp):
+class CostModel(object):
+    """Model estimating the duration of an experiment from its parameters.
+    
+    The duration of an experiment is modelled as the product of its work, a
+    number computed from its parameters, and a rate, in seconds per unit of
+    work, learned from the experiments completed so far.
+    
+    The work of an experiment is its number of requests (warmup and
+    measured, or only those of a shard if the measured phase is split into
+    shards), multiplied by *1 + scope* and *1 + log(fan_out)* if the
+    strategy has these parameters, since they increase the number of nodes
+    visited by each request.
+    
+    Rates are learned for classes of experiments sharing the same topology
+    and strategy parameters, the same topology and strategy name, the same
+    topology and for all experiments. The duration of an experiment is
+    estimated with the rate of the most specific class of which an
+    experiment completed. If none completed yet, the rate is 1 so that
+    experiments are still ranked by their work.
+    """
+    
+    def __init__(self):
+        # Total duration and work of completed experiments of each class
+        self._duration = collections.defaultdict(float)
+        self._work = collections.defaultdict(float)
+    
+    @staticmethod
+    def work(experiment, n_shards=1):
+        """Return the work of an experiment, or of one of its shards
+        
+        Parameters
+        ----------
+        experiment : Tree
+            The parameters of the experiment
+        n_shards : int, optional
+            The number of shards of the measured phase of the experiment
+        
+        Returns
+        -------
+        work : float
+            The work of the experiment
+        """
+        workload = experiment['workload']
+        work = float(workload['n_warmup'] if 'n_warmup' in workload else 10**5)
+        work += (workload['n_measured'] if 'n_measured' in workload else 4*10**5)/n_shards
+        strategy = experiment['strategy']
+        if 'scope' in strategy:
+            work *= 1 + strategy['scope']
+        if 'fan_out' in strategy:
+            work *= 1 + math.log(max(1, strategy['fan_out']))
+        return work
+    
+    @staticmethod
+    def classes(experiment):
+        """Return the classes of an experiment, from the most specific
+        
+        Parameters
+        ----------
+        experiment : Tree
+            The parameters of the experiment
+        
+        Returns
+        -------
+        classes : list
+            The keys of the classes of the experiment
+        """
+        topology = params_digest(experiment['topology'])
+        strategy = experiment['strategy']
+        return [(topology, params_digest(strategy)),
+                (topology, strategy['name'] if 'name' in strategy else None),
+                (topology,),
+                ()]
+    
+    def estimate(self, experiment, n_shards=1):
+        """Estimate the duration of an experiment, or of one of its shards
+        
+        Parameters
+        ----------
+        experiment : Tree
+            The parameters of the experiment
+        n_shards : int, optional
+            The number of shards of the measured phase of the experiment
+        
+        Returns
+        -------
+        duration : float
+            The estimated duration, in seconds if at least one experiment
+            completed
+        """
+        work = self.work(experiment, n_shards)
+        for cls in self.classes(experiment):
+            if cls in self._work:
+                return work*self._duration[cls]/self._work[cls]
+        return work
+    
+    def update(self, experiment, duration, n_shards=1):
+        """Learn from the duration of a completed experiment, or shard
+        
+        Parameters
+        ----------
+        experiment : Tree
+            The parameters of the experiment
+        duration : float
+            The duration of the experiment or shard, in seconds
+        n_shards : int, optional
+            The number of shards of the measured phase of the experiment
+        """
+        work = self.work(experiment, n_shards)
+        for cls in self.classes(experiment):
+            self._duration[cls] += duration
+            self._work[cls] += work
+
+
+def run_scenario(settings, params, curr_exp, n_exp, precomputation_dir=None,
+                 snapshot_dir=None, shard=None, n_shards=1):
     """Run a single scenario experiment
     
     Parameters
     ----------
     settings : Settings
         The simulator settings
-    params : Tree
+    params : Tree or FrozenTree
         experiment parameters tree
     curr_exp : int
         sequence number of the experiment
     n_exp : int
         Number of scheduled experiments
+    precomputation_dir : str, optional
+        Directory of the cache from which topologies, shortest paths and
+        centralities are loaded. If not specified, the
+        PRECOMPUTATION_CACHE_DIR setting is used, if set
+    snapshot_dir : str, optional
+        Directory of the cache of warmup snapshots (see
+        icarus.execution.snapshot). If not specified, the WARMUP_SNAPSHOT_DIR
+        setting is used, if set. Snapshots are only used if the workload and
+        content placement have a seed, otherwise the warmup phase is not
+        reproducible
+    shard : int, optional
+        If specified, only this shard of the measured phase of the experiment
+        is run (see icarus.execution.exec_shard)
+    n_shards : int, optional
+        The number of shards of the measured phase of the experiment
     
     Returns
     -------
     results : 3-tuple
         A (params, results, duration) 3-tuple. The first element is a dictionary
         which stores all the attributes of the experiment. The second element
-        is a dictionary which stores the results. The third element is an
-        integer expressing the wall-clock duration of the experiment (in
-        seconds) 
+        is a dictionary which stores the results or, if a shard is run, the
+        list of its data collectors, to be merged with icarus.execution.merge_shards.
+        The third element is an integer expressing the wall-clock duration of
+        the experiment (in seconds) 
     """
     try:
         start_time = time.time()
@@ -191,20 +661,55 @@ def run_scenario(settings, params, curr_exp, n_exp):
         # Get list of metrics required
         metrics = settings.DATA_COLLECTORS
         
-        # Copy parameters so that they can be manipulated
-        tree = copy.deepcopy(params)
+        # If profiling, the execution is timed by phase, starting from the
+        # build of the topology, and stored in the PERF subtree of results
+        if 'PROFILE' in settings and settings.PROFILE:
+            profiler = Profiler()
+        else:
+            profiler = None
+        
+        # Copy parameters so that they can be manipulated. Frozen parameters
+        # are converted to new trees, since parameters are returned with
+        # the values derived below
+        if isinstance(params, FrozenTree):
+            tree = params.to_tree()
+            params = params.to_tree()
+        else:
+            tree = copy.deepcopy(params)
         
         # Set topology
+        if profiler is not None:
+            profiler.start('TOPOLOGY')
         topology_spec = tree['topology']
         topology_name = topology_spec.pop('name')
         if topology_name not in TOPOLOGY_FACTORY:
             logger.error('No topology factory implementation for %s was found.'
                          % topology_name)
             return None
-        topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+        if precomputation_dir is None and 'PRECOMPUTATION_CACHE_DIR' in settings:
+            precomputation_dir = settings.PRECOMPUTATION_CACHE_DIR
+        if precomputation_dir:
+            # Load topology and its shortest paths and centralities from the
+            # cache shared by all experiments, building them if not cached.
+            # Unless another mode is set, paths are built on demand from the
+            # shared predecessor matrix rather than copied into each process
+            precomputation = PrecomputationCache(precomputation_dir)
+            topology, shortest_path, centrality = precomputation.get(
+                            topology_name, topology_spec, TOPOLOGY_FACTORY[topology_name],
+                            tree['netconf'].get('shortest_path_mode', 'predecessor'))
+            topology.graph['centrality'] = centrality
+        else:
+            topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+            shortest_path = None
         
+        if profiler is not None:
+            profiler.start('WORKLOAD')
         workload_spec = tree['workload']
         workload_name = workload_spec.pop('name')
+        if snapshot_dir is None and 'WARMUP_SNAPSHOT_DIR' in settings:
+            snapshot_dir = settings.WARMUP_SNAPSHOT_DIR
+        snapshot_key = warmup_key(params) if snapshot_dir else None
+        snapshots = WarmupSnapshotCache(snapshot_dir) if snapshot_key else None
         if workload_name not in WORKLOAD:
             logger.error('No workload implementation named %s was found.'
                          % workload_name)
@@ -212,6 +717,8 @@ def run_scenario(settings, params, curr_exp, n_exp):
         workload = WORKLOAD[workload_name](topology, **workload_spec)
         
         # Assign caches to nodes
+        if profiler is not None:
+            profiler.start('PLACEMENT')
         if 'cache_placement' in tree:
             cachepl_spec = tree['cache_placement']
             cachepl_name = cachepl_spec.pop('name')
@@ -287,6 +794,8 @@ def run_scenario(settings, params, curr_exp, n_exp):
         
         # Configuration parameters of network model
         netconf = tree['netconf']
+        if shortest_path is not None:
+            netconf['shortest_path'] = shortest_path
         
         # Text description of the scenario run to print on screen
         scenario = tree['desc'] if 'desc' in tree else "Description N/A"
@@ -300,11 +809,16 @@ def run_scenario(settings, params, curr_exp, n_exp):
         collectors = {m: {} for m in metrics}
 
         logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
-        results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy)
+        if shard is None:
+            results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy,
+                                      snapshots, snapshot_key, profiler)
+        else:
+            results = exec_shard(topology, workload, netconf, strategy, cache_policy, collectors, warmup_strategy,
+                                 shard, n_shards, snapshots, snapshot_key, profiler)
         
         duration = time.time() - start_time
-        logger.info('Experiment %d/%d | End simulation | Duration %s.', 
-                    curr_exp, n_exp, timestr(duration, True))
+        logger.info('Experiment %d/%d | End simulation | Duration %s | Peak RSS %s.', 
+                    curr_exp, n_exp, timestr(duration, True), memstr(peak_rss()))
         return (params, results, duration)
     except KeyboardInterrupt:
         logger.error('Received keyboard interrupt. Terminating')
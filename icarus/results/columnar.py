@@ -0,0 +1,551 @@
+"""Columnar results store
+
+Pickling a whole ResultSet requires all results of a campaign to be kept in
+memory until it completes and to be loaded back in memory in full to plot any
+of them. This module stores results in a directory, one file per column,
+which can be filled incrementally while experiments complete and whose
+columns can be read individually.
+
+Parameters of experiments are flattened into one column per path of their
+tree. Results are flattened into one column per (collector, metric) path.
+Scalar values (numbers, strings, booleans and None) are stored in the columns
+of the table, in the *table* subdirectory, while bulky values, such as CDFs
+and dictionaries of per-node or per-content values, are stored in separate
+columns in the *side* subdirectory, so that they are only read if requested.
+
+Each column file is a sequence of pickled (row, value) records, so that
+columns may be missing from some rows and rows can be appended to existing
+files. The *rows* file stores one line per row, written after all its values,
+so that a row whose writing was interrupted is ignored by readers. The
+records of such a row are removed from column files before new rows are
+appended, so that they are not attributed to the new rows.
+"""
+import os
+import ast
+import collections
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+
+from icarus.util import Tree
+from icarus.registry import register_results_reader, register_results_writer
+from icarus.results.readwrite import ResultSet
+
+
+__all__ = [
+    'ColumnarResultsStore',
+    'ColumnarResultSet',
+    'write_results_columnar',
+    'read_results_columnar'
+           ]
+
+
+# Types of the values stored in the table rather than in the side store
+_SCALAR_TYPES = (bool, int, long, float, str, unicode, type(None), np.generic)
+
+# Value of the rows in which a column is missing
+_MISSING = object()
+
+
+def _flatten(tree, depth=None, root=()):
+    """Return the (path, value) pairs of the leaves of a tree, not descending
+    deeper than *depth* levels
+    """
+    for k, v in tree.iteritems():
+        path = root + (k,)
+        if isinstance(v, dict) and (depth is None or len(path) < depth):
+            for item in _flatten(v, depth, path):
+                yield item
+        else:
+            yield path, v
+
+
+class ColumnarResultsStore(object):
+    """Columnar store of the results of a campaign, stored in a directory.
+
+    Columns are identified by a (section, path) tuple, where section is
+    either 'params' or 'results' and path is the path of the value in the
+    tree of parameters or results.
+    """
+
+    def __init__(self, path, overwrite=False):
+        """Constructor
+
+        Parameters
+        ----------
+        path : str
+            The directory of the store. It is created if it does not exist
+        overwrite : bool, optional
+            If *True*, the content of an existing store is removed, otherwise
+            new rows are appended to it
+        """
+        self.path = path
+        for directory in ('table', 'side'):
+            if not os.path.isdir(os.path.join(path, directory)):
+                os.makedirs(os.path.join(path, directory))
+        if overwrite:
+            for directory in ('table', 'side'):
+                for name in os.listdir(os.path.join(path, directory)):
+                    os.remove(os.path.join(path, directory, name))
+            for name in ('columns', 'rows', 'attr.pickle'):
+                if os.path.exists(os.path.join(path, name)):
+                    os.remove(os.path.join(path, name))
+        # Relative path of the file of each column, keyed by column
+        self._columns = collections.OrderedDict()
+        if os.path.exists(os.path.join(path, 'columns')):
+            with open(os.path.join(path, 'columns')) as f:
+                for line in f:
+                    filename, column = line.rstrip('\n').split('\t', 1)
+                    self._columns[ast.literal_eval(column)] = filename
+        self._n_rows = 0
+        # Size of the lines of the committed rows in the rows file
+        self._rows_end = 0
+        if os.path.exists(os.path.join(path, 'rows')):
+            with open(os.path.join(path, 'rows')) as f:
+                for line in f:
+                    # A line without newline is a row whose commit was
+                    # interrupted
+                    if line.endswith('\n'):
+                        self._n_rows += 1
+                        self._rows_end += len(line)
+        # Whether files have been truncated to the last committed row
+        self._truncated = False
+        # Files open for appending, keyed by column
+        self._files = {}
+        # Columns read so far and the rows having a value in each of them
+        self._cache = {}
+        self._present = {}
+
+    def __len__(self):
+        return self._n_rows
+
+    def columns(self, section=None):
+        """Return the columns of the store
+
+        Parameters
+        ----------
+        section : ('params' | 'results'), optional
+            If specified, only the columns of this section are returned
+
+        Returns
+        -------
+        columns : list
+            The (section, path) tuples identifying the columns
+        """
+        return [c for c in self._columns if section is None or c[0] == section]
+
+    def is_side(self, column):
+        """Return whether a column is stored in the side store
+
+        Parameters
+        ----------
+        column : tuple
+            The (section, path) tuple identifying the column
+
+        Returns
+        -------
+        side : bool
+            *True* if the column stores bulky values in the side store
+        """
+        return self._columns[column].startswith('side')
+
+    def _truncate(self):
+        """Truncate all files to the end of the last committed row, removing
+        the records of a row whose writing was interrupted.
+
+        This is only done before appending, rather than when the store is
+        opened, so that readers never truncate the row being written by a
+        running campaign.
+        """
+        def truncate(path, end):
+            if os.path.exists(path) and os.path.getsize(path) > end:
+                with open(path, 'rb+') as f:
+                    f.truncate(end)
+        truncate(os.path.join(self.path, 'rows'), self._rows_end)
+        for filename in self._columns.values():
+            path = os.path.join(self.path, filename)
+            if not os.path.exists(path):
+                continue
+            end = 0
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        row, _ = pickle.load(f)
+                    except Exception:
+                        # End of file or truncated record
+                        break
+                    if row >= self._n_rows:
+                        break
+                    end = f.tell()
+            truncate(path, end)
+        self._truncated = True
+
+    def _file(self, column, value):
+        """Return the file open for appending of a column, creating the
+        column if needed
+        """
+        if column not in self._files:
+            if column not in self._columns:
+                directory = 'table' if isinstance(value, _SCALAR_TYPES) else 'side'
+                filename = '%s/%d' % (directory, len(self._columns))
+                with open(os.path.join(self.path, 'columns'), 'a') as f:
+                    f.write('%s\t%r\n' % (filename, column))
+                self._columns[column] = filename
+            self._files[column] = open(os.path.join(self.path, self._columns[column]), 'ab')
+        return self._files[column]
+
+    def append(self, params, results):
+        """Append the parameters and results of an experiment as a new row
+
+        Parameters
+        ----------
+        params : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        """
+        if not self._truncated:
+            self._truncate()
+        row = self._n_rows
+        values = [(('params', path), v) for path, v in _flatten(params)] + \
+                 [(('results', path), v) for path, v in _flatten(results, 2)]
+        written = set()
+        for column, value in values:
+            f = self._file(column, value)
+            pickle.dump((row, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            written.add(f)
+        for f in written:
+            f.flush()
+        with open(os.path.join(self.path, 'rows'), 'a') as f:
+            f.write('%d\n' % row)
+        self._n_rows += 1
+        self._cache.clear()
+        self._present.clear()
+
+    def column(self, column):
+        """Return the values of a column in all rows
+
+        Parameters
+        ----------
+        column : tuple
+            The (section, path) tuple identifying the column
+
+        Returns
+        -------
+        values : array
+            The values of the column, indexed by row. If all values are
+            numbers, it is an array of floats where missing values are NaN.
+            Otherwise it is an array of objects where missing values are None
+        """
+        if column not in self._cache:
+            values = self._read(column)
+            numeric = column in self._columns and not self.is_side(column) and \
+                      all(isinstance(v, (int, long, float, np.number))
+                          and not isinstance(v, bool)
+                          for v in values if v is not _MISSING)
+            if numeric:
+                array = np.array([np.nan if v is _MISSING else v for v in values],
+                                 dtype=float)
+            else:
+                array = np.empty(self._n_rows, dtype=object)
+                array[:] = [None if v is _MISSING else v for v in values]
+            self._cache[column] = array
+            self._present[column] = np.array([v is not _MISSING for v in values],
+                                             dtype=bool)
+        return self._cache[column]
+
+    def present(self, column):
+        """Return which rows have a value in a column
+
+        Parameters
+        ----------
+        column : tuple
+            The (section, path) tuple identifying the column
+
+        Returns
+        -------
+        present : array
+            Array of booleans, indexed by row
+        """
+        self.column(column)
+        return self._present[column]
+
+    def _read(self, column):
+        """Return the list of the values of a column in all rows, where
+        missing values are _MISSING
+        """
+        values = [_MISSING]*self._n_rows
+        if column in self._columns:
+            with open(os.path.join(self.path, self._columns[column]), 'rb') as f:
+                while True:
+                    try:
+                        row, value = pickle.load(f)
+                    except Exception:
+                        # End of file or truncated record
+                        break
+                    if row < self._n_rows:
+                        values[row] = value
+        return values
+
+    def params_column(self, path):
+        """Return the values of a parameter in all rows
+
+        Parameters
+        ----------
+        path : tuple
+            The path of the parameter in the tree of parameters
+
+        Returns
+        -------
+        values : array
+            The values of the parameter (see *column*)
+        """
+        return self.column(('params', tuple(path)))
+
+    def results_column(self, path):
+        """Return the values of a metric in all rows
+
+        Parameters
+        ----------
+        path : tuple
+            The (collector, metric) path of the metric in the tree of results
+
+        Returns
+        -------
+        values : array
+            The values of the metric (see *column*)
+        """
+        return self.column(('results', tuple(path)))
+
+    def rows(self, selection=None):
+        """Return the parameters and results of all rows, or of some of them
+
+        All columns, including those of the side store, are read.
+
+        Parameters
+        ----------
+        selection : list, optional
+            The indexes of the rows to return. If not specified, all rows are
+            returned
+
+        Returns
+        -------
+        rows : list
+            List of (params, results) tuples of trees
+        """
+        if selection is None:
+            selection = range(self._n_rows)
+        rows = [(Tree(), Tree()) for _ in selection]
+        for column in self._columns:
+            section, path = column
+            tree = 0 if section == 'params' else 1
+            values = self._read(column)
+            for i, row in enumerate(selection):
+                if values[row] is not _MISSING:
+                    rows[i][tree].setval(path, values[row])
+        return rows
+
+    def close(self):
+        """Close all files open for appending
+        """
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+class ColumnarResultSet(ResultSet):
+    """Result set backed by a columnar results store.
+
+    Results added to the result set are appended to the store, rather than
+    kept in memory, and rows are only read when they are accessed. Individual parameters and
+    metrics can be read for all rows, without reading the others, with the
+    *params_column* and *results_column* methods.
+
+    Filtering reads the columns of the parameters of the condition only and
+    returns a result set backed by the same store, restricted to the matching
+    rows, which are only read when accessed as well.
+    """
+
+    def __init__(self, store, attr=None, selection=None):
+        """Constructor
+
+        Parameters
+        ----------
+        store : ColumnarResultsStore
+            The store from which results are read
+        attr : dict, optional
+            Dictionary of common attributes to all experiments
+        selection : list, optional
+            The indexes of the rows of the store in the result set. If not
+            specified, all rows are. Results added to a result set with a
+            selection are not appended to the store
+        """
+        self.store = store
+        self._rows = None
+        self._selection = selection
+        self.attr = attr if attr is not None else {}
+        self._index = {}
+
+    @property
+    def _results(self):
+        # Rows are read from the store when first accessed
+        if self._rows is None:
+            self._rows = self.store.rows(self._selection)
+        return self._rows
+
+    def __len__(self):
+        if self._rows is not None:
+            return len(self._rows)
+        return len(self.store) if self._selection is None else len(self._selection)
+
+    def _select(self, values):
+        """Return the values of a column in the rows of the result set
+        """
+        if self._selection is None:
+            return values
+        return values[np.array(self._selection, dtype=int)]
+
+    def add(self, parameters, results):
+        """Add a result to the result set, appending it to the store.
+
+        Parameters
+        ----------
+        parameters : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        """
+        if not isinstance(parameters, Tree):
+            parameters = Tree(parameters)
+        if not isinstance(results, Tree):
+            results = Tree(results)
+        if self._selection is not None:
+            # The rows of a selection are kept in memory, since results are
+            # not appended to the store
+            self._rows = self._results
+        elif self.store is not None:
+            self.store.append(parameters, results)
+            if self._rows is None:
+                row = len(self.store) - 1
+                for path, index in self._index.iteritems():
+                    index.add(row, parameters.getval(path))
+        if self._rows is not None:
+            super(ColumnarResultSet, self).add(parameters, results)
+
+    def filter(self, condition):
+        """Return subset of results matching specific conditions
+
+        If rows have not been read yet, only the columns of the parameters of
+        the condition are read and the returned result set is backed by the
+        store, without reading the matching rows.
+
+        See ResultSet.filter
+        """
+        if self._rows is not None:
+            return super(ColumnarResultSet, self).filter(condition)
+        rows = sorted(self._match(condition))
+        if self._selection is not None:
+            rows = [self._selection[row] for row in rows]
+        return ColumnarResultSet(self.store, selection=rows)
+
+    def _param_values(self, path):
+        # Parameters are read from their column, unless rows have been read
+        # already or the path is not that of a leaf, whose value is a tree
+        inner = any(p[:len(path)] == path and len(p) > len(path)
+                    for _, p in self.store.columns('params'))
+        if self._rows is not None or inner:
+            return super(ColumnarResultSet, self)._param_values(path)
+        values = self._select(self.store.params_column(path))
+        if values.dtype == object:
+            return values.tolist()
+        # Missing values of numeric columns are NaN
+        return [None if np.isnan(v) else v for v in values.tolist()]
+
+    def params_column(self, path):
+        """Return the values of a parameter in all rows, as an array
+
+        See ColumnarResultsStore.params_column
+        """
+        return self._select(self.store.params_column(path))
+
+    def results_column(self, path):
+        """Return the values of a metric in all rows, as an array
+
+        See ColumnarResultsStore.results_column
+        """
+        return self._select(self.store.results_column(path))
+
+    def metric_values(self, path):
+        """Return the values of a metric in all results, as an array
+
+        If rows have not been read yet and the metric is a (collector,
+        metric) path, only its column is read from the store.
+
+        See ResultSet.metric_values
+        """
+        if self._rows is None and len(path) == 2:
+            column = ('results', tuple(path))
+            if len(self) > 0 and not self._select(self.store.present(column)).any():
+                raise KeyError('No result has the metric %s' % str(tuple(path)))
+            return self.results_column(path)
+        return super(ColumnarResultSet, self).metric_values(path)
+
+    def __getstate__(self):
+        # Pickled and copied as a plain result set, with all rows
+        return {'attr': self.attr, '_rows': self._results}
+
+    def __setstate__(self, state):
+        self.attr = state['attr']
+        self._rows = state['_rows']
+        self.store = None
+        self._selection = None
+        self._index = {}
+
+
+@register_results_writer('COLUMNAR')
+def write_results_columnar(results, path):
+    """Write a resultset to a columnar results store
+
+    Only the rows of the result set which are not stored yet are appended,
+    so that, if the rows of the result set were appended to the store while
+    they were added to the result set, nothing is written again.
+
+    Parameters
+    ----------
+    results : ResultSet
+        The set of results
+    path : str
+        The directory of the store
+    """
+    store = ColumnarResultsStore(path)
+    try:
+        for i in range(len(store), len(results)):
+            store.append(*results[i])
+    finally:
+        store.close()
+    with open(os.path.join(path, 'attr.pickle'), 'wb') as f:
+        pickle.dump(results.attr, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@register_results_reader('COLUMNAR')
+def read_results_columnar(path):
+    """Read a resultset from a columnar results store
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store
+
+    Returns
+    -------
+    results : ColumnarResultSet
+        The read result set, whose rows are read lazily
+    """
+    attr = None
+    if os.path.exists(os.path.join(path, 'attr.pickle')):
+        with open(os.path.join(path, 'attr.pickle'), 'rb') as f:
+            attr = pickle.load(f)
+    return ColumnarResultSet(ColumnarResultsStore(path), attr)
@@ -3,16 +3,22 @@
 """
 from __future__ import division
 import os
+import copy
 import collections
+import multiprocessing as mp
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 import numpy as np
 import matplotlib.pyplot as plt
 
-from icarus.util import Tree, step_cdf
+from icarus.util import Tree, step_cdf, params_digest
 from icarus.tools import means_confidence_interval
 
 
-__all__ = ['plot_lines', 'plot_bar_chart', 'plot_cdf']
+__all__ = ['plot_lines', 'plot_bar_chart', 'plot_cdf', 'PlotPipeline']
 
 
 # These lines prevent insertion of Type 3 fonts in figures
@@ -175,8 +181,7 @@ def plot_lines(resultset, desc, filename, plotdir):
             condition.setval(desc['xparam'], xvals[j])
             if ycondnames is not None:
                 condition.setval(ycondnames[i], ycondvals[i])
-            data = [v.getval(ymetrics[i])
-                    for _, v in resultset.filter(condition)]
+            data = resultset.filter(condition).metric_values(ymetrics[i])
             confidence = desc['confidence'] if 'confidence' in desc else 0.95 
             means[j], err[j] = means_confidence_interval(data, confidence)
         yerr = None if 'errorbar' in desc and not desc['errorbar'] else err
@@ -387,8 +392,7 @@ def plot_bar_chart(resultset, desc, filename, plotdir):
                 condition.setval(desc['xparam'], desc['xvals'][i])
                 if ycondnames is not None:
                     condition.setval(ycondnames[l], ycondvals[l])
-                data = [v.getval(ymetrics[l])
-                            for _, v in resultset.filter(condition)]
+                data = resultset.filter(condition).metric_values(ymetrics[l])
                 confidence = desc['confidence'] if 'confidence' in desc else 0.95 
                 meanval, err = means_confidence_interval(data, confidence)
                 yerr = None if 'errorbar' in desc and not desc['errorbar'] else err
@@ -581,3 +585,182 @@ def plot_cdf(resultset, desc, filename, plotdir):
     plt.legend(legend, prop={'size': LEGEND_SIZE}, loc=desc['legend_loc'])
     plt.savefig(os.path.join(plotdir, filename), bbox_inches='tight')
     plt.close(fig)
+
+
+# Plot functions which can be used by a plot pipeline, keyed by name
+PLOT_FUNCTIONS = {
+    'lines':     plot_lines,
+    'bar_chart': plot_bar_chart,
+    'cdf':       plot_cdf,
+                  }
+
+# Name of the file storing, in each plot directory, the keys of the data of
+# the figures rendered by plot pipelines
+PLOT_KEYS_FILE = '.plot-keys'
+
+
+def _data(value):
+    """Return a representation of a metric value to be hashed, in which
+    arrays are not summarized
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_data(v) for v in value]
+    return value
+
+
+def _render(plot, resultset, desc, filename, plotdir):
+    """Render a figure. It is executed by the processes of a plot pipeline
+    """
+    PLOT_FUNCTIONS[plot](resultset, desc, filename, plotdir)
+    return filename
+
+
+class PlotPipeline(object):
+    """Pipeline rendering figures in parallel, skipping those whose data has
+    not changed since they were last rendered.
+    
+    Figures are queued by the *plot_lines*, *plot_bar_chart* and *plot_cdf*
+    methods, which have the same arguments as the functions of this module,
+    and rendered by the *run* method.
+    
+    Each figure is identified by a key hashing its plot descriptor, its file
+    name and the parameters and the values of the plotted metrics of the
+    results matching the filter of its descriptor, i.e. all the data it is
+    rendered from. The keys of the figures rendered in a directory are
+    stored in a file of that directory, so that a figure whose key has not
+    changed is not rendered again as long as its file exists. Each process
+    rendering a figure only receives the results matching its filter.
+    """
+    
+    def __init__(self, n_processes=None, force=False):
+        """Constructor
+        
+        Parameters
+        ----------
+        n_processes : int, optional
+            The number of processes rendering figures. If not specified, it
+            is the number of CPUs
+        force : bool, optional
+            If *True*, all figures are rendered, even if unchanged
+        """
+        self.n_processes = n_processes if n_processes is not None else mp.cpu_count()
+        self.force = force
+        # Queued figures, as (plot, resultset, desc, filename, plotdir) tuples
+        self._figures = []
+    
+    def __len__(self):
+        return len(self._figures)
+    
+    def add(self, plot, resultset, desc, filename, plotdir):
+        """Queue a figure
+        
+        Parameters
+        ----------
+        plot : ('lines' | 'bar_chart' | 'cdf')
+            The type of plot
+        resultset : ResultSet
+            Result set
+        desc : dict
+            The plot descriptor (see the plot functions of this module)
+        filename : str
+            The name of the file of the figure
+        plotdir : str
+            The directory in which the figure will be saved
+        """
+        if plot not in PLOT_FUNCTIONS:
+            raise ValueError('Unknown plot type %s' % str(plot))
+        # Plot functions modify descriptors, so they are copied
+        desc = copy.deepcopy(desc)
+        condition = desc['filter'] if desc.get('filter') is not None else {}
+        self._figures.append((plot, resultset.filter(condition), desc,
+                              filename, plotdir))
+    
+    def plot_lines(self, resultset, desc, filename, plotdir):
+        """Queue a figure rendered by plot_lines"""
+        self.add('lines', resultset, desc, filename, plotdir)
+    
+    def plot_bar_chart(self, resultset, desc, filename, plotdir):
+        """Queue a figure rendered by plot_bar_chart"""
+        self.add('bar_chart', resultset, desc, filename, plotdir)
+    
+    def plot_cdf(self, resultset, desc, filename, plotdir):
+        """Queue a figure rendered by plot_cdf"""
+        self.add('cdf', resultset, desc, filename, plotdir)
+    
+    @staticmethod
+    def key(plot, resultset, desc, filename):
+        """Return the key identifying the data a figure is rendered from
+        
+        Parameters
+        ----------
+        plot : str
+            The type of plot
+        resultset : ResultSet
+            The results matching the filter of the plot descriptor
+        desc : dict
+            The plot descriptor
+        filename : str
+            The name of the file of the figure
+        
+        Returns
+        -------
+        key : str
+            The hexadecimal SHA-1 digest of the data of the figure
+        """
+        metrics = [tuple(m) for m in desc['ymetrics']]
+        rows = [(params, [_data(results.getval(m)) for m in metrics])
+                for params, results in resultset]
+        return params_digest((plot, desc, filename, rows))
+    
+    def run(self):
+        """Render all queued figures whose data has changed, and empty the
+        queue
+        
+        Returns
+        -------
+        rendered : list
+            The paths of the rendered figures
+        skipped : list
+            The paths of the figures which were not rendered because they are
+            unchanged
+        """
+        figures, self._figures = self._figures, []
+        keys = {}
+        for plotdir in set(f[4] for f in figures):
+            path = os.path.join(plotdir, PLOT_KEYS_FILE)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    keys[plotdir] = pickle.load(f)
+            else:
+                keys[plotdir] = {}
+        jobs = []
+        skipped = []
+        for plot, resultset, desc, filename, plotdir in figures:
+            key = self.key(plot, resultset, desc, filename)
+            if not self.force and keys[plotdir].get(filename) == key \
+                    and os.path.exists(os.path.join(plotdir, filename)):
+                skipped.append(os.path.join(plotdir, filename))
+                continue
+            # The key is stored only once the figure has been rendered
+            keys[plotdir].pop(filename, None)
+            jobs.append((key, (plot, resultset, desc, filename, plotdir)))
+        rendered = []
+        pool = mp.Pool(self.n_processes) if self.n_processes > 1 and len(jobs) > 1 else None
+        try:
+            results = [pool.apply_async(_render, args) if pool is not None else None
+                       for _, args in jobs]
+            for (key, args), result in zip(jobs, results):
+                plotdir = args[4]
+                filename = result.get() if result is not None else _render(*args)
+                keys[plotdir][filename] = key
+                rendered.append(os.path.join(plotdir, filename))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            for plotdir, plotdir_keys in keys.iteritems():
+                with open(os.path.join(plotdir, PLOT_KEYS_FILE), 'wb') as f:
+                    pickle.dump(plotdir_keys, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return rendered, skipped
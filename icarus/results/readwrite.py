@@ -1,27 +1,65 @@
 """Functions for reading and writing results
 """
+import os
 import collections
 import copy
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
+import numpy as np
+
 from icarus.util import Tree
 from icarus.registry import register_results_reader, register_results_writer
 
 
 __all__ = [
     'ResultSet',
+    'ResultsLog',
     'write_results_pickle',
     'read_results_pickle'
            ]
 
+class _ParamIndex(object):
+    """Inverse index mapping the values of a parameter to the rows of a
+    result set having them.
+    
+    Values which cannot be hashed are stored in a list and compared one by
+    one when looked up.
+    """
+    
+    def __init__(self):
+        self._rows = collections.defaultdict(set)
+        self._unhashable = []
+    
+    def add(self, row, value):
+        try:
+            self._rows[value].add(row)
+        except TypeError:
+            self._unhashable.append((row, value))
+    
+    def lookup(self, value):
+        try:
+            rows = set(self._rows[value]) if value in self._rows else set()
+        except TypeError:
+            # The value cannot be hashed, so it cannot be equal to any
+            # hashable value (see Tree.match)
+            rows = set()
+        rows.update(row for row, v in self._unhashable if v == value)
+        return rows
+
+
 class ResultSet(object):
     """This class can be used to store results from different experiments,
     accessed and filtered.
     
     All operations that write data are thread-safe so that this object can 
     be shared by different processes.
+    
+    Filtering is performed through inverse indexes mapping the values of each
+    parameter path appearing in a filter condition to the rows having them.
+    An index is built the first time a path is used in a condition and then
+    kept up to date as results are added.
     """
     
     def __init__(self, attr=None):
@@ -32,9 +70,11 @@ class ResultSet(object):
         attr : dict, optional
             Dictionary of common attributes to all experiments
         """
-        self._results = collections.deque()
+        self._results = []
         # Dict of global attributes common to all experiments
         self.attr = attr if attr is not None else {}
+        # Inverse indexes of parameters, keyed by parameter path
+        self._index = {}
     
     def __len__(self):
         """Returns the number of results in the resultset
@@ -110,6 +150,9 @@ class ResultSet(object):
         if not isinstance(results, Tree):
             results = Tree(results)
         self._results.append((parameters, results))
+        row = len(self._results) - 1
+        for path, index in self._index.iteritems():
+            index.add(row, parameters.getval(path))
     
     def dump(self):
         """Dump all results.
@@ -145,11 +188,152 @@ class ResultSet(object):
             a tree with experiment results.
         """
         filtered_resultset = ResultSet()
-        for parameters, results in self._results:
-            parameters = Tree(parameters)
-            if parameters.match(condition):
-                filtered_resultset.add(parameters, results)
+        for row in sorted(self._match(condition)):
+            filtered_resultset.add(*self._results[row])
         return filtered_resultset
+    
+    def _match(self, condition):
+        """Return the set of rows whose parameters match a condition, with
+        the same semantics as Tree.match
+        """
+        rows = None
+        for path, value in Tree(condition).paths().iteritems():
+            if path not in self._index:
+                index = _ParamIndex()
+                for row, v in enumerate(self._param_values(path)):
+                    index.add(row, v)
+                self._index[path] = index
+            matching = self._index[path].lookup(value)
+            rows = matching if rows is None else rows & matching
+            if not rows:
+                break
+        return set(range(len(self))) if rows is None else rows
+    
+    def _param_values(self, path):
+        """Return an iterable over the values of a parameter in all rows,
+        used to build its index
+        """
+        return (parameters.getval(path) for parameters, _ in self._results)
+    
+    def metric_values(self, path):
+        """Return the values of a metric in all results, as an array
+        
+        Parameters
+        ----------
+        path : iterable
+            The path of the metric in the results tree, e.g.
+            ('CACHE_HIT_RATIO', 'MEAN')
+        
+        Returns
+        -------
+        values : array
+            The values of the metric, in the order of the results. If all
+            values are numbers, it is an array of floats where missing values
+            are NaN, otherwise it is an array of objects where missing values
+            are None
+        
+        Raises
+        ------
+        KeyError
+            If the result set is not empty and no result has the metric
+        """
+        values = [results.getval(path) for _, results in self._results]
+        if values and all(v is None for v in values):
+            raise KeyError('No result has the metric %s' % str(tuple(path)))
+        if all(isinstance(v, (int, long, float, np.number))
+               and not isinstance(v, bool) for v in values if v is not None):
+            return np.array([np.nan if v is None else v for v in values],
+                            dtype=float)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    
+    def __getstate__(self):
+        # Indexes are rebuilt when needed rather than pickled
+        state = self.__dict__.copy()
+        state.pop('_index', None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Result sets pickled by previous versions store results in a deque
+        self._results = list(self._results)
+        self._index = {}
+
+
+class ResultsLog(object):
+    """Durable append-only log of the results of completed experiments.
+    
+    Each experiment is identified by a key. Every record appended to the log
+    is written to disk before *append* returns, so that, if a campaign is
+    interrupted, all experiments completed so far can be read back from the
+    log when it is reopened and do not need to be run again.
+    
+    Records are stored as consecutive pickles. A record partially written
+    because of a crash is discarded when the log is reopened.
+    """
+    
+    def __init__(self, path):
+        """Constructor
+        
+        Parameters
+        ----------
+        path : str
+            The path of the log file. If it exists, records are read from it
+            and new records are appended to it
+        """
+        self.path = path
+        self._records = collections.OrderedDict()
+        end = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        key, params, results, duration = pickle.load(f)
+                    except Exception:
+                        # End of file or truncated record
+                        break
+                    self._records[key] = (params, results, duration)
+                    end = f.tell()
+        self._file = open(path, 'ab')
+        self._file.truncate(end)
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def __contains__(self, key):
+        return key in self._records
+    
+    def __iter__(self):
+        """Return an iterator over the (key, params, results, duration) records
+        of the log, in order of insertion
+        """
+        return ((k,) + v for k, v in self._records.iteritems())
+    
+    def append(self, key, params, results, duration):
+        """Append the results of an experiment to the log
+        
+        Parameters
+        ----------
+        key : str
+            The key identifying the experiment
+        params : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        duration : float
+            Wall-clock duration of the experiment
+        """
+        pickle.dump((key, params, results, duration), self._file,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records[key] = (params, results, duration)
+    
+    def close(self):
+        """Close the log file
+        """
+        self._file.close()
 
 
 @register_results_writer('PICKLE')
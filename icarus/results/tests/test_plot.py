@@ -0,0 +1,96 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import os
+import shutil
+import tempfile
+
+import matplotlib.pyplot as plt
+
+from icarus.results import ResultSet, PlotPipeline
+
+
+class TestPlotPipeline(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Render figures without a display
+        plt.switch_backend('Agg')
+
+    def setUp(self):
+        self.plotdir = tempfile.mkdtemp()
+        self.rs = ResultSet()
+        for name in ('LCE', 'LCD'):
+            for alpha in (0.6, 0.8):
+                self.rs.add({'strategy': {'name': name}, 'alpha': alpha, 'topology': 'A'},
+                            {'CACHE_HIT_RATIO': {'MEAN': alpha/2}})
+        self.rs.add({'strategy': {'name': 'LCE'}, 'alpha': 0.6, 'topology': 'B'},
+                    {'CACHE_HIT_RATIO': {'MEAN': 0.1}})
+
+    def tearDown(self):
+        shutil.rmtree(self.plotdir)
+
+    def desc(self, topology):
+        return {'filter': {'topology': topology},
+                'xparam': ('alpha',),
+                'xvals': [0.6, 0.8],
+                'ymetrics': [('CACHE_HIT_RATIO', 'MEAN')]*2,
+                'ycondnames': [('strategy', 'name')]*2,
+                'ycondvals': ['LCE', 'LCD']}
+
+    def queue(self, pipeline):
+        pipeline.plot_lines(self.rs, self.desc('A'), 'a.pdf', self.plotdir)
+        pipeline.plot_bar_chart(self.rs, self.desc('B'), 'b.pdf', self.plotdir)
+
+    def test_render_and_skip(self):
+        for n_processes in (1, 2):
+            pipeline = PlotPipeline(n_processes)
+            self.queue(pipeline)
+            self.assertEqual(2, len(pipeline))
+            rendered, skipped = pipeline.run()
+            self.assertEqual(0, len(pipeline))
+            self.assertEqual(2, len(rendered) + len(skipped))
+            for filename in ('a.pdf', 'b.pdf'):
+                self.assertTrue(os.path.exists(os.path.join(self.plotdir, filename)))
+        # Only the figure whose results changed is rendered again
+        self.rs.add({'strategy': {'name': 'LCD'}, 'alpha': 0.6, 'topology': 'B'},
+                    {'CACHE_HIT_RATIO': {'MEAN': 0.2}})
+        pipeline = PlotPipeline(1)
+        self.queue(pipeline)
+        rendered, skipped = pipeline.run()
+        self.assertEqual([os.path.join(self.plotdir, 'b.pdf')], rendered)
+        self.assertEqual([os.path.join(self.plotdir, 'a.pdf')], skipped)
+
+    def test_render_missing_file(self):
+        pipeline = PlotPipeline(1)
+        self.queue(pipeline)
+        pipeline.run()
+        os.remove(os.path.join(self.plotdir, 'a.pdf'))
+        self.queue(pipeline)
+        rendered, skipped = pipeline.run()
+        self.assertEqual([os.path.join(self.plotdir, 'a.pdf')], rendered)
+        pipeline = PlotPipeline(1, force=True)
+        self.queue(pipeline)
+        rendered, skipped = pipeline.run()
+        self.assertEqual(2, len(rendered))
+        self.assertEqual([], skipped)
+
+    def test_key(self):
+        desc = self.desc('A')
+        rs = self.rs.filter(desc['filter'])
+        key = PlotPipeline.key('lines', rs, desc, 'a.pdf')
+        self.assertEqual(key, PlotPipeline.key('lines', rs, self.desc('A'), 'a.pdf'))
+        self.assertNotEqual(key, PlotPipeline.key('bar_chart', rs, desc, 'a.pdf'))
+        self.assertNotEqual(key, PlotPipeline.key('lines', rs, desc, 'c.pdf'))
+        desc['xvals'] = [0.6]
+        self.assertNotEqual(key, PlotPipeline.key('lines', rs, desc, 'a.pdf'))
+
+    def test_unknown_plot(self):
+        self.assertRaises(ValueError, PlotPipeline().add, 'pie', self.rs,
+                          self.desc('A'), 'a.pdf', self.plotdir)
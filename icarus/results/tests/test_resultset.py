@@ -7,8 +7,17 @@ else:
     except ImportError:
         raise ImportError("The unittest2 package is needed to run the tests.") 
 del sys
+import os
+import shutil
+import tempfile
+import cPickle as pickle
 
-from icarus.results import ResultSet
+import numpy as np
+
+from icarus.util import Tree
+from icarus.results import ResultSet, ResultsLog, ColumnarResultsStore, \
+                           ColumnarResultSet, write_results_columnar, \
+                           read_results_columnar
 
 class TestResultSet(unittest.TestCase):
 
@@ -55,4 +64,258 @@ class TestResultSet(unittest.TestCase):
     def test_filter_no_match(self):
         filtered_rs = self.rs.filter({'gamma': 3})
         self.assertEquals(3, len(filtered_rs))
-        
\ No newline at end of file
+
+
+class TestResultSetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.rs = ResultSet()
+        self.rs.add({'strategy': {'name': 'LCE'}, 'alpha': 0.8}, {'CHR': {'MEAN': 0.5}})
+        self.rs.add({'strategy': {'name': 'LCD'}, 'alpha': 0.8}, {'CHR': {'MEAN': 0.25}})
+        self.rs.add({'strategy': {'name': 'LCE', 'p': 0.5}, 'alpha': 1.0},
+                    {'CHR': {'MEAN': 0.75}, 'LIST': {'VALUE': [1, 2]}})
+
+    def assertFilterMatches(self, condition):
+        expected = [r for r in self.rs if Tree(r[0]).match(condition)]
+        self.assertEqual(expected, self.rs.filter(condition).dump())
+
+    def test_filter(self):
+        for condition in ({'alpha': 0.8},
+                          {'strategy': {'name': 'LCE'}},
+                          {'strategy': {'name': 'LCE'}, 'alpha': 1.0},
+                          {'strategy': {'name': 'LCD'}, 'alpha': 1.0},
+                          {'strategy': {'p': None}},
+                          {'strategy': {'name': 'NONE'}},
+                          {'strategy': [1, 2]},
+                          {}):
+            self.assertFilterMatches(condition)
+
+    def test_filter_preserves_order(self):
+        self.assertEqual(['LCE', 'LCE'],
+                         [p['strategy']['name'] for p, _ in self.rs.filter({'strategy': {'name': 'LCE'}})])
+        self.assertEqual([0.8, 1.0], [p['alpha'] for p, _ in self.rs.filter({'strategy': {'name': 'LCE'}})])
+
+    def test_filter_after_add(self):
+        self.assertEqual(1, len(self.rs.filter({'alpha': 1.0})))
+        self.rs.add({'strategy': {'name': 'LCD'}, 'alpha': 1.0}, {'CHR': {'MEAN': 0.1}})
+        self.assertEqual(2, len(self.rs.filter({'alpha': 1.0})))
+        self.assertFilterMatches({'alpha': 1.0, 'strategy': {'name': 'LCD'}})
+
+    def test_metric_values(self):
+        np.testing.assert_equal([0.5, 0.25, 0.75], self.rs.metric_values(('CHR', 'MEAN')))
+        np.testing.assert_equal([0.5, 0.75],
+                                self.rs.filter({'strategy': {'name': 'LCE'}}).metric_values(('CHR', 'MEAN')))
+        values = self.rs.metric_values(('LIST', 'VALUE'))
+        self.assertEqual([None, None, [1, 2]], list(values))
+        # Metrics missing from all results are errors, e.g. misspelled
+        self.assertRaises(KeyError, self.rs.metric_values, ('CHR', 'MEDIAN'))
+        self.assertRaises(KeyError, self.rs.filter({'alpha': 0.8}).metric_values,
+                          ('LIST', 'VALUE'))
+        self.assertEqual(0, len(self.rs.filter({'alpha': 0}).metric_values(('CHR', 'MEDIAN'))))
+
+    def test_pickle(self):
+        self.rs.filter({'alpha': 0.8})
+        rs = pickle.loads(pickle.dumps(self.rs))
+        self.assertEqual(self.rs.dump(), rs.dump())
+        self.assertEqual(2, len(rs.filter({'alpha': 0.8})))
+        
+
+
+class TestResultsLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_append_reopen(self):
+        log = ResultsLog(self.path)
+        self.assertEqual(0, len(log))
+        log.append('a', {'alpha': 1}, {'m': 1}, 10)
+        log.append('b', {'alpha': 2}, {'m': 2}, 20)
+        log.close()
+        log = ResultsLog(self.path)
+        self.assertEqual(2, len(log))
+        self.assertIn('a', log)
+        self.assertNotIn('c', log)
+        self.assertEqual([('a', {'alpha': 1}, {'m': 1}, 10),
+                          ('b', {'alpha': 2}, {'m': 2}, 20)], list(log))
+        log.append('c', {'alpha': 3}, {'m': 3}, 30)
+        log.close()
+        self.assertEqual(['a', 'b', 'c'], [r[0] for r in ResultsLog(self.path)])
+
+    def test_truncated_record(self):
+        log = ResultsLog(self.path)
+        log.append('a', {'alpha': 1}, {'m': 1}, 10)
+        log.append('b', {'alpha': 2}, {'m': 2}, 20)
+        log.close()
+        # Simulate a crash while the last record was written
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        log = ResultsLog(self.path)
+        self.assertEqual(['a'], [r[0] for r in log])
+        log.append('c', {'alpha': 3}, {'m': 3}, 30)
+        log.close()
+        self.assertEqual(['a', 'c'], [r[0] for r in ResultsLog(self.path)])
+
+
+class TestColumnarResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.params = [Tree({'strategy': {'name': 'LCE'}, 'alpha': 0.8}),
+                       Tree({'strategy': {'name': 'LCD'}, 'alpha': 1.0})]
+        self.results = [Tree({'CACHE_HIT_RATIO': {'MEAN': 0.5, 'PER_NODE': {1: 0.5}},
+                              'LATENCY': {'MEAN': 10}}),
+                        Tree({'CACHE_HIT_RATIO': {'MEAN': 0.25, 'PER_NODE': {2: 0.25}}})]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_append_reopen(self):
+        store = ColumnarResultsStore(self.path)
+        for params, results in zip(self.params, self.results):
+            store.append(params, results)
+        store.close()
+        store = ColumnarResultsStore(self.path)
+        self.assertEqual(2, len(store))
+        self.assertEqual(list(zip(self.params, self.results)), store.rows())
+
+    def test_columns(self):
+        store = ColumnarResultsStore(self.path)
+        for params, results in zip(self.params, self.results):
+            store.append(params, results)
+        np.testing.assert_equal([0.5, 0.25],
+                                store.results_column(('CACHE_HIT_RATIO', 'MEAN')))
+        np.testing.assert_equal([10, np.nan], store.results_column(('LATENCY', 'MEAN')))
+        self.assertEqual(['LCE', 'LCD'], list(store.params_column(('strategy', 'name'))))
+        self.assertTrue(store.is_side(('results', ('CACHE_HIT_RATIO', 'PER_NODE'))))
+        self.assertFalse(store.is_side(('results', ('CACHE_HIT_RATIO', 'MEAN'))))
+        self.assertEqual([{1: 0.5}, {2: 0.25}],
+                         list(store.results_column(('CACHE_HIT_RATIO', 'PER_NODE'))))
+        self.assertEqual([None, None], list(store.results_column(('UNKNOWN', 'MEAN'))))
+        store.close()
+
+    def test_truncated_row(self):
+        store = ColumnarResultsStore(self.path)
+        for params, results in zip(self.params, self.results):
+            store.append(params, results)
+        store.close()
+        # Simulate a crash before the last row was committed
+        with open(os.path.join(self.path, 'rows'), 'rb+') as f:
+            f.truncate(2)
+        store = ColumnarResultsStore(self.path)
+        self.assertEqual(1, len(store))
+        self.assertEqual([(self.params[0], self.results[0])], store.rows())
+        np.testing.assert_equal([0.5], store.results_column(('CACHE_HIT_RATIO', 'MEAN')))
+
+    def test_append_after_partial_row(self):
+        store = ColumnarResultsStore(self.path)
+        store.append(self.params[0], self.results[0])
+        store.close()
+        # Simulate a crash while writing the values of the second row, after
+        # one of its records and part of another one were written
+        column = ('results', ('LATENCY', 'MEAN'))
+        with open(os.path.join(self.path, store._columns[column]), 'ab') as f:
+            pickle.dump((1, 20), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(pickle.dumps((1, 30), protocol=pickle.HIGHEST_PROTOCOL)[:4])
+        store = ColumnarResultsStore(self.path)
+        self.assertEqual(1, len(store))
+        store.append(self.params[1], self.results[1])
+        store.append(self.params[0], self.results[0])
+        store.close()
+        store = ColumnarResultsStore(self.path)
+        self.assertEqual(3, len(store))
+        self.assertEqual([(self.params[0], self.results[0]),
+                          (self.params[1], self.results[1]),
+                          (self.params[0], self.results[0])], store.rows())
+        np.testing.assert_equal([10, np.nan, 10], store.results_column(('LATENCY', 'MEAN')))
+
+    def test_overwrite(self):
+        store = ColumnarResultsStore(self.path)
+        store.append(self.params[0], self.results[0])
+        store.close()
+        store = ColumnarResultsStore(self.path, overwrite=True)
+        self.assertEqual(0, len(store))
+        self.assertEqual([], store.columns())
+
+    def test_write_read(self):
+        rs = ResultSet({'attr': 1})
+        for params, results in zip(self.params, self.results):
+            rs.add(params, results)
+        write_results_columnar(rs, self.path)
+        write_results_columnar(rs, self.path)
+        read_rs = read_results_columnar(self.path)
+        self.assertIsInstance(read_rs, ColumnarResultSet)
+        self.assertEqual(2, len(read_rs))
+        self.assertEqual({'attr': 1}, read_rs.attr)
+        self.assertEqual(rs.dump(), read_rs.dump())
+        filtered = read_rs.filter({'strategy': {'name': 'LCD'}})
+        self.assertEqual([(self.params[1], self.results[1])], filtered.dump())
+
+    def test_resultset_add(self):
+        rs = ColumnarResultSet(ColumnarResultsStore(self.path))
+        for params, results in zip(self.params, self.results):
+            rs.add(params, results)
+        rs.store.close()
+        self.assertEqual(2, len(rs))
+        # Rows added to the store are not written again
+        write_results_columnar(rs, self.path)
+        self.assertEqual(list(zip(self.params, self.results)),
+                         read_results_columnar(self.path).dump())
+
+    def test_resultset_filter(self):
+        rs = ResultSet()
+        for i in range(6):
+            params = {'strategy': {'name': ['LCE', 'LCD'][i % 2]}, 'alpha': [0.8, 1.0, 1.2][i % 3],
+                      'topology': {'nodes': [1, i % 2]}}
+            if i != 4:
+                params['strategy']['p'] = i
+            results = {'CACHE_HIT_RATIO': {'MEAN': i/10.0, 'PER_NODE': {i: 0.1}}}
+            if i == 5:
+                results['LATENCY'] = {'MEAN': 20}
+            rs.add(params, results)
+        write_results_columnar(rs, self.path)
+        read_rs = read_results_columnar(self.path)
+        def rows(selection=None):
+            raise AssertionError('rows must not be read')
+        read_rs.store.rows = rows
+        conditions = ({'alpha': 1.0}, {'alpha': 1}, {'strategy': {'name': 'LCD'}},
+                      {'strategy': {'name': 'LCE'}, 'alpha': 1.2},
+                      {'strategy': {'p': None}}, {'topology': {'nodes': [1, 0]}},
+                      {'strategy': {'name': 'NONE'}}, {})
+        filtered = []
+        for condition in conditions:
+            expected = rs.filter(condition)
+            result = read_rs.filter(condition)
+            self.assertEqual(len(expected), len(result))
+            np.testing.assert_equal(expected.metric_values(('CACHE_HIT_RATIO', 'MEAN')),
+                                    result.metric_values(('CACHE_HIT_RATIO', 'MEAN')))
+            self.assertEqual(list(expected.metric_values(('CACHE_HIT_RATIO', 'PER_NODE'))),
+                             list(result.metric_values(('CACHE_HIT_RATIO', 'PER_NODE'))))
+            filtered.append((expected, result))
+        # Metrics missing from all results are errors
+        self.assertRaises(KeyError, read_rs.metric_values, ('CACHE_HIT_RATIO', 'MEDIAN'))
+        self.assertRaises(KeyError, read_rs.filter({'alpha': 0.8}).metric_values,
+                          ('LATENCY', 'MEAN'))
+        np.testing.assert_equal([np.nan, 20], read_rs.filter({'alpha': 1.2}).metric_values(
+                                                  ('LATENCY', 'MEAN')))
+        # Filtered result sets can be filtered again
+        expected = rs.filter({'strategy': {'name': 'LCE'}}).filter({'alpha': 0.8})
+        result = read_rs.filter({'strategy': {'name': 'LCE'}}).filter({'alpha': 0.8})
+        np.testing.assert_equal(expected.metric_values(('CACHE_HIT_RATIO', 'MEAN')),
+                                result.metric_values(('CACHE_HIT_RATIO', 'MEAN')))
+        filtered.append((expected, result))
+        # Only the matching rows are read when accessed
+        del read_rs.store.rows
+        for expected, result in filtered:
+            self.assertEqual(expected.dump(), result.dump())
+        self.assertEqual(rs.filter({'strategy': None}).dump(),
+                         read_rs.filter({'strategy': None}).dump())
+        # Results added to a filtered result set are not appended to the store
+        result = read_rs.filter({'alpha': 0.8})
+        result.add({'alpha': 0.8}, {'CACHE_HIT_RATIO': {'MEAN': 1.0}})
+        self.assertEqual(3, len(result))
+        self.assertEqual(6, len(read_results_columnar(self.path)))
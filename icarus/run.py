@@ -10,6 +10,7 @@ import logging
 from icarus.util import Settings, config_logging
 from icarus.registry import RESULTS_WRITER
 from icarus.orchestration import Orchestrator
+from icarus.results import ColumnarResultSet, ColumnarResultsStore
 
 
 __all__ = ['run', 'handler']
@@ -70,6 +71,10 @@ def run(config_file, output, config_override):
     config_logging(settings.LOG_LEVEL)
     # set up orchestration
     orch = Orchestrator(settings)
+    if settings.RESULTS_FORMAT == 'COLUMNAR':
+        # Results are appended to the output store as experiments complete,
+        # instead of being kept in memory until the end of the campaign
+        orch.results = ColumnarResultSet(ColumnarResultsStore(output, overwrite=True))
     for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT, signal.SIGABRT):
         signal.signal(sig, functools.partial(handler, settings, orch, output))
     logger.info('Launching orchestrator')
@@ -77,4 +82,6 @@ def run(config_file, output, config_override):
     logger.info('Orchestrator finished')
     results = orch.results
     RESULTS_WRITER[settings.RESULTS_FORMAT](results, output)
+    if isinstance(results, ColumnarResultSet):
+        results.store.close()
     logger.info('Saved results to file %s' % os.path.abspath(output))
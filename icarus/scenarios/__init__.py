@@ -1,5 +1,6 @@
 """This package contains the code for generating simulation scenarios.
 """
+from .centrality import *
 from .cacheplacement import *
 from .contentplacement import *
 from .topology import *
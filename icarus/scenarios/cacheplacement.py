@@ -6,6 +6,8 @@ import networkx as nx
 
 from icarus.util import iround
 from icarus.registry import register_cache_placement
+from icarus.scenarios.centrality import centrality
+from icarus.scenarios.topology import invalidate_node_roles
 
 __all__ = [
         'uniform_cache_placement',
@@ -33,6 +35,7 @@ def uniform_sit_cache_placement(topology, cache_budget, n_contents, **kwargs):
         topology.node[v]['stack'][1]['cache_size'] = cache_size
     for v in topology.receivers():
         topology.node[v]['stack'][1]['cache_size'] = n_contents
+    invalidate_node_roles(topology)
 
 @register_cache_placement('UNIFORM')
 def uniform_cache_placement(topology, cache_budget, **kwargs):
@@ -49,6 +52,7 @@ def uniform_cache_placement(topology, cache_budget, **kwargs):
     cache_size = iround(cache_budget/len(icr_candidates))
     for v in icr_candidates:
         topology.node[v]['stack'][1]['cache_size'] = cache_size
+    invalidate_node_roles(topology)
 
 
 @register_cache_placement('DEGREE')
@@ -62,11 +66,14 @@ def degree_centrality_cache_placement(topology, cache_budget, **kwargs):
     cache_budget : int
         The cumulative cache budget
     """
+    # Raw degrees are cheap to compute and, unlike the degree centrality,
+    # which is normalized, do not introduce rounding errors in the shares
     deg = nx.degree(topology)
     total_deg = sum(deg.values())
     icr_candidates = topology.graph['icr_candidates']
     for v in icr_candidates:
         topology.node[v]['stack'][1]['cache_size'] = iround(cache_budget*deg[v]/total_deg)
+    invalidate_node_roles(topology)
 
 
 @register_cache_placement('BETWEENNESS_CENTRALITY')
@@ -81,11 +88,12 @@ def betweenness_centrality_cache_placement(topology, cache_budget, **kwargs):
     cache_budget : int
         The cumulative cache budget
     """
-    betw = nx.betweenness_centrality(topology)
+    betw = centrality(topology, 'betweenness')
     total_betw = sum(betw.values())
     icr_candidates = topology.graph['icr_candidates']
     for v in icr_candidates:
         topology.node[v]['stack'][1]['cache_size'] = iround(cache_budget*betw[v]/total_betw)
+    invalidate_node_roles(topology)
 
 
 @register_cache_placement('CONSOLIDATED')
@@ -120,7 +128,7 @@ def uniform_consolidated_cache_placement(topology, cache_budget, spread=0.5,
     if target not in ('top', 'bottom'):
         raise ValueError('target argument must be either "top" or "bottom"')
     if metric_dict is None and spread < 1:
-        metric_dict = nx.betweenness_centrality(topology)
+        metric_dict = centrality(topology, 'betweenness')
     
     icr_candidates = topology.graph['icr_candidates']
     if spread == 1:
@@ -138,3 +146,4 @@ def uniform_consolidated_cache_placement(topology, cache_budget, spread=0.5,
         return
     for v in target_nodes:
         topology.node[v]['stack'][1]['cache_size'] = cache_size
+    invalidate_node_roles(topology)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Centrality metrics of the nodes of a topology
+
+Cache and RSN placement functions rank nodes by their centrality. Since
+computing betweenness centrality takes O(VE) time, which is often longer than
+the rest of the setup of an experiment on large topologies, the centrality
+metrics of a topology are computed at most once and stored in its
+*centrality* graph attribute, a dictionary of metrics each keyed by node.
+This attribute is also filled with the metrics stored on disk by the
+precomputation cache (see icarus.execution.precomputation).
+"""
+import networkx as nx
+
+
+__all__ = [
+    'CENTRALITY_METRICS',
+    'centrality'
+           ]
+
+
+# Functions computing the supported centrality metrics of a topology
+CENTRALITY_METRICS = {
+    'degree': nx.degree_centrality,
+    'betweenness': nx.betweenness_centrality,
+    'closeness': nx.closeness_centrality,
+                      }
+
+
+def centrality(topology, metric='betweenness'):
+    """Return the centrality of all nodes of a topology, computing it only if
+    it has not been computed for this topology before
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object. It must not be modified after calling this
+        function, otherwise centralities would be out of date
+    metric : ("degree" | "betweenness" | "closeness"), optional
+        The centrality metric
+
+    Returns
+    -------
+    centrality : dict
+        The centrality of each node, keyed by node. It must not be modified
+    """
+    if metric not in CENTRALITY_METRICS:
+        raise ValueError('Unknown centrality metric %s' % str(metric))
+    metrics = topology.graph.setdefault('centrality', {})
+    if metric not in metrics:
+        metrics[metric] = CENTRALITY_METRICS[metric](topology)
+    return metrics[metric]
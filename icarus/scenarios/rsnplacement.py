@@ -1,11 +1,12 @@
 """Strategies for placing RSN tables in nodes
 """
 from __future__ import division
-import networkx as nx
 from icarus.util import iround
 from cacheplacement import uniform_consolidated_cache_placement
 from cacheplacement import uniform_sit_cache_placement
 from icarus.registry import register_rsn_placement, register_joint_cache_rsn_placement
+from icarus.scenarios.centrality import centrality
+from icarus.scenarios.topology import invalidate_node_roles
 
 
 __all__ = [
@@ -57,7 +58,7 @@ def uniform_consolidated_rsn_placement(topology, rsn_budget, spread=0.5,
     if target not in ('top', 'bottom'):
         raise ValueError('tagrget argument must be either "top" or "bottom"')
     if metric_dict is None:
-        metric_dict = nx.betweenness_centrality(topology)
+        metric_dict = centrality(topology, 'betweenness')
     
     icr_candidates = topology.graph['icr_candidates']
     nodes = sorted(icr_candidates, key=lambda k: metric_dict[k])
@@ -72,6 +73,7 @@ def uniform_consolidated_rsn_placement(topology, rsn_budget, spread=0.5,
         return
     for v in target_nodes:
         topology.node[v]['stack'][1]['rsn_size'] = rsn_size
+    invalidate_node_roles(topology)
 
 # Onur added this
 @register_joint_cache_rsn_placement('CACHE_ALL_RSN_ALL_SIT')
@@ -0,0 +1,61 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import networkx as nx
+import fnss
+
+from icarus.scenarios import centrality, cache_all_rsn_high_placement, \
+                             degree_centrality_cache_placement
+
+
+class TestCentrality(unittest.TestCase):
+
+    def test_metrics(self):
+        topology = fnss.star_topology(5)
+        for metric, f in [('degree', nx.degree_centrality),
+                          ('betweenness', nx.betweenness_centrality),
+                          ('closeness', nx.closeness_centrality)]:
+            self.assertEqual(f(topology), centrality(topology, metric))
+        self.assertEqual(set(['degree', 'betweenness', 'closeness']),
+                         set(topology.graph['centrality']))
+        self.assertRaises(ValueError, centrality, topology, 'invalid')
+
+    def test_memoized(self):
+        topology = fnss.line_topology(5)
+        betw = centrality(topology)
+        self.assertIs(betw, centrality(topology, 'betweenness'))
+        topology.graph['centrality']['betweenness'] = {v: -v for v in topology}
+        self.assertEqual(-4, centrality(topology)[4])
+
+    def test_placement(self):
+        topology = fnss.line_topology(7)
+        for v in topology.nodes_iter():
+            fnss.add_stack(topology, v, 'router')
+        topology.graph['icr_candidates'] = [1, 2, 3, 4, 5]
+        # Placements rank nodes with the centralities stored in the topology
+        topology.graph['centrality'] = {'betweenness': {v: v for v in topology}}
+        cache_all_rsn_high_placement(topology, 50, 20, rsn_spread=0.4)
+        rsn_nodes = set(v for v in topology.nodes_iter()
+                        if 'rsn_size' in topology.node[v]['stack'][1])
+        self.assertEqual(set([4, 5]), rsn_nodes)
+
+    def test_degree_placement(self):
+        topology = fnss.line_topology(10)
+        for v in topology.nodes_iter():
+            fnss.add_stack(topology, v, 'router')
+        topology.graph['icr_candidates'] = topology.nodes()
+        # Shares of the budget are exactly proportional to degrees, so those
+        # of 0.5 are rounded up
+        degree_centrality_cache_placement(topology, 9)
+        self.assertEqual([1]*10, [topology.node[v]['stack'][1]['cache_size']
+                                  for v in range(10)])
+        degree_centrality_cache_placement(topology, 36)
+        self.assertEqual([2] + [4]*8 + [2],
+                         [topology.node[v]['stack'][1]['cache_size']
+                          for v in range(10)])
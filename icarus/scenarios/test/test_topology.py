@@ -0,0 +1,101 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import copy
+import pickle
+
+import fnss
+
+from icarus.scenarios import IcnTopology, node_roles, invalidate_node_roles, \
+                             uniform_cache_placement, uniform_consolidated_rsn_placement
+
+
+class TestNodeRoles(unittest.TestCase):
+
+    def setUp(self):
+        topology = fnss.line_topology(5)
+        fnss.add_stack(topology, 0, 'receiver')
+        fnss.add_stack(topology, 1, 'receiver')
+        for v in (2, 3):
+            fnss.add_stack(topology, v, 'router')
+        fnss.add_stack(topology, 4, 'source')
+        topology.graph['icr_candidates'] = set([2, 3])
+        self.topology = IcnTopology(topology)
+
+    def test_roles(self):
+        self.assertEqual(frozenset([0, 1]), self.topology.receivers())
+        self.assertEqual(frozenset([4]), self.topology.sources())
+        self.assertEqual(frozenset([2, 3]), node_roles(self.topology).routers)
+        self.assertEqual({}, self.topology.cache_nodes())
+        self.assertTrue(self.topology.is_receiver(1))
+        self.assertFalse(self.topology.is_receiver(2))
+        self.assertTrue(self.topology.is_source(4))
+        self.assertFalse(self.topology.is_source(0))
+        self.assertIs(node_roles(self.topology), node_roles(self.topology))
+
+    def test_add_stack(self):
+        self.assertTrue(self.topology.is_receiver(1))
+        self.topology.add_stack(1, 'source', {'contents': set()})
+        self.assertFalse(self.topology.is_receiver(1))
+        self.assertEqual(frozenset([1, 4]), self.topology.sources())
+
+    def test_invalidate(self):
+        self.assertFalse(self.topology.is_source(0))
+        fnss.add_stack(self.topology, 0, 'source')
+        invalidate_node_roles(self.topology)
+        self.assertTrue(self.topology.is_source(0))
+
+    def test_fnss_stacks(self):
+        # Stacks set or removed through fnss invalidate the index as well
+        self.assertFalse(self.topology.is_source(0))
+        fnss.add_stack(self.topology, 0, 'source')
+        self.assertTrue(self.topology.is_source(0))
+        self.assertEqual(frozenset([1]), self.topology.receivers())
+        fnss.remove_stack(self.topology, 0)
+        self.assertEqual(frozenset([4]), self.topology.sources())
+        self.topology.node[0].update(stack=('receiver', {}))
+        self.assertEqual(frozenset([0, 1]), self.topology.receivers())
+
+    def test_nodes(self):
+        self.assertEqual(frozenset([0, 1]), self.topology.receivers())
+        self.topology.add_edge(1, 5)
+        fnss.add_stack(self.topology, 5, 'receiver')
+        self.assertEqual(frozenset([0, 1, 5]), self.topology.receivers())
+        self.topology.remove_node(0)
+        self.assertEqual(frozenset([1, 5]), self.topology.receivers())
+
+    def test_node_order(self):
+        # Nodes are iterated as those of plain topologies
+        topology = fnss.erdos_renyi_topology(60, 0.1, seed=1)
+        topology.add_edges_from(('rec_%d' % v, v) for v in range(0, 60, 3))
+        topology.remove_nodes_from(range(1, 60, 7))
+        icn_topology = IcnTopology(topology)
+        self.assertEqual(fnss.Topology(topology).nodes(), icn_topology.nodes())
+        self.assertEqual(fnss.Topology(topology.edges()).nodes(),
+                         IcnTopology(topology.edges()).nodes())
+
+    def test_copy(self):
+        self.assertTrue(self.topology.is_receiver(1))
+        for topology in (pickle.loads(pickle.dumps(self.topology)),
+                         pickle.loads(pickle.dumps(self.topology, 2)),
+                         copy.deepcopy(self.topology)):
+            self.assertIs(topology.graph, topology.node.graph)
+            fnss.add_stack(topology, 1, 'source')
+            self.assertTrue(topology.is_source(1))
+            self.assertTrue(self.topology.is_receiver(1))
+
+    def test_placement(self):
+        self.assertEqual({}, self.topology.rsn_nodes())
+        uniform_cache_placement(self.topology, 10)
+        self.assertEqual({2: 5, 3: 5}, self.topology.cache_nodes())
+        uniform_consolidated_rsn_placement(self.topology, 10, spread=1)
+        self.assertEqual(10, sum(self.topology.rsn_nodes().values()))
+        # Returned dicts are copies of the index
+        self.topology.cache_nodes()[0] = 1
+        self.assertNotIn(0, self.topology.cache_nodes())
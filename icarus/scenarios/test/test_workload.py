@@ -0,0 +1,138 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import random
+import pickle
+
+import fnss
+
+import icarus.scenarios as workload
+from icarus.scenarios.topology import IcnTopology
+
+
+def star_topology():
+    topology = IcnTopology(fnss.star_topology(6))
+    fnss.add_stack(topology, 0, 'router')
+    for v in range(1, 6):
+        fnss.add_stack(topology, v, 'receiver')
+    fnss.add_stack(topology, 6, 'source')
+    topology.add_edge(0, 6)
+    return topology
+
+
+def events(w):
+    return [(t, ev['receiver'], ev['content'], ev['log']) for t, ev in w]
+
+
+class TestStationarySitWorkload(unittest.TestCase):
+
+    def workload(self, **kwargs):
+        params = dict(n_contents=100, alpha=0.8, rate=10.0, n_warmup=300,
+                      n_measured=700, seed=5, disconnection_rate=0.01)
+        params.update(kwargs)
+        return workload.StationarySitWorkload(star_topology(), **params)
+
+    def test_reproducible(self):
+        w1 = self.workload()
+        ev1 = events(w1)
+        # Use of the random module by others must not affect the workload
+        w2 = self.workload()
+        random.random()
+        ev2 = []
+        for t, ev in w2:
+            random.random()
+            ev2.append((t, ev['receiver'], ev['content'], ev['log']))
+        self.assertEqual(ev1, ev2)
+        self.assertNotEqual(ev1, events(self.workload(seed=6)))
+
+    def test_reproducible_beta(self):
+        self.assertEqual(events(self.workload(beta=0.9)),
+                         events(self.workload(beta=0.9)))
+
+    def test_events(self):
+        w = self.workload()
+        ev = events(w)
+        requests = [e for e in ev if e[2] != -1]
+        disconnections = [e for e in ev if e[2] == -1]
+        self.assertEqual(1000, len(requests))
+        self.assertGreater(len(disconnections), 0)
+        self.assertTrue(all(not e[3] for e in requests[:300]))
+        self.assertTrue(all(e[3] for e in requests[300:]))
+        self.assertTrue(all(e[3] for e in disconnections))
+        self.assertEqual(ev[:300], requests[:300])
+        times = [e[0] for e in ev]
+        self.assertEqual(sorted(times), times)
+        self.assertTrue(all(1 <= e[2] <= 100 for e in requests))
+        self.assertTrue(all(e[1] in range(1, 6) for e in ev))
+        # Connections are counted per receiver and content
+        self.assertEqual(1000, sum(sum(c.values()) for c in w.connections))
+        for i, v in enumerate(w.receivers_list):
+            for content, count in w.connections[i].items():
+                self.assertEqual(count, sum(1 for e in requests
+                                            if e[1] == v and e[2] == content))
+
+    def test_chunk_size(self):
+        ev = events(self.workload())
+        for chunk_size in (1, 7, 300):
+            w = self.workload()
+            w.chunk_size = chunk_size
+            self.assertEqual(ev, events(w))
+        w = self.workload()
+        w.shard(1, 3)
+        ev = events(w)
+        w = self.workload()
+        w.shard(1, 3)
+        w.chunk_size = 7
+        self.assertEqual(ev, events(w))
+
+    def test_seeded_events(self):
+        # Events drawn for a given seed must not change across versions
+        ev = [(round(t, 6), v, content, log)
+              for t, v, content, log in events(self.workload())]
+        self.assertEqual([(0.079219, 1, 40, False), (0.090266, 2, 37, False),
+                          (0.24734, 4, 20, False)], ev[:3])
+        self.assertEqual([(28.596646, 1, -1, True), (28.596646, 2, 35, True),
+                          (28.63629, 4, 3, True), (28.691746, 3, 10, True),
+                          (28.716352, 4, 7, True), (28.731539, 4, 74, True),
+                          (28.982466, 3, -1, True), (28.982466, 1, 82, True)],
+                         ev[300:308])
+
+    def test_shards(self):
+        ev = events(self.workload())
+        shards = []
+        for i in range(3):
+            w = self.workload()
+            w.shard(i, 3)
+            shards.append(events(w))
+        for shard in shards:
+            # All shards start after the same warmup
+            self.assertEqual(ev[:300], shard[:300])
+            self.assertTrue(all(e[3] for e in shard[300:]))
+            times = [e[0] for e in shard]
+            self.assertEqual(sorted(times), times)
+        self.assertEqual(700, sum(sum(1 for e in shard[300:] if e[2] != -1)
+                                  for shard in shards))
+        self.assertNotEqual(shards[0][300:], shards[1][300:])
+        w = self.workload()
+        w.shard(1, 3)
+        self.assertEqual(shards[1], events(w))
+        self.assertRaises(ValueError, w.shard, 3, 3)
+
+    def test_warmup_state(self):
+        ev = events(self.workload())
+        w = self.workload()
+        warmup = events(w.warmup())
+        state = pickle.loads(pickle.dumps(w.warmup_state()))
+        self.assertEqual(ev[:300], warmup)
+        # Warmup events are not simulated again
+        w = self.workload()
+        random.random()
+        w.restore_warmup_state(state)
+        self.assertEqual(ev[300:], events(w.measured()))
+        self.assertEqual(1000, sum(sum(c.values()) for c in w.connections))
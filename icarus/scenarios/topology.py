@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
 """This module contains functions for creating or importing topologies for the
 experiments.
+
+The role of each node, i.e. whether it is a receiver, a source or a router
+and whether it has a cache or an RSN table, is determined by its stack.
+Since roles are queried while experiments run, e.g. by data collectors on
+every cache hit, the nodes of each role are indexed once per topology and
+stored in its *roles* graph attribute. The index of an IcnTopology is
+discarded whenever a stack is set or removed, e.g. by fnss.add_stack, or a
+node is added or removed. Any other change, e.g. to the properties of a stack
+in place, must be followed by a call to invalidate_node_roles, as done by the
+cache and RSN placement functions.
 """
 from __future__ import division
 
+import collections
 from os import path
 
 import networkx as nx
@@ -14,6 +25,9 @@ from icarus.registry import register_topology_factory
 
 __all__ = [
         'IcnTopology',
+        'NodeRoles',
+        'node_roles',
+        'invalidate_node_roles',
         'topology_binary_tree',
         'topology_path',
         'topology_geant',
@@ -38,31 +52,192 @@ TOPOLOGY_RESOURCES_DIR = path.abspath(path.join(path.dirname(__file__),
                                                 'resources', 'topologies'))
 
 
+# Index of the nodes of a topology by role
+NodeRoles = collections.namedtuple('NodeRoles', ['receivers', 'sources',
+                                                 'routers', 'cache_nodes',
+                                                 'rsn_nodes'])
+
+
+def node_roles(topology):
+    """Return the index of the nodes of a topology by role, building it only
+    if it has not been built since the stacks of the topology last changed
+    
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    
+    Returns
+    -------
+    roles : NodeRoles
+        The receivers, sources and routers of the topology, as frozensets,
+        and the cache and RSN table sizes of the nodes having them, as dicts
+        keyed by node, which must not be modified
+    """
+    if 'roles' not in topology.graph:
+        stacks = [(v, topology.node[v]['stack']) for v in topology
+                  if 'stack' in topology.node[v]]
+        topology.graph['roles'] = NodeRoles(
+            receivers=frozenset(v for v, s in stacks if s[0] == 'receiver'),
+            sources=frozenset(v for v, s in stacks if s[0] == 'source'),
+            routers=frozenset(v for v, s in stacks if s[0] == 'router'),
+            cache_nodes={v: s[1]['cache_size'] for v, s in stacks
+                         if 'cache_size' in s[1]},
+            rsn_nodes={v: s[1]['rsn_size'] for v, s in stacks
+                       if 'rsn_size' in s[1]})
+    return topology.graph['roles']
+
+
+def invalidate_node_roles(topology):
+    """Discard the index of the nodes of a topology by role, after its stacks
+    changed
+    
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    """
+    topology.graph.pop('roles', None)
+
+
+class _NodeAttributes(dict):
+    """Attributes of a node of an IcnTopology, discarding the index of the
+    nodes of the topology by role when the stack of the node changes
+    """
+
+    def __init__(self, nodes, attr):
+        dict.__init__(self, attr)
+        self.nodes = nodes
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        if key == 'stack':
+            self.nodes.invalidate()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        if key == 'stack':
+            self.nodes.invalidate()
+
+    def pop(self, key, *default):
+        if key == 'stack':
+            self.nodes.invalidate()
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        if key == 'stack':
+            self.nodes.invalidate()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.nodes.invalidate()
+
+    def popitem(self):
+        self.nodes.invalidate()
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self.nodes.invalidate()
+
+    def __reduce__(self):
+        # The attributes are wrapped again by the dict of the nodes they are
+        # added to, so that they never refer to that of another topology
+        return (dict, (dict(self),))
+
+
+class _NodeDict(dict):
+    """Attributes of the nodes of an IcnTopology, keyed by node
+
+    Attributes are stored as _NodeAttributes, so that changes of stacks
+    discard the index of the nodes by role stored in the *graph* attributes of
+    the topology, as does adding or removing nodes.
+    """
+
+    def __init__(self, graph):
+        dict.__init__(self)
+        self.graph = graph
+
+    def __setitem__(self, v, attr):
+        if not isinstance(attr, _NodeAttributes) or attr.nodes is not self:
+            attr = _NodeAttributes(self, attr)
+        dict.__setitem__(self, v, attr)
+        self.invalidate()
+
+    def __delitem__(self, v):
+        dict.__delitem__(self, v)
+        self.invalidate()
+
+    def pop(self, v, *default):
+        self.invalidate()
+        return dict.pop(self, v, *default)
+
+    def update(self, *args, **kwargs):
+        for v, attr in dict(*args, **kwargs).iteritems():
+            self[v] = attr
+
+    def clear(self):
+        dict.clear(self)
+        self.invalidate()
+
+    def invalidate(self):
+        self.graph.pop('roles', None)
+
+    def __reduce__(self):
+        return (_NodeDict, (self.graph,), None, None, self.iteritems())
+
+
 class IcnTopology(fnss.Topology):
     
+    def __init__(self, data=None, name="", **kwargs):
+        # The topology is loaded as by nx.Graph.__init__, but into a _NodeDict
+        # whose nodes are inserted, and therefore iterated, in the same order
+        # as those of the dict nx.Graph would use
+        super(IcnTopology, self).__init__()
+        self.node = _NodeDict(self.graph)
+        if data is not None:
+            nx.convert.to_networkx_graph(data, create_using=self)
+            if not isinstance(self.node, _NodeDict):
+                # The node attributes of a graph are copied into a new dict
+                self.node = _NodeDict(self.graph)
+                for v, attr in data.node.iteritems():
+                    self.node[v] = attr
+        self.graph.update(kwargs, name=name)
+
+    def add_stack(self, v, name, properties=None):
+        """Set the stack of a node (see fnss.add_stack)
+        
+        Parameters
+        ----------
+        v : any hashable type
+            The node
+        name : str
+            The name of the stack
+        properties : dict, optional
+            The properties of the stack
+        """
+        fnss.add_stack(self, v, name, properties)
+    
     def cache_nodes(self):
-        return {v: self.node[v]['stack'][1]['cache_size']
-                for v in self
-                if 'stack' in self.node[v]
-                and 'cache_size' in self.node[v]['stack'][1]
-                }
+        return dict(node_roles(self).cache_nodes)
         
     def rsn_nodes(self):
-        return {v: self.node[v]['stack'][1]['rsn_size']
-                for v in self
-                if 'stack' in self.node[v]
-                and 'rsn_size' in self.node[v]['stack'][1]
-                }
+        return dict(node_roles(self).rsn_nodes)
         
     def sources(self):
-        return set(v for v in self
-                   if 'stack' in self.node[v]
-                   and self.node[v]['stack'][0] == 'source')
+        return node_roles(self).sources
         
     def receivers(self):
-        return set(v for v in self
-                   if 'stack' in self.node[v]
-                   and self.node[v]['stack'][0] == 'receiver')
+        return node_roles(self).receivers
+    
+    def is_source(self, v):
+        """Return whether a node is a content source"""
+        return v in node_roles(self).sources
+    
+    def is_receiver(self, v):
+        """Return whether a node is a receiver"""
+        return v in node_roles(self).receivers
 
 @register_topology_factory('BINARY_TREE')
 def topology_binary_tree(**kwargs):
@@ -12,9 +12,11 @@ all content identifiers. This is need for content placement
 import random
 import csv
 
+import numpy as np
 import networkx as nx
 
 from icarus.tools import TruncatedZipfDist
+from icarus.util import ConnectionCounter
 from icarus.registry import register_workload
 
 __all__ = [
@@ -29,7 +31,29 @@ class StationarySitWorkload(object):
     """This function is adapted to work for the SIT experiments. The only 
     difference from STATIONARY is that it generated disconnection events after
     a specified amount of warm-up time interval.
+
+    Random values (inter-arrival times, receivers and contents of requests,
+    receivers and intervals of disconnections) are drawn in blocks of
+    *chunk_size* values with NumPy random generators owned by the workload,
+    one per kind of value and seeded from the seed of the workload, so that
+    the events do not depend on the chunk size. Iterating over two workloads
+    created with the same parameters and the same non-None seed therefore
+    always yields the same events, regardless of the use other components
+    make of the random module.
+
+    The warmup and measured phases can also be generated separately, with
+    the *warmup* and *measured* methods, and the state of the workload at the
+    end of the warmup phase saved and restored, so that experiments sharing
+    the same warmup phase do not need to simulate it again. The measured phase
+    can be split into shards with the *shard* method.
 """
+    # Number of random values drawn at once for each kind of value
+    chunk_size = 2**16
+
+    # Random streams, one per kind of value. The index of a stream is part of
+    # the seed of its generator
+    TIMES, RECEIVERS, CONTENTS, DISCONNECTED, INTERVALS, RANDOM = range(6)
+
     def __init__(self, topology, n_contents, alpha, beta=0, rate=12.0,
                     n_warmup=10**5, n_measured=4*10**5, seed=None, disconnection_rate=1.0, **kwargs):
         if alpha < 0:
@@ -43,90 +67,217 @@ class StationarySitWorkload(object):
         self.contents = range(1, n_contents + 1)
         self.n_connected = 0
         num_receviers = len(topology.receivers())
-        # Variable to keep track of connections for each receiver:
-        self.connections = [dict() for x in range(num_receviers)]
+        # Variable to keep track of connections for each receiver, shared
+        # with the strategies which sample them on disconnection events
+        self.connections = [ConnectionCounter() for x in range(num_receviers)]
         # Variable to keep track of the requested content during warmup (to print info)
-        self.requested_content = {}
+        self.requested_content = set()
         self.receivers_list = list(topology.receivers())
         self.alpha = alpha
         self.rate = rate
         self.n_warmup = n_warmup
         self.n_measured = n_measured
-        random.seed(seed)
+        self.seed = seed
         self.beta = beta
         self.disconnection_rate = disconnection_rate
+        # (index, number of shards) of the shard of the measured phase to
+        # generate, if any
+        self.shard_spec = None
         if beta != 0:
             degree = nx.degree(topology)
             self.receivers = sorted(self.receivers, key=lambda x: degree[iter(topology.edge[x]).next()], reverse=False)
             self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
-        
+        # Index in self.connections of the connections of each receiver
+        self.receiver_index = [self.receivers_list.index(v) for v in self.receivers]
+        # Strategies draw random values from the random module. Seed it only
+        # now because TruncatedZipfDist reseeds it
+        random.seed(seed)
+
+    def shard(self, index, n_shards):
+        """Generate only a shard of the measured phase of the workload
+
+        The measured phase is split into *n_shards* shards of (almost) equal
+        numbers of requests. All shards start after the same warmup phase,
+        from the time of its last request, but draw their requests and
+        disconnections from a different seed, derived from the seed of the
+        workload and the index of the shard. The random module is reseeded
+        with it as well at the end of the warmup phase.
+
+        Parameters
+        ----------
+        index : int
+            The index of the shard, between 0 and *n_shards - 1*
+        n_shards : int
+            The number of shards
+        """
+        if not 0 <= index < n_shards:
+            raise ValueError('index must be between 0 and n_shards - 1')
+        self.shard_spec = (index, n_shards)
+
+    def _rng(self, stream, shard=None):
+        """Return the generator of the random values of a stream, seeded from
+        the seed of the workload, the index of the stream and that of the
+        shard, if any
+        """
+        if self.seed is None:
+            return np.random.RandomState()
+        key = [self.seed, stream] if shard is None else [self.seed, shard, stream]
+        return np.random.RandomState(key)
+
+    def _draw_receivers(self, rng, size):
+        """Draw the positions in self.receivers of *size* random receivers
+        """
+        if self.beta == 0:
+            return (rng.random_sample(size)*len(self.receivers)).astype(int)
+        return np.searchsorted(self.receiver_dist.cdf, rng.random_sample(size))
+
+    def _requests(self, rngs, n_left, t_event=0.0):
+        """Generate (time, receiver position, content) tuples of *n_left*
+        requests following time *t_event*, drawn from the (times, receivers,
+        contents) generators *rngs*
+        """
+        times_rng, receivers_rng, contents_rng = rngs
+        while n_left > 0:
+            size = min(self.chunk_size, n_left)
+            n_left -= size
+            # Timestamps are accumulated sequentially from the last one, so
+            # that they do not depend on the chunk size
+            t_events = np.cumsum(np.concatenate(([t_event],
+                                 times_rng.exponential(1.0/self.rate, size))))[1:]
+            receivers = self._draw_receivers(receivers_rng, size)
+            contents = np.searchsorted(self.zipf.cdf,
+                                       contents_rng.random_sample(size)) + 1
+            for item in zip(t_events.tolist(), receivers.tolist(), contents.tolist()):
+                yield item
+            t_event = t_events[-1]
+
+    def _disconnections(self, shard=None):
+        """Generate (receiver position, standard exponential) tuples used by
+        disconnection events
+        """
+        receivers_rng = self._rng(self.DISCONNECTED, shard)
+        intervals_rng = self._rng(self.INTERVALS, shard)
+        while True:
+            receivers = self._draw_receivers(receivers_rng, self.chunk_size)
+            intervals = intervals_rng.standard_exponential(self.chunk_size)
+            for item in zip(receivers.tolist(), intervals.tolist()):
+                yield item
+
     def __iter__(self):
-        req_counter = 0
+        for event in self.warmup():
+            yield event
+        for event in self.measured():
+            yield event
+
+    def warmup(self):
+        """Generate the events of the warmup phase
+
+        The state of the workload at the end of the warmup phase can then be
+        saved with *warmup_state*.
+        """
+        rngs = [self._rng(stream) for stream in
+                (self.TIMES, self.RECEIVERS, self.CONTENTS)]
+        requests = self._requests(rngs, self.n_warmup)
+        receivers = self.receivers
+        receiver_index = self.receiver_index
+        connections = self.connections
+        requested_content = self.requested_content
         t_event = 0.0
         # Initialization (i.e., warmup) period:
-        while req_counter < self.n_warmup:
-            t_event += (random.expovariate(self.rate))
-            if self.beta == 0:
-                receiver = random.choice(self.receivers)
-            else:
-                receiver = self.receivers[self.receiver_dist.rv()-1]
-        
-            content = int(self.zipf.rv())
-            self.requested_content[content] = True
-            log = (req_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'log': log}
+        for t_event, i, content in requests:
+            requested_content.add(content)
+            event = {'receiver': receivers[i], 'content': content, 'log': False}
             yield (t_event, event)
-            req_counter += 1
             self.n_connected += 1
-
             # Keep track of connections
-            receiver_index = self.receivers_list.index(receiver)
-            receiver_conns = self.connections[receiver_index]
-            if content in receiver_conns.keys():
-                receiver_conns[content] += 1
-            else: 
-                receiver_conns[content] = 1
+            connections[receiver_index[i]].increment(content)
+        self._rngs = rngs
+        self._t_warmup = t_event
+        print "The number of content requested during warmup is " + repr(len(requested_content)) + " for zipf parameter: " + repr(self.alpha)
 
-        t_disconnect = t_event
-        print "The number of content requested during warmup is " + repr(len(self.requested_content.keys())) + " for zipf parameter: " + repr(self.alpha)
+    def measured(self):
+        """Generate the events of the measured phase, or of its shard if set
+
+        It must be called after the events of the warmup phase have been
+        generated or its state restored with *restore_warmup_state*.
+        """
+        rngs = self._rngs
+        t_event = self._t_warmup
+        n_measured = self.n_measured
+        index = None
+        if self.shard_spec is not None:
+            index, n_shards = self.shard_spec
+            rngs = [self._rng(stream, index) for stream in
+                    (self.TIMES, self.RECEIVERS, self.CONTENTS)]
+            random.seed(self._rng(self.RANDOM, index).randint(2**31))
+            n_measured = n_measured//n_shards + (index < n_measured % n_shards)
+        requests = self._requests(rngs, n_measured, t_event)
+        disconnections = self._disconnections(index)
+        receivers = self.receivers
+        receiver_index = self.receiver_index
+        connections = self.connections
+        requested_content = self.requested_content
         num_unsatisfied = 0
-        while req_counter < self.n_warmup + self.n_measured:
-            t_event += (random.expovariate(self.rate))
-            
+        t_disconnect = t_event
+        for t_event, i, content in requests:
             while t_disconnect < t_event and self.n_connected > 0:
-                if self.beta == 0:
-                    receiver = random.choice(self.receivers)
-                else:
-                    receiver = self.receivers[self.receiver_dist.rv()-1]
-                content = -1
-                log = (req_counter >= self.n_warmup)
-                event = {'receiver': receiver, 'content': content, 'log': log, 'connections': self.connections}
+                j, interval = next(disconnections)
+                event = {'receiver': receivers[j], 'content': -1, 'log': True, 'connections': connections}
                 yield (t_event, event)
-                t_disconnect += random.expovariate(self.disconnection_rate*self.n_connected)
+                t_disconnect += interval/(self.disconnection_rate*self.n_connected)
                 self.n_connected -= 1
 
-            if self.beta == 0:
-                receiver = random.choice(self.receivers)
-            else:
-                receiver = self.receivers[self.receiver_dist.rv()-1]
-            content = int(self.zipf.rv())
-            log = (req_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'log': log, 'connections': self.connections}
+            event = {'receiver': receivers[i], 'content': content, 'log': True, 'connections': connections}
             self.n_connected += 1
-            if content not in self.requested_content.keys():
+            if content not in requested_content:
                 num_unsatisfied += 1
             yield (t_event, event)
             # Keep track of connections
-            receiver_index = self.receivers_list.index(receiver)
-            receiver_conns = self.connections[receiver_index]
-            if content in receiver_conns.keys():
-                receiver_conns[content] += 1
-            else: 
-                receiver_conns[content] = 1
-            req_counter += 1
+            connections[receiver_index[i]].increment(content)
 
         print "Number of unsatisfiable requests: " + str(num_unsatisfied)
-        raise StopIteration()
+
+    def warmup_state(self):
+        """Return the state of the workload at the end of the warmup phase
+
+        The state includes that of the random module, which is used by
+        strategies, so that restoring it with *restore_warmup_state* resumes
+        the experiment exactly where the warmup phase ended.
+
+        Returns
+        -------
+        state : dict
+            The state of the workload. It is picklable
+        """
+        return {'connections': self.connections,
+                'n_connected': self.n_connected,
+                'requested_content': self.requested_content,
+                't_warmup': self._t_warmup,
+                'rng': [rng.get_state() for rng in self._rngs],
+                'random': random.getstate()}
+
+    def restore_warmup_state(self, state):
+        """Restore the state of the workload at the end of the warmup phase,
+        as returned by *warmup_state*, instead of generating its events
+
+        Parameters
+        ----------
+        state : dict
+            The state of the workload
+        """
+        # Connections are modified in place, since they may be shared
+        self.connections[:] = state['connections']
+        self.requested_content.clear()
+        self.requested_content.update(state['requested_content'])
+        self.n_connected = state['n_connected']
+        self._t_warmup = state['t_warmup']
+        self._rngs = []
+        for rng_state in state['rng']:
+            rng = np.random.RandomState()
+            rng.set_state(rng_state)
+            self._rngs.append(rng)
+        random.setstate(state['random'])
+
 
 @register_workload('STATIONARY')
 class StationaryWorkload(object):
@@ -0,0 +1,193 @@
+import sys
+if sys.version_info[:2] >= (2, 7):
+    import unittest
+else:
+    try:
+        import unittest2 as unittest
+    except ImportError:
+        raise ImportError("The unittest2 package is needed to run the tests.") 
+del sys
+import time
+import shutil
+import tempfile
+
+from icarus.util import Tree, Settings
+from icarus.orchestration import Orchestrator, CostModel, run_scenario
+from icarus.execution import OverheadCollector
+
+
+def experiment(n_measured=100, asn=1221, strategy='SIT_ONLY', **strategy_params):
+    e = Tree()
+    e['workload'] = {'name': 'STATIONARY_SIT', 'n_warmup': 0, 'n_measured': n_measured}
+    e['topology'] = {'name': 'ROCKET_FUEL', 'asn': asn}
+    e['strategy']['name'] = strategy
+    for k, v in strategy_params.items():
+        e['strategy'][k] = v
+    return e
+
+
+def sit_experiment(strategy='NDN_SIT', shortest_path_mode='eager'):
+    e = Tree()
+    e['workload'] = {'name': 'STATIONARY_SIT', 'alpha': 0.7, 'n_contents': 100,
+                     'n_warmup': 300, 'n_measured': 600, 'rate': 100,
+                     'disconnection_rate': 0.0025, 'seed': 7}
+    e['content_placement'] = {'name': 'UNIFORM', 'seed': 7}
+    e['cache_policy']['name'] = 'LRU'
+    e['topology'] = {'name': 'ROCKET_FUEL', 'asn': 1221, 'source_ratio': 1.0,
+                     'ext_delay': 2}
+    e['joint_cache_rsn_placement'] = {'name': 'CACHE_ALL_RSN_ALL_SIT',
+                                      'network_cache': 0.5, 'network_rsn': 32}
+    e['warmup_strategy'] = {'name': 'NDN', 'p': 0.5}
+    e['strategy'] = {'name': strategy, 'p': 0.5}
+    if shortest_path_mode is not None:
+        e['netconf']['shortest_path_mode'] = shortest_path_mode
+    return e
+
+
+def sit_settings():
+    settings = Settings()
+    settings.DATA_COLLECTORS = ['CACHE_HIT_RATIO', 'OVERHEAD', 'LATENCY']
+    return settings
+
+
+class TestCostModel(unittest.TestCase):
+
+    def test_prior(self):
+        model = CostModel()
+        self.assertEqual(100, model.estimate(experiment()))
+        self.assertGreater(model.estimate(experiment(200)),
+                           model.estimate(experiment(100)))
+        self.assertGreater(model.estimate(experiment(scope=2)),
+                           model.estimate(experiment(scope=1)))
+        self.assertGreater(model.estimate(experiment(fan_out=100)),
+                           model.estimate(experiment(fan_out=1)))
+
+    def test_update(self):
+        model = CostModel()
+        model.update(experiment(100, strategy='NDN'), 10)
+        model.update(experiment(100, strategy='SIT_ONLY', scope=1), 50)
+        # Same strategy parameters
+        self.assertAlmostEqual(20, model.estimate(experiment(200, strategy='NDN')))
+        # Same strategy name
+        self.assertAlmostEqual(25, model.estimate(experiment(100, scope=0)))
+        # Same topology only
+        self.assertAlmostEqual(60.0/300*100, model.estimate(experiment(100, strategy='LCE')))
+        # Nothing in common
+        self.assertAlmostEqual(60.0/300*100, model.estimate(experiment(100, asn=3257)))
+
+
+class TestOrchestrator(unittest.TestCase):
+
+    def orchestrator(self, n_proc):
+        settings = Settings()
+        settings.PARALLEL_EXECUTION = False
+        orch = Orchestrator(settings)
+        orch.n_proc = n_proc
+        return orch
+
+    def test_next_job(self):
+        orch = self.orchestrator(1)
+        orch._pending = {'a': experiment(100), 'b': experiment(300),
+                         'c': experiment(200)}
+        self.assertEqual(['b', 'c', 'a'], [orch.next_job()[0] for _ in range(3)])
+
+    def test_eta(self):
+        orch = self.orchestrator(1)
+        orch.cost_model.update(experiment(100), 100)
+        orch._running = {'a': (30, time.time() - 10)}
+        orch._pending = {'b': experiment(50), 'c': experiment(40)}
+        # 20s left for a, then b and c
+        self.assertAlmostEqual(110, orch.eta(), delta=1)
+
+    def test_shards(self):
+        orch = self.orchestrator(1)
+        orch.n_shards = 2
+        orch.cost_model.update(experiment(100), 100)
+        self.assertAlmostEqual(50, orch.cost_model.estimate(experiment(100), 2))
+        for shard in range(2):
+            c = OverheadCollector(None)
+            c.sess_count = c.satisfied_conn = 10
+            c.num_data = 20.0*(1 + shard)
+            orch.job_callback((experiment(), [c], 1.0), experiment(), ('k', shard))
+            self.assertEqual(shard, len(orch.results))
+        self.assertEqual(1, orch.n_success)
+        _, results = orch.results[0]
+        self.assertAlmostEqual(3.0, results['OVERHEAD']['MEAN'])
+
+    def test_failed_shard(self):
+        orch = self.orchestrator(1)
+        orch.n_shards = 2
+        orch.job_callback(None, experiment(), ('k', 0))
+        orch.job_callback((experiment(), [OverheadCollector(None)], 1.0),
+                          experiment(), ('k', 1))
+        self.assertEqual(0, len(orch.results))
+        self.assertEqual(1, orch.n_fail)
+
+    def test_callback_error(self):
+        class ResultsLog(object):
+            def append(self, *args):
+                raise IOError('No space left on device')
+        orch = self.orchestrator(1)
+        orch.results_log = ResultsLog()
+        orch._running[('k', 0)] = (1, time.time())
+        orch.job_callback((experiment(), {}, 1.0), experiment(), ('k', 0))
+        self.assertEqual({}, orch._running)
+        self.assertEqual(0, len(orch.results))
+        self.assertEqual((0, 1), (orch.n_success, orch.n_fail))
+
+    def test_poll(self):
+        class AsyncResult(object):
+            def __init__(self, ready, successful):
+                self._ready = ready
+                self._successful = successful
+            def ready(self):
+                return self._ready
+            def successful(self):
+                return self._successful
+            def get(self):
+                raise ValueError('Result could not be pickled')
+        orch = self.orchestrator(1)
+        for key, ready, successful in [('a', False, False), ('b', True, False),
+                                       ('c', True, True)]:
+            orch._running[(key, 0)] = (1, time.time())
+            orch._async[(key, 0)] = (AsyncResult(ready, successful), experiment())
+        orch._running.pop(('c', 0))
+        orch.poll()
+        self.assertEqual([('a', 0)], list(orch._running))
+        self.assertEqual([('a', 0)], list(orch._async))
+        self.assertEqual((0, 1), (orch.n_success, orch.n_fail))
+
+
+class TestRunScenario(unittest.TestCase):
+
+    def test_shortest_path_modes(self):
+        # NDN_SIT returns requests not served on path along the reversed
+        # path, which must not alter the paths returned in later lookups
+        results = [run_scenario(sit_settings(), sit_experiment('NDN_SIT', mode), 1, 1)[1]
+                   for mode in ('eager', 'lazy', 'predecessor')]
+        self.assertEqual(results[0].paths(), results[1].paths())
+        self.assertEqual(results[0].paths(), results[2].paths())
+
+    def test_precomputation(self):
+        # Paths are built from the shared precomputations if no mode is set
+        expected = run_scenario(sit_settings(), sit_experiment(), 1, 1)[1]
+        directory = tempfile.mkdtemp()
+        try:
+            results = run_scenario(sit_settings(), sit_experiment(shortest_path_mode=None),
+                                   1, 1, precomputation_dir=directory)[1]
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(expected.paths(), results.paths())
+
+    def test_warmup_snapshot(self):
+        # Snapshots do not store paths, which NDN_SIT must not alter
+        e = sit_experiment('NDN_SIT')
+        expected = run_scenario(sit_settings(), e, 1, 1)[1]
+        directory = tempfile.mkdtemp()
+        try:
+            stored = run_scenario(sit_settings(), e, 1, 1, snapshot_dir=directory)[1]
+            restored = run_scenario(sit_settings(), e, 1, 1, snapshot_dir=directory)[1]
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(expected.paths(), stored.paths())
+        self.assertEqual(expected.paths(), restored.paths())
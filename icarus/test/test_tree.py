@@ -15,7 +15,7 @@ except ImportError:
     # Python 3
     import pickle
 
-from icarus.util import Tree
+from icarus.util import Tree, FrozenTree, params_digest
         
 class TestTree(unittest.TestCase):
 
@@ -235,4 +235,87 @@ class TestTree(unittest.TestCase):
         
     def test_match_empty_tree(self):
         tree = Tree()
-        self.assertFalse(tree.match({'a': 1}))
\ No newline at end of file
+        self.assertFalse(tree.match({'a': 1}))
+
+
+class TestFrozenTree(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = Tree({'topology': {'name': 'PATH', 'n': 3},
+                          'strategy': {'name': 'LCE', 'params': {}},
+                          'alpha': 0.8,
+                          'list': [1, 2]})
+        self.frozen = FrozenTree(self.tree)
+
+    def test_round_trip(self):
+        tree = self.frozen.to_tree()
+        self.assertEqual(self.tree, tree)
+        self.assertIsInstance(tree['topology'], Tree)
+        self.assertIsInstance(tree['strategy']['params'], Tree)
+        self.assertEqual(self.tree, Tree(self.frozen))
+        self.assertEqual(self.frozen, FrozenTree(tree))
+        self.assertEqual(self.frozen, FrozenTree(self.frozen))
+
+    def test_to_tree_is_copy(self):
+        tree = self.frozen.to_tree()
+        tree['topology'].pop('name')
+        self.assertEqual('PATH', self.frozen['topology']['name'])
+        # Mutable leaves are not shared, neither with the returned tree nor
+        # with the tree which was frozen
+        digest = self.frozen.digest()
+        tree['list'].append(3)
+        self.tree['list'].append(4)
+        self.assertEqual([1, 2], self.frozen['list'])
+        self.assertEqual(digest, params_digest(self.frozen.to_tree()))
+
+    def test_getitem(self):
+        self.assertEqual(0.8, self.frozen['alpha'])
+        self.assertEqual([1, 2], self.frozen['list'])
+        self.assertIsInstance(self.frozen['topology'], FrozenTree)
+        self.assertEqual(3, self.frozen['topology']['n'])
+        self.assertEqual(FrozenTree(), self.frozen['strategy']['params'])
+        self.assertIs(self.frozen['topology'], self.frozen['topology'])
+        self.assertRaises(KeyError, self.frozen.__getitem__, 'beta')
+
+    def test_contains_keys(self):
+        self.assertIn('topology', self.frozen)
+        self.assertIn('params', self.frozen['strategy'])
+        self.assertNotIn('beta', self.frozen)
+        self.assertEqual(set(self.tree.keys()), set(self.frozen.keys()))
+        self.assertEqual(self.tree, Tree(dict(self.frozen.items())))
+        self.assertEqual(3, self.frozen['topology'].get('n'))
+        self.assertIsNone(self.frozen['topology'].get('m'))
+
+    def test_getval(self):
+        for path in [('topology', 'name'), ('alpha',), ('topology', 'x'),
+                     ('alpha', 'x'), ('strategy', 'params'), ('beta',)]:
+            self.assertEqual(self.tree.getval(path), self.frozen.getval(path))
+        self.assertEqual(Tree({'name': 'PATH', 'n': 3}),
+                         self.frozen.getval(('topology',)))
+
+    def test_paths_iter(self):
+        self.assertEqual(self.tree.paths(), self.frozen.paths())
+        self.assertEqual(sorted(self.tree), sorted(self.frozen))
+
+    def test_match(self):
+        for condition in [{'topology': {'name': 'PATH'}}, {'alpha': 0.8, 'list': [1, 2]},
+                          {'topology': {'name': 'TREE'}}, {'beta': None}, {'beta': 1}]:
+            self.assertEqual(self.tree.match(condition), self.frozen.match(condition))
+
+    def test_digest_hash(self):
+        self.assertEqual(params_digest(self.tree), params_digest(self.frozen))
+        self.assertEqual(params_digest(self.tree['topology']),
+                         params_digest(self.frozen['topology']))
+        self.assertEqual(params_digest((1, {'t': self.tree})),
+                         params_digest((1, {'t': self.frozen})))
+        other = FrozenTree(self.tree)
+        self.assertEqual(hash(self.frozen), hash(other))
+        self.assertEqual(1, len(set([self.frozen, other])))
+        self.assertNotEqual(self.frozen, self.frozen['topology'])
+
+    def test_pickle(self):
+        for protocol in (0, pickle.HIGHEST_PROTOCOL):
+            frozen = pickle.loads(pickle.dumps(self.frozen, protocol))
+            self.assertEqual(self.frozen, frozen)
+            self.assertEqual(self.frozen.digest(), frozen.digest())
+            self.assertEqual('PATH', frozen['topology']['name'])
@@ -7,6 +7,8 @@ else:
     except ImportError:
         raise ImportError("The unittest2 package is needed to run the tests.") 
 del sys
+import random
+
 import networkx as nx
 import fnss
 
@@ -50,4 +52,55 @@ class TestUtil(unittest.TestCase):
         topo.add_path([2,1,3,4])
         sp = nx.all_pairs_shortest_path(topo)
         tree = util.multicast_tree(sp, 1, [2, 3])
-        self.assertSetEqual(set(tree), set([(1, 2), (1, 3)]))
\ No newline at end of file
+        self.assertSetEqual(set(tree), set([(1, 2), (1, 3)]))
+
+class TestConnectionCounter(unittest.TestCase):
+
+    def test_counts(self):
+        c = util.ConnectionCounter()
+        for k in [3, 1, 3, 2, 3]:
+            c.increment(k)
+        c.decrement(1)
+        self.assertEqual(3, c[3])
+        self.assertEqual(0, c[1])
+        self.assertEqual(0, c.get(1))
+        self.assertIsNone(c.get(4))
+        self.assertEqual(4, c.total)
+        self.assertEqual(2, c.n_positive)
+        self.assertEqual({1: 0, 2: 1, 3: 3}, dict(c.items()))
+        self.assertRaises(ValueError, c.decrement, 1)
+
+    def test_weighted_choice(self):
+        c = util.ConnectionCounter({'a': 1, 'b': 0, 'c': 3})
+        rng = random.Random(0)
+        draws = [c.weighted_choice(rng) for _ in range(4000)]
+        self.assertNotIn('b', draws)
+        self.assertAlmostEqual(0.75, draws.count('c')/4000.0, delta=0.03)
+
+    def test_choice(self):
+        c = util.ConnectionCounter(dict((k, k % 3) for k in range(100)))
+        rng = random.Random(0)
+        draws = set(c.choice(rng) for _ in range(2000))
+        self.assertEqual(set(k for k in range(100) if k % 3 > 0), draws)
+
+    def test_empty(self):
+        c = util.ConnectionCounter()
+        self.assertIsNone(c.weighted_choice())
+        self.assertIsNone(c.choice())
+        c.increment(1)
+        c.decrement(1)
+        self.assertIsNone(c.weighted_choice())
+
+    def test_growth(self):
+        c = util.ConnectionCounter()
+        for k in range(1, 1001):
+            c.increment(k, k)
+        c.decrement(1000, 1000)
+        self.assertEqual(sum(range(1, 1000)), c.total)
+        # The draw maps to the first key whose cumulative count exceeds it
+        class Fixed(object):
+            def random(self):
+                return 0.25
+        limit = next(k for k in range(1, 1000)
+                     if sum(range(1, k + 1)) > 0.25*c.total)
+        self.assertEqual(limit, c.weighted_choice(Fixed()))
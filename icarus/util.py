@@ -1,6 +1,10 @@
 """Utility functions
 """
 import time
+import random
+import hashlib
+import sys
+import resource
 import logging
 import collections
 import copy
@@ -11,13 +15,18 @@ __all__ = [
         'Settings',
         'AnyValue',
         'SequenceNumber',
+        'ConnectionCounter',
         'config_logging',
         'inheritdoc',
         'timestr',
+        'peak_rss',
+        'memstr',
         'iround',
         'step_cdf',
         'Tree',
+        'FrozenTree',
         'can_import',
+        'params_digest',
         'overlay_betweenness_centrality',
         'path_links',
         'multicast_tree',
@@ -44,6 +53,8 @@ class Tree(collections.defaultdict):
         """
         if data is None:
             data = {}
+        elif isinstance(data, FrozenTree):
+            data = data.to_tree()
         elif not isinstance(data, Tree):
             # If data is not a Tree try to castto dict and iteratively recurse
             # it to convert each node to a tree
@@ -183,6 +194,220 @@ class Tree(collections.defaultdict):
         """Return True if the tree is empty, False otherwise"""
         return len(self) == 0
 
+
+def _copy_leaf(v):
+    """Return a deep copy of a leaf value of a tree, or the value itself if
+    it is of an immutable scalar type
+    """
+    if v is None or isinstance(v, (bool, int, long, float, complex, basestring)):
+        return v
+    return copy.deepcopy(v)
+
+
+class FrozenTree(object):
+    """Immutable tree, stored as a flat mapping from paths to values
+    
+    It is a read-only replacement of Tree for experiment parameters. Values
+    are looked up by their path in constant time, rather than by walking the
+    tree, and the digest of the tree, which identifies an experiment, is
+    computed only once. Converting it to a Tree which can be modified is
+    cheaper than deep copying the equivalent Tree.
+    
+    It supports the read-only operations of Tree, i.e. item lookup, which
+    returns a leaf value or a FrozenTree of the subtree, *getval*, *paths*,
+    *match* and iteration over (path, value) pairs, and it is converted back
+    to a new Tree by *to_tree*.
+    """
+    
+    __slots__ = ('_items', '_empty', '_keys', '_children', '_digest')
+    
+    def __init__(self, data=None):
+        """Constructor
+        
+        Parameters
+        ----------
+        data : Tree, dict or FrozenTree, optional
+            The tree to freeze. Nested dicts are subtrees
+        """
+        self._items = {}
+        # Paths of empty subtrees, which are kept so that the tree is
+        # converted back to an identical Tree
+        self._empty = set()
+        if isinstance(data, FrozenTree):
+            self._items.update(data._items)
+            self._empty.update(data._empty)
+        elif data is not None:
+            self._flatten(data, ())
+        self._empty = frozenset(self._empty)
+        self._keys = None
+        self._children = {}
+        self._digest = None
+    
+    def _flatten(self, data, root):
+        for k, v in data.items():
+            path = root + (k,)
+            if isinstance(v, FrozenTree):
+                v = v.to_tree()
+            if isinstance(v, dict):
+                if v:
+                    self._flatten(v, path)
+                else:
+                    self._empty.add(path)
+            else:
+                self._items[path] = _copy_leaf(v)
+    
+    @classmethod
+    def _from_items(cls, items, empty):
+        tree = cls()
+        tree._items = items
+        tree._empty = frozenset(empty)
+        tree._keys = None
+        return tree
+    
+    def __getstate__(self):
+        return self._items, self._empty
+    
+    def __setstate__(self, state):
+        self._items, self._empty = state
+        self._keys = None
+        self._children = {}
+        self._digest = None
+    
+    def __getitem__(self, k):
+        if (k,) in self._items:
+            return self._items[(k,)]
+        if k not in self._children:
+            items = dict((path[1:], v) for path, v in self._items.iteritems()
+                         if path[0] == k)
+            empty = [path[1:] for path in self._empty if path[0] == k]
+            if not items and not empty:
+                raise KeyError(k)
+            # Only a subtree which is empty itself has an empty path
+            self._children[k] = FrozenTree._from_items(items, [p for p in empty if p])
+        return self._children[k]
+    
+    def _root_keys(self):
+        if self._keys is None:
+            self._keys = frozenset(path[0] for path in self._items) | \
+                         frozenset(path[0] for path in self._empty)
+        return self._keys
+    
+    def __contains__(self, k):
+        return k in self._root_keys()
+    
+    def keys(self):
+        """Return the keys of the root of the tree"""
+        return list(self._root_keys())
+    
+    def items(self):
+        """Return the (key, value) pairs of the root of the tree, where the
+        values of subtrees are FrozenTrees
+        """
+        return [(k, self[k]) for k in self.keys()]
+    
+    def get(self, k, default=None):
+        return self[k] if k in self else default
+    
+    def __iter__(self):
+        return self._items.iteritems()
+    
+    def __eq__(self, other):
+        if isinstance(other, FrozenTree):
+            return self._items == other._items and self._empty == other._empty
+        if isinstance(other, dict):
+            return self.to_tree() == other
+        return NotImplemented
+    
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+    
+    def __hash__(self):
+        return hash(self.digest())
+    
+    def __repr__(self):
+        return 'FrozenTree(%s)' % self.to_tree().__str__(True)
+    
+    def digest(self):
+        """Return the digest of the tree, computed only once
+        
+        Returns
+        -------
+        digest : str
+            The digest of the tree, equal to params_digest of the equivalent
+            Tree
+        """
+        if self._digest is None:
+            self._digest = params_digest(self.to_tree())
+        return self._digest
+    
+    def paths(self):
+        """Return a dictionary mapping all paths to final (non-tree) values
+        and the values.
+        
+        Returns
+        -------
+        paths : dict
+            Path-value mapping
+        """
+        return dict(self._items)
+    
+    def getval(self, path):
+        """Get the value at a specific path, None if not there
+        
+        Parameters
+        ----------
+        path : iterable
+            Path to the desired value
+            
+        Returns
+        -------
+        val : any type
+            The value at the given path. If the path is a subtree, it is a
+            FrozenTree
+        """
+        path = tuple(path)
+        if path in self._items:
+            return self._items[path]
+        tree = self
+        for i in path:
+            if not isinstance(tree, FrozenTree) or i not in tree:
+                return None
+            tree = tree[i]
+        return tree if isinstance(tree, FrozenTree) and tree._items else None
+    
+    def match(self, condition):
+        """Check if the tree matches a given condition (see Tree.match)
+        
+        Parameters
+        ----------
+        condition : Tree
+            The condition to check
+        
+        Returns
+        -------
+        match : bool
+            True if the tree matches the condition, False otherwise.
+        """
+        condition = Tree(condition)
+        return all(self.getval(path) == val for path, val in condition.paths().items())
+    
+    def to_tree(self):
+        """Return a new Tree equal to this tree
+        
+        Returns
+        -------
+        tree : Tree
+            The tree, which can be modified without affecting this tree.
+            Mutable leaves, e.g. lists, are deep copies of those of this tree
+        """
+        tree = Tree()
+        for path in self._empty:
+            tree.setval(path, Tree())
+        for path, v in self._items.iteritems():
+            tree.setval(path, _copy_leaf(v))
+        return tree
+
 class Settings(object):
     """Object storing all settings"""
 
@@ -444,6 +669,196 @@ class SequenceNumber(object):
         return self.__seq
 
 
+class ConnectionCounter(object):
+    """Counter of the connections of a receiver to each content, supporting
+    weighted random sampling of a content in logarithmic time.
+
+    Counts are stored in two Fenwick (binary indexed) trees over slots
+    assigned to contents in order of first insertion: one with the counts
+    themselves and one with a 1 for each content with a positive count.
+    Incrementing or decrementing a count and drawing a content at random,
+    either with probability proportional to its count or uniformly among
+    contents with a positive count, all take O(log n) time, where n is the
+    number of distinct contents ever counted.
+
+    The counter behaves as a read-only mapping from content to count, with
+    the addition that counts can be assigned. Contents whose count drops to
+    zero are kept, as in a dictionary of counts.
+    """
+
+    def __init__(self, counts=None):
+        """Constructor
+
+        Parameters
+        ----------
+        counts : dict, optional
+            Initial counts, keyed by content
+        """
+        self._slot = {}
+        self._key = []
+        self._count = []
+        # Fenwick trees are 1-indexed: index i stores the slots i - lsb(i)
+        # to i - 1. Their capacity is doubled as needed
+        self._tree = [0]
+        self._ptree = [0]
+        self.total = 0
+        self.n_positive = 0
+        if counts is not None:
+            for k, v in counts.iteritems():
+                self[k] = v
+
+    def _grow(self):
+        """Double the capacity of the trees, rebuilding them in linear time
+        """
+        capacity = 2*(len(self._tree) - 1) or 1
+        tree = [0] + self._count + [0]*(capacity - len(self._count))
+        ptree = [0] + [int(c > 0) for c in self._count] + [0]*(capacity - len(self._count))
+        for i in xrange(1, capacity + 1):
+            j = i + (i & -i)
+            if j <= capacity:
+                tree[j] += tree[i]
+                ptree[j] += ptree[i]
+        self._tree = tree
+        self._ptree = ptree
+
+    @staticmethod
+    def _add(tree, slot, delta):
+        i = slot + 1
+        n = len(tree) - 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    @staticmethod
+    def _search(tree, value):
+        """Return the first slot whose cumulative count exceeds *value*
+        """
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << (n.bit_length() - 1)
+        while step > 0:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= value:
+                pos = nxt
+                value -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def increment(self, key, n=1):
+        """Increment the count of a content
+
+        Parameters
+        ----------
+        key : any hashable type
+            The content
+        n : int, optional
+            The increment
+        """
+        if key not in self._slot:
+            self._slot[key] = len(self._key)
+            self._key.append(key)
+            self._count.append(0)
+            if len(self._key) > len(self._tree) - 1:
+                self._grow()
+        self[key] = self._count[self._slot[key]] + n
+
+    def decrement(self, key, n=1):
+        """Decrement the count of a content
+
+        Parameters
+        ----------
+        key : any hashable type
+            The content
+        n : int, optional
+            The decrement
+        """
+        self[key] = self[key] - n
+
+    def weighted_choice(self, rng=random):
+        """Draw a content with probability proportional to its count
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            The random generator, by default the random module
+
+        Returns
+        -------
+        key : any hashable type
+            The content drawn or None if all counts are zero
+        """
+        if self.total == 0:
+            return None
+        slot = self._search(self._tree, rng.random()*self.total)
+        return self._key[min(slot, len(self._key) - 1)]
+
+    def choice(self, rng=random):
+        """Draw a content uniformly among those with a positive count
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            The random generator, by default the random module
+
+        Returns
+        -------
+        key : any hashable type
+            The content drawn or None if all counts are zero
+        """
+        if self.n_positive == 0:
+            return None
+        slot = self._search(self._ptree, int(rng.random()*self.n_positive))
+        return self._key[slot]
+
+    def __setitem__(self, key, value):
+        if value < 0:
+            raise ValueError('Counts cannot be negative')
+        if key not in self._slot:
+            self.increment(key, value)
+            return
+        slot = self._slot[key]
+        old = self._count[slot]
+        if value == old:
+            return
+        self._count[slot] = value
+        self._add(self._tree, slot, value - old)
+        self.total += value - old
+        if (old > 0) != (value > 0):
+            delta = 1 if value > 0 else -1
+            self._add(self._ptree, slot, delta)
+            self.n_positive += delta
+
+    def __getitem__(self, key):
+        return self._count[self._slot[key]]
+
+    def get(self, key, default=None):
+        return self._count[self._slot[key]] if key in self._slot else default
+
+    def __contains__(self, key):
+        return key in self._slot
+
+    def __iter__(self):
+        return iter(self._key)
+
+    def __len__(self):
+        return len(self._key)
+
+    def keys(self):
+        return list(self._key)
+
+    def values(self):
+        return list(self._count)
+
+    def items(self):
+        return zip(self._key, self._count)
+
+    def iteritems(self):
+        return iter(zip(self._key, self._count))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
+
+
 def config_logging(log_level='INFO'):
     """Configure logging level
     
@@ -527,6 +942,42 @@ def timestr(sec, with_seconds=True):
     return "".join("%d%s " % (vals[i], units[i]) for i in range(len(vals)))[:-1]
 
 
+def peak_rss():
+    """Return the peak resident set size of the calling process.
+    
+    Returns
+    -------
+    peak_rss : int
+        The peak resident set size in bytes
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is expressed in bytes on OS X and in kilobytes elsewhere
+    return rss if sys.platform == 'darwin' else 1024*rss
+
+
+def memstr(size):
+    """Get a memory size in bytes and return it formatted in a string.
+    
+    Parameters
+    ----------
+    size : int
+        The memory size in bytes
+    
+    Returns
+    -------
+    memstr : str
+        A string expressing the memory size in the largest unit smaller
+        than it
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = 'TiB'
+    return "%.1f%s" % (size, unit) if unit != 'B' else "%d%s" % (size, unit)
+
+
 def iround(x):
     """Round float to closest integer
     
@@ -579,6 +1030,39 @@ def step_cdf(x, y):
     return sx, sy
 
 
+def _canonical(obj):
+    """Return a representation of a (possibly nested) parameter object which
+    does not depend on the order of dict items
+    """
+    if isinstance(obj, FrozenTree):
+        obj = obj.to_tree()
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _canonical(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_canonical(v) for v in obj)
+    return obj
+
+
+def params_digest(params):
+    """Return a digest identifying a (possibly nested) parameter object, such
+    as an experiment or topology specification
+    
+    Parameters
+    ----------
+    params : any type
+        The parameters, made of dicts, lists, tuples and scalar values. The
+        order of the items of dicts does not affect the digest
+        
+    Returns
+    -------
+    digest : str
+        The hexadecimal SHA-1 digest of the parameters
+    """
+    if isinstance(params, FrozenTree):
+        return params.digest()
+    return hashlib.sha1(repr(_canonical(params))).hexdigest()
+
+
 def can_import(statement):
     """Try executing an import statement and return True if succeeds or False
     othrwise
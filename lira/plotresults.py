@@ -8,7 +8,14 @@ import argparse
 import matplotlib.pyplot as plt
 
 from icarus.registry import RESULTS_READER
-from icarus.results.plot import plot_bar_chart, plot_lines
+from icarus.results.plot import PlotPipeline
+
+
+# Figures are queued by the plot functions below and rendered by run(), in
+# parallel, skipping those whose data has not changed since last rendered
+pipeline = PlotPipeline()
+plot_bar_chart = pipeline.plot_bar_chart
+plot_lines = pipeline.plot_lines
 
 
 # Legend for deployment strategies
@@ -405,6 +412,8 @@ def run(resultsfile, plotdir):
     # Plot graphs
     print('Plotting results')
     plot_paper_graphs(resultset, plotdir)
+    rendered, skipped = pipeline.run()
+    print('Rendered %d plots, %d unchanged' % (len(rendered), len(skipped)))
     print('Exit. Plots were saved in directory %s' % os.path.abspath(plotdir))
 
 def main():